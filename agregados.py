@@ -0,0 +1,215 @@
+# Estatísticas agregadas de todos os arquivos de sessões, fora da memória: cada
+# sessão (segmento .seg do registro ou sessão de uma mesa no banco SQLite) é lida
+# em trechos de CHUNK resultados, por mapeamento em memória ou faixas da chave
+# primária, e só o estado de emenda entre trechos (últimos códigos, sequência
+# corrente, último empate) fica em memória. Resultado, num .npz compacto:
+#   contexts      transições globais (contexto -> C/V/E seguintes), ordens 0..8,
+#                 com as mesmas chaves da árvore de contextos
+#   streaks       distribuição dos tamanhos de sequência, por cor
+#   empate_gaps   distribuição dos intervalos entre empates
+#   patterns      resultado seguinte a cada padrão básico (chaves do índice de ocorrências)
+# A interface carrega o arquivo na inicialização e o passa como prioris ao
+# estado incremental das mesas (nucleo.new_stream); backtest e varredura só o
+# usam com --priors.
+#
+# Uso: python agregados.py [--segments DIR ...] [--db BANCO ...] [-o priors.npz] [--show]
+import argparse
+import glob
+import os
+
+import numpy as np
+
+from contexto import CONTEXT_ORDER, SYMBOLS
+from ocorrencias import OccurrenceIndex
+from registro import LOG_DIR, RECORD, SEGMENT_SUFFIX
+
+PRIORS_FILE = os.environ.get('PADRAO30_PRIORS', 'priors.npz')
+CHUNK = 1 << 20           # Resultados por trecho
+MAX_STREAK = 64           # Sequências maiores contam neste tamanho
+MAX_GAP = 256             # Intervalos entre empates maiores contam neste tamanho
+EMPATE = 2
+
+class Aggregates:
+    def __init__(self, max_order=CONTEXT_ORDER):
+        self.max_order = max_order
+        self.offsets = [(SYMBOLS ** k - 1) // 2 for k in range(max_order + 2)]
+        self.contexts = np.zeros((self.offsets[-1], SYMBOLS), dtype=np.int64)
+        self.streaks = np.zeros((SYMBOLS, MAX_STREAK + 1), dtype=np.int64)
+        self.empate_gaps = np.zeros(MAX_GAP + 1, dtype=np.int64)
+        self.patterns = {}                 # Chave do padrão -> [C, V, E] seguintes
+        self.results = 0
+        self.sessions = 0
+
+    def begin_session(self):
+        self.sessions += 1
+        self._recent = np.empty(0, dtype=np.int64)   # Últimos max_order códigos da sessão
+        self._run_code = -1                          # Sequência ainda aberta
+        self._run = 0
+        self._last_empate = None                     # Posição (na sessão) do último empate
+        self._position = 0
+        self._occurrences = OccurrenceIndex()
+
+    def extend(self, codes):
+        codes = np.asarray(codes, dtype=np.int64)
+        if not len(codes):
+            return
+        self._count_contexts(codes)
+        self._count_runs(codes)
+        self._count_gaps(codes)
+        self._occurrences.extend(codes)
+        self._recent = np.concatenate([self._recent, codes])[-self.max_order:]
+        self._position += len(codes)
+        self.results += len(codes)
+
+    def end_session(self):
+        if self._run:
+            self.streaks[self._run_code, min(self._run, MAX_STREAK)] += 1
+        for key, counts in self._occurrences.outcomes.items():
+            total = self.patterns.setdefault(key, [0, 0, 0])
+            for code, count in enumerate(counts):
+                total[code] += count
+
+    def _count_contexts(self, codes):
+        # Como ContextTree.extend, mas em contagens densas (sem poda) por bincount
+        start = len(self._recent)
+        history = np.concatenate([self._recent, codes])
+        positions = np.arange(start, len(history))
+        values = np.zeros(len(codes), dtype=np.int64)
+        flat = self.contexts.reshape(-1)
+        weight = 1
+        for k in range(self.max_order + 1):
+            valid = positions >= k
+            if k:
+                values[valid] += history[positions[valid] - k] * weight
+                weight *= SYMBOLS
+            pairs = (self.offsets[k] + values[valid]) * SYMBOLS + codes[valid]
+            if not len(pairs):
+                break
+            flat += np.bincount(pairs, minlength=len(flat))
+
+    def _count_runs(self, codes):
+        # Sequências completas do trecho; a última fica aberta para o próximo
+        starts = np.concatenate([[0], np.flatnonzero(codes[1:] != codes[:-1]) + 1])
+        lengths = np.diff(np.append(starts, len(codes)))
+        colors = codes[starts]
+        if colors[0] == self._run_code:
+            lengths[0] += self._run
+        elif self._run:
+            self.streaks[self._run_code, min(self._run, MAX_STREAK)] += 1
+        np.add.at(self.streaks, (colors[:-1], np.minimum(lengths[:-1], MAX_STREAK)), 1)
+        self._run_code, self._run = int(colors[-1]), int(lengths[-1])
+
+    def _count_gaps(self, codes):
+        positions = np.flatnonzero(codes == EMPATE) + self._position
+        if not len(positions):
+            return
+        if self._last_empate is not None:
+            positions = np.concatenate([[self._last_empate], positions])
+        self.empate_gaps += np.bincount(np.minimum(np.diff(positions), MAX_GAP), minlength=MAX_GAP + 1)
+        self._last_empate = int(positions[-1])
+
+    def save(self, path=PRIORS_FILE):
+        keys = list(self.patterns)
+        np.savez_compressed(
+            path,
+            max_order=self.max_order,
+            contexts=self.contexts,
+            streaks=self.streaks,
+            empate_gaps=self.empate_gaps,
+            pattern_keys=np.array([' '.join(map(str, key)) for key in keys], dtype=str),
+            pattern_counts=np.array([self.patterns[key] for key in keys], dtype=np.int64).reshape(-1, SYMBOLS),
+            results=self.results,
+            sessions=self.sessions
+        )
+
+def load_priors(path=PRIORS_FILE):
+    # Prioris pré-calculadas por este módulo; sem arquivo, None
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        patterns = {}
+        for key, counts in zip(data['pattern_keys'].tolist(), data['pattern_counts'].tolist()):
+            name, *values = key.split()
+            patterns[(name, *map(int, values))] = tuple(counts)
+        return {
+            'max_order': int(data['max_order']),
+            'contexts': [tuple(counts) for counts in data['contexts'].tolist()],
+            'streaks': data['streaks'],
+            'empate_gaps': data['empate_gaps'],
+            'patterns': patterns,
+            'results': int(data['results']),
+            'sessions': int(data['sessions'])
+        }
+
+# Fontes: cada sessão é um iterador de trechos de códigos
+def segment_sessions(paths):
+    # Segmentos .seg (um por sessão), em arquivos ou diretórios (recursivamente)
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, '**', '*' + SEGMENT_SUFFIX), recursive=True))
+        else:
+            files = [path]
+        for name in files:
+            count = os.path.getsize(name) // RECORD.itemsize
+            if count:
+                records = np.memmap(name, dtype=RECORD, mode='r', shape=(count,))
+                yield (records['code'][start:start + CHUNK] for start in range(0, count, CHUNK))
+
+def store_sessions(paths):
+    # Sessões de todas as mesas de bancos SQLite (banco.HistoryStore)
+    from banco import HistoryStore
+
+    for path in paths:
+        store = HistoryStore(path)
+        try:
+            for name in store.tables():
+                for session, first, stop in store.sessions(name):
+                    yield (store.codes(name, start, min(start + CHUNK, stop)) for start in range(first, stop, CHUNK))
+        finally:
+            store.close()
+
+def aggregate(sessions, max_order=CONTEXT_ORDER):
+    aggregates = Aggregates(max_order)
+    for chunks in sessions:
+        aggregates.begin_session()
+        for codes in chunks:
+            aggregates.extend(codes)
+        aggregates.end_session()
+    return aggregates
+
+def describe(priors):
+    lines = [f"{priors['results']} resultados em {priors['sessions']} sessões"]
+    for code, color in enumerate('CVE'):
+        counts = priors['streaks'][code]
+        survival = counts[::-1].cumsum()[::-1]       # Sequências com tamanho >= L
+        continuation = ' '.join(
+            f'{length}:{survival[length + 1] / survival[length]:.2f}'
+            for length in range(1, 9) if survival[length]
+        )
+        lines.append(f'{color}: {counts.sum()} sequências; P(continuar | tamanho) {continuation}')
+    gaps = priors['empate_gaps']
+    if gaps.sum():
+        mean = (gaps * np.arange(len(gaps))).sum() / gaps.sum()
+        lines.append(f'Intervalo entre empates: média {mean:.2f} ({gaps.sum()} intervalos)')
+    lines.append(f"{len(priors['patterns'])} padrões com ocorrências registradas")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Estatísticas agregadas de todas as sessões arquivadas')
+    parser.add_argument('--segments', nargs='*', default=[], help=f'segmentos ou diretórios (padrão: {LOG_DIR})')
+    parser.add_argument('--db', nargs='*', default=[], help='bancos SQLite')
+    parser.add_argument('-o', '--output', default=PRIORS_FILE)
+    parser.add_argument('--show', action='store_true', help='mostra o resumo do arquivo de saída existente')
+    args = parser.parse_args()
+
+    if not args.show:
+        segments = args.segments or ([] if args.db else [LOG_DIR])
+        sessions = (session for source in (segment_sessions(segments), store_sessions(args.db)) for session in source)
+        aggregate(sessions).save(args.output)
+    priors = load_priors(args.output)
+    if priors is None:
+        parser.error(f'arquivo {args.output} não encontrado')
+    print(describe(priors))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Autocorrelação vetorizada da série numérica (C=1, V=-1, E=0)
+# Para cada defasagem k compara x[:-k] com x[k:], cada trecho com a própria média,
+# e devolve o vetor de todas as defasagens de uma vez (NaN onde indefinida).
+import numpy as np
+
+FFT_MIN_SIZE = 256  # A partir deste tamanho os produtos por defasagem usam FFT
+
+def lag_products(values, max_lag):
+    # Σ x[i] * x[i + k] para k = 0..max_lag (inteiros, pois x está em {-1, 0, 1})
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    if n == 0:
+        return np.zeros(1, dtype=np.int64)
+    max_lag = min(max_lag, n - 1)
+
+    if n >= FFT_MIN_SIZE:
+        size = 1 << (2 * n - 1).bit_length()
+        spectrum = np.fft.rfft(x, size)
+        products = np.fft.irfft(spectrum * np.conj(spectrum), size)[:max_lag + 1]
+    else:
+        products = np.correlate(x, x, 'full')[n - 1:n + max_lag]
+    return np.rint(products).astype(np.int64)
+
+def correlations_from_sums(values, lag_sums, max_lag):
+    # Correlação de Pearson por defasagem a partir de Σx[i]*x[i+k] já conhecidas
+    # (ex.: mantidas incrementalmente); índice 0 e defasagens sem variância ficam NaN
+    x = np.asarray(values, dtype=np.int64)
+    n = len(x)
+    correlations = np.full(max_lag + 1, np.nan)
+    lags = np.arange(1, min(max_lag, n - 1) + 1)
+    if not len(lags):
+        return correlations
+
+    prefix = np.concatenate(([0], np.cumsum(x)))
+    prefix_sq = np.concatenate(([0], np.cumsum(x * x)))
+    m = n - lags
+    s1, q1 = prefix[m], prefix_sq[m]                              # x[:-k]
+    s2, q2 = prefix[-1] - prefix[lags], prefix_sq[-1] - prefix_sq[lags]  # x[k:]
+
+    var1 = m * q1 - s1 * s1
+    var2 = m * q2 - s2 * s2
+    defined = (var1 > 0) & (var2 > 0)
+    numerator = m * np.asarray(lag_sums, dtype=np.int64)[lags] - s1 * s2
+    correlations[lags[defined]] = numerator[defined] / np.sqrt(
+        var1[defined].astype(np.float64) * var2[defined])
+    return correlations
+
+def autocorrelation(values, max_lag):
+    return correlations_from_sums(values, lag_products(values, max_lag), max_lag)
+
+def strongest_lag(correlations, max_lag):
+    # Defasagem de maior |correlação| em 1..max_lag (a menor, em caso de empate)
+    candidates = np.abs(correlations[1:max_lag + 1])
+    if not len(candidates) or np.all(np.isnan(candidates)):
+        return None, 0.0
+    lag = int(np.nanargmax(candidates)) + 1
+    return lag, float(correlations[lag])
@@ -0,0 +1,127 @@
+# Autômato de padrões (Aho-Corasick) sobre o histórico codificado em bytes (C=0,
+# V=1, E=2). Cada padrão do catálogo é um conjunto de sequências fixas; todas são
+# compiladas numa única tabela de transições (DFA), de modo que uma varredura
+# linear encontra todas as ocorrências de todos os padrões, e cada novo resultado
+# custa uma transição, qualquer que seja o número de padrões.
+import json
+import os
+from collections import deque
+from itertools import product
+
+import numpy as np
+
+SYMBOLS = 'CVE'
+EMPATE = 2
+CUSTOM_PATTERNS_FILE = os.environ.get('PADRAO30_PATTERNS', 'padroes.json')
+
+def basic_catalogue():
+    # Padrões básicos da análise como sequências fixas (o final da sequência os contém)
+    colors = range(len(SYMBOLS))
+    return {
+        'streak': [(a, a) for a in colors],
+        'alternating': [seq for seq in product(colors, repeat=4)
+                        if all(x != y for x, y in zip(seq, seq[1:]))],
+        '2x2': [(a, a, b, b) for a in colors for b in colors if a != b],
+        'high-empate': [seq for seq in product(colors, repeat=5) if seq.count(EMPATE) >= 3],
+        'zigzag': [(a, b, a, c, a) for a in colors for b in colors for c in colors if b != a and c != a]
+    }
+
+def parse_sequence(text):
+    try:
+        return tuple(SYMBOLS.index(char) for char in text.upper() if not char.isspace())
+    except ValueError:
+        raise ValueError(f"Sequência inválida '{text}' (use C, V ou E)") from None
+
+def load_custom_patterns(path=CUSTOM_PATTERNS_FILE):
+    # Padrões do usuário: {"nome": "CCV" | ["CCV", "VVC"], ...}; sem arquivo, nenhum
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    reserved = set(basic_catalogue())
+    patterns = {}
+    for name, sequences in data.items():
+        if name in reserved:
+            raise ValueError(f"Nome de padrão reservado: '{name}'")
+        if isinstance(sequences, str):
+            sequences = [sequences]
+        patterns[name] = [parse_sequence(sequence) for sequence in sequences]
+    return patterns
+
+class PatternAutomaton:
+    def __init__(self, patterns):
+        self.names = list(patterns)
+        goto = [{}]
+        outputs = [0]                       # Máscara de bits dos padrões reconhecidos em cada estado
+        for bit, name in enumerate(self.names):
+            for sequence in patterns[name]:
+                state = 0
+                for code in sequence:
+                    if code not in goto[state]:
+                        goto.append({})
+                        outputs.append(0)
+                        goto[state][code] = len(goto) - 1
+                    state = goto[state][code]
+                outputs[state] |= 1 << bit
+
+        # Ligações de falha em largura; a tabela completa dispensa segui-las na varredura
+        symbols = len(SYMBOLS)
+        delta = [0] * (len(goto) * symbols)
+        fail = [0] * len(goto)
+        queue = deque()
+        for code in range(symbols):
+            child = goto[0].get(code, 0)
+            delta[code] = child
+            if child:
+                queue.append(child)
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            for code in range(symbols):
+                child = goto[state].get(code)
+                if child is None:
+                    delta[state * symbols + code] = delta[fail[state] * symbols + code]
+                else:
+                    fail[child] = delta[fail[state] * symbols + code]
+                    delta[state * symbols + code] = child
+                    queue.append(child)
+
+        self.delta = delta                  # Transições achatadas: estado * 3 + código
+        self.outputs = outputs
+        self.matched = [tuple(name for bit, name in enumerate(self.names) if mask >> bit & 1)
+                        for mask in outputs]
+
+    def __len__(self):
+        return len(self.outputs)
+
+    def step(self, state, code):
+        return self.delta[state * len(SYMBOLS) + code]
+
+    def run(self, codes, state=0):
+        # Estado após consumir codes (códigos 0/1/2)
+        delta = self.delta
+        symbols = len(SYMBOLS)
+        for code in np.asarray(codes, dtype=np.int8).tobytes():
+            state = delta[state * symbols + code]
+        return state
+
+    def scan(self, codes, state=0):
+        # Estado após cada posição, numa única passada
+        delta = self.delta
+        symbols = len(SYMBOLS)
+        states = []
+        append = states.append
+        for code in np.asarray(codes, dtype=np.int8).tobytes():
+            state = delta[state * symbols + code]
+            append(state)
+        return np.array(states, dtype=np.int32)
+
+    def matches(self, codes, state=0):
+        # Nome -> posições em que uma ocorrência do padrão termina
+        masks = np.array(self.outputs, dtype=object if len(self.names) > 62 else np.int64)
+        found = masks[self.scan(codes, state)]
+        return {name: np.flatnonzero(found >> bit & 1) for bit, name in enumerate(self.names)}
+
+def catalogue_automaton(custom_patterns=None):
+    # Autômato dos padrões básicos mais os do usuário (load_custom_patterns)
+    return PatternAutomaton({**basic_catalogue(), **(custom_patterns or {})})
@@ -0,0 +1,246 @@
+# Backtest walk-forward: reproduz uma sequência gravada posição a posição pelo
+# mesmo núcleo da interface e mede acertos, calibração da confiança e resultado
+# das recomendações, por camada e no conjunto.
+#
+# As prioris dos arquivos (agregados.py) ficam de fora por padrão: calculadas
+# sobre as mesmas sessões, vazariam o futuro para a reprodução. --priors as liga.
+#
+# Uso: python backtest.py sessao.txt|.csv|.seg [--workers N] [--chunk-size N] [--seed N]
+#                         [--priors [priors.npz]] [--patterns [padroes.json]] [--check] [--json]
+import argparse
+import json
+import os
+import random
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from nucleo import (
+    LAYER_WEIGHTS, COLOR_CODES, new_stream, stream_push, stream_extend, stream_features,
+    analyze_data, get_recommendation
+)
+from historico import decode
+from importacao import load_file
+from agregados import PRIORS_FILE, load_priors
+from automato import CUSTOM_PATTERNS_FILE, catalogue_automaton, load_custom_patterns
+import contexto
+
+LEVELS = ('low', 'medium', 'high')
+RECOMMENDATIONS = ('bet', 'watch', 'avoid', 'more-data')
+LAYERS = tuple(LAYER_WEIGHTS)
+CHUNK_SIZE = 50000
+
+LEVEL_CODES = {level: i for i, level in enumerate(LEVELS)}
+RECOMMENDATION_CODES = {rec: i for i, rec in enumerate(RECOMMENDATIONS)}
+
+def replay(results, start=0, stop=None, seed=None, stream=None, priors=None, automaton=None):
+    # Analisa as posições start..stop-1; a posição t prevê results[t + 1].
+    # Sem `stream`, o estado incremental é aquecido em lote com tudo o que
+    # antecede start (janela e árvore de contextos), o que permite reproduzir
+    # trechos independentes em paralelo; com ele, o estado já está em start
+    # (trecho seguinte ao anterior) e continua a partir dali.
+    if stop is None:
+        stop = len(results) - 1
+    if seed is not None:
+        random.seed(seed)
+
+    size = max(0, stop - start)
+    records = {
+        'color': np.full(size, -1, dtype=np.int8),
+        'confidence': np.zeros(size, dtype=np.uint8),
+        'risk': np.zeros(size, dtype=np.int8),
+        'manipulation': np.zeros(size, dtype=np.int8),
+        'recommendation': np.zeros(size, dtype=np.int8),
+        'layer_color': np.full((size, len(LAYERS)), -1, dtype=np.int8),
+        'layer_confidence': np.zeros((size, len(LAYERS)), dtype=np.uint8)
+    }
+
+    if stream is None:
+        stream = new_stream(priors=priors, automaton=automaton)
+        stream_extend(stream, np.fromiter((COLOR_CODES[r] for r in results[:start]), dtype=np.int8, count=start))
+
+    for i, t in enumerate(range(start, stop)):
+        stream_push(stream, results[t])
+        analysis = analyze_data(stream_features(stream))
+        records['recommendation'][i] = RECOMMENDATION_CODES[analysis['recommendation']]
+        if analysis['prediction'] is None:
+            continue
+
+        records['color'][i] = COLOR_CODES[analysis['prediction']]
+        records['confidence'][i] = analysis['confidence']
+        records['risk'][i] = LEVEL_CODES[analysis['riskLevel']]
+        records['manipulation'][i] = LEVEL_CODES[analysis['manipulation']]
+        for j, name in enumerate(LAYERS):
+            layer = analysis['layers'][name]
+            records['layer_color'][i, j] = COLOR_CODES[layer['color']]
+            records['layer_confidence'][i, j] = layer['confidence']
+    return records
+
+def _replay_span(args):
+    # Trechos consecutivos num só processo: o estado é aquecido uma vez, no
+    # início do primeiro, e segue de um trecho para o próximo. Os códigos vêm do
+    # bloco de memória compartilhada, sem cópia por tarefa
+    name, size, chunks, priors, automaton = args
+    block = SharedMemory(name=name)
+    codes = np.ndarray(size, dtype=np.int8, buffer=block.buf)
+    try:
+        results = decode(codes[:chunks[-1][1] + 1])
+    finally:
+        del codes           # A vista precisa sumir antes de fechar o bloco
+        block.close()
+    first = chunks[0][0]
+    stream = new_stream(priors=priors, automaton=automaton)
+    stream_extend(stream, np.fromiter((COLOR_CODES[r] for r in results[:first]), dtype=np.int8, count=first))
+    return [replay(results, start, stop, seed, stream) for start, stop, seed in chunks]
+
+def run_backtest(results, workers=None, chunk_size=CHUNK_SIZE, seed=0, priors=None, automaton=None):
+    # Divide a sequência em trechos (cada um com sua semente de desempates) e
+    # os distribui em faixas contíguas, uma por processo; junta os registros na
+    # ordem original. Cada faixa aquece o estado uma vez, então o custo total
+    # cresce linearmente com o tamanho da sequência
+    positions = len(results) - 1
+    chunks = [(start, min(start + chunk_size, positions), seed + index)
+              for index, start in enumerate(range(0, max(positions, 0), chunk_size))]
+    if not chunks:
+        return replay([], 0, 0)
+
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers == 1:
+        stream = new_stream(priors=priors, automaton=automaton)
+        parts = [replay(results, start, stop, chunk_seed, stream) for start, stop, chunk_seed in chunks]
+    else:
+        bounds = np.linspace(0, len(chunks), workers + 1).astype(int)
+        codes = np.fromiter((COLOR_CODES[r] for r in results), dtype=np.int8, count=len(results))
+        block = SharedMemory(create=True, size=len(codes))
+        try:
+            np.ndarray(len(codes), dtype=np.int8, buffer=block.buf)[:] = codes
+            tasks = [(block.name, len(codes), chunks[low:high], priors, automaton) for low, high in zip(bounds[:-1], bounds[1:])]
+            with Pool(workers) as pool:
+                parts = [part for span in pool.map(_replay_span, tasks) for part in span]
+        finally:
+            block.close()
+            block.unlink()
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+def _recommendation_table():
+    # get_recommendation para toda combinação (risco, manipulação, confiança 0..100)
+    table = np.zeros((len(LEVELS), len(LEVELS), 101), dtype=np.int8)
+    for r, risk in enumerate(LEVELS):
+        for m, manipulation in enumerate(LEVELS):
+            for confidence in range(101):
+                rec = get_recommendation(risk, manipulation, confidence)
+                table[r, m, confidence] = RECOMMENDATION_CODES[rec]
+    return table
+
+def _rate(hits, count):
+    return round(float(hits) / count, 4) if count else None
+
+def _score(colors, confidence, recommendations, actual):
+    made = colors >= 0
+    hits = made & (colors == actual)
+    decided = made & (actual != COLOR_CODES['E'])
+
+    calibration = []
+    for low in range(0, 100, 10):
+        high = 101 if low == 90 else low + 10
+        selected = made & (confidence >= low) & (confidence < high)
+        count = int(selected.sum())
+        calibration.append({
+            'range': f'{low}-{high - 1}',
+            'count': count,
+            'mean_confidence': round(float(confidence[selected].mean()), 2) if count else None,
+            'hit_rate': _rate(hits[selected].sum(), count)
+        })
+
+    outcomes = {}
+    for rec, code in RECOMMENDATION_CODES.items():
+        selected = made & (recommendations == code)
+        outcomes[rec] = {
+            'count': int(selected.sum()),
+            'hit_rate': _rate(hits[selected].sum(), selected.sum())
+        }
+
+    return {
+        'predictions': int(made.sum()),
+        'hits': int(hits.sum()),
+        'hit_rate': _rate(hits.sum(), made.sum()),
+        'hit_rate_excluding_empate': _rate((hits & decided).sum(), decided.sum()),
+        'calibration': calibration,
+        'recommendations': outcomes
+    }
+
+def summarize(records, results):
+    actual = np.array([COLOR_CODES[r] for r in results[1:]], dtype=np.int8)
+    report = {
+        'positions': len(actual),
+        'overall': _score(records['color'], records['confidence'], records['recommendation'], actual),
+        'layers': {}
+    }
+
+    # Recomendação que cada camada geraria sozinha, com o risco e a manipulação da posição
+    table = _recommendation_table()
+    for j, name in enumerate(LAYERS):
+        confidence = records['layer_confidence'][:, j]
+        recommendations = table[records['risk'], records['manipulation'], np.minimum(confidence, 100)]
+        report['layers'][name] = _score(records['layer_color'][:, j], confidence, recommendations, actual)
+    return report
+
+def format_report(report):
+    lines = [f"Posições avaliadas: {report['positions']}", '']
+    lines.append(f"{'camada':<10} {'previsões':>10} {'acerto':>8} {'sem E':>8}")
+    rows = [('conjunto', report['overall'])] + list(report['layers'].items())
+    for name, score in rows:
+        hit_rate = score['hit_rate'] if score['hit_rate'] is not None else float('nan')
+        decided = score['hit_rate_excluding_empate']
+        decided = decided if decided is not None else float('nan')
+        lines.append(f"{name:<10} {score['predictions']:>10} {hit_rate:>8.2%} {decided:>8.2%}")
+
+    lines += ['', 'Calibração (conjunto):']
+    for bucket in report['overall']['calibration']:
+        if bucket['count']:
+            lines.append(f"  {bucket['range']:>6}%: {bucket['count']:>8} previsões, "
+                         f"confiança média {bucket['mean_confidence']:.1f}%, acerto {bucket['hit_rate']:.2%}")
+
+    lines += ['', 'Recomendações (conjunto):']
+    for rec, outcome in report['overall']['recommendations'].items():
+        if outcome['count']:
+            lines.append(f"  {rec:<10} {outcome['count']:>8} posições, acerto {outcome['hit_rate']:.2%}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest walk-forward do sistema de análise preditiva')
+    parser.add_argument('path', help='sequência gravada: texto C/V/E, CSV ou segmento do registro')
+    parser.add_argument('--workers', type=int, default=None, help='processos (padrão: todos os núcleos)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=0, help='semente dos desempates aleatórios')
+    parser.add_argument('--priors', nargs='?', const=PRIORS_FILE, metavar='ARQUIVO',
+                        help=f'usa as prioris dos arquivos (padrão: {PRIORS_FILE}); só se não incluírem esta sequência')
+    parser.add_argument('--patterns', nargs='?', const=CUSTOM_PATTERNS_FILE, metavar='ARQUIVO',
+                        help=f'inclui os padrões do usuário (padrão: {CUSTOM_PATTERNS_FILE})')
+    parser.add_argument('--check', action='store_true',
+                        help='confere antes que a árvore de contextos não depende do carregamento em lotes')
+    parser.add_argument('--json', action='store_true', help='emite o relatório em JSON')
+    args = parser.parse_args()
+
+    codes, _ = load_file(args.path)
+    if args.check:
+        # Com o limite padrão e com um limite pequeno, que força podas frequentes
+        mismatches = contexto.check(codes) + contexto.check(codes, max_contexts=1024)
+        for mismatch in mismatches[:20]:
+            print('DIVERGÊNCIA', *mismatch)
+        if mismatches:
+            raise SystemExit(1)
+    priors = None
+    if args.priors:
+        priors = load_priors(args.priors)
+        if priors is None:
+            parser.error(f'arquivo de prioris não encontrado: {args.priors}')
+    automaton = catalogue_automaton(load_custom_patterns(args.patterns)) if args.patterns else None
+    results = decode(codes)
+    records = run_backtest(results, args.workers, args.chunk_size, args.seed, priors, automaton)
+    report = summarize(records, results)
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_report(report))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+# Armazenamento dos resultados em SQLite (modo WAL) para retenção longa, com a
+# mesma interface do registro em segmentos (registro.ResultLog): TableLog serve
+# de `log` para motor.Table. Todas as mesas ficam num único banco:
+#   tables(id, name, session)             sessão corrente de cada mesa
+#   results(table_id, seq, session, timestamp, code)
+# com chave primária (table_id, seq) e índice (table_id, timestamp), de modo que
+# finais por número de sequência e intervalos de horário são consultas por faixa
+# de índice. As gravações ficam num buffer e entram em lote (executemany numa
+# transação) a cada FLUSH_ROWS resultados ou FLUSH_INTERVAL segundos.
+#
+# Uso: python banco.py BANCO --import DIR_REGISTRO --table NOME
+#      python banco.py BANCO --table NOME [--start HORÁRIO] [--end HORÁRIO]
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from itertools import chain
+
+import numpy as np
+
+from registro import ResultLog
+
+DB_PATH = os.environ.get('PADRAO30_DB', 'padrao30.db')
+FLUSH_ROWS = 1000         # Resultados no buffer que disparam a gravação
+FLUSH_INTERVAL = 0.5      # Maior atraso de gravação de um resultado (s)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    session INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS results (
+    table_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    session INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    code INTEGER NOT NULL,
+    PRIMARY KEY (table_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_by_time ON results (table_id, timestamp);
+"""
+
+def _arrays(rows):
+    # Linhas (instante, código) -> (códigos int8, instantes int64)
+    if not rows:
+        return np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64)
+    data = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2)
+    return data[:, 1].astype(np.int8), data[:, 0].copy()
+
+class HistoryStore:
+    def __init__(self, path=DB_PATH, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._pending = []                 # (table_id, seq, session, instante, código) a gravar
+        self._next_seq = {}                # table_id -> próximo número de sequência
+        self._sessions = {}                # table_id -> sessão corrente
+        self._ids = {}                     # Nome -> id
+        self.discarded = 0                 # Resultados recusados pelo banco (não gravados)
+        self._closed = threading.Event()
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+
+    # Mesas
+    def table_id(self, name):
+        with self._lock:
+            table_id = self._ids.get(name)
+            if table_id is None:
+                self._db.execute('INSERT OR IGNORE INTO tables (name) VALUES (?)', (name,))
+                table_id, session = self._db.execute(
+                    'SELECT id, session FROM tables WHERE name = ?', (name,)
+                ).fetchone()
+                last = self._db.execute('SELECT MAX(seq) FROM results WHERE table_id = ?', (table_id,)).fetchone()[0]
+                self._ids[name] = table_id
+                self._next_seq[table_id] = 0 if last is None else last + 1
+                self._sessions[table_id] = session
+            return table_id
+
+    def tables(self):
+        with self._lock:
+            return [name for name, in self._db.execute('SELECT name FROM tables ORDER BY name')]
+
+    def session(self, name):
+        with self._lock:
+            return self._sessions[self.table_id(name)]
+
+    def log(self, name):
+        return TableLog(self, name)
+
+    # Gravação em lote
+    def extend(self, name, codes, timestamps):
+        with self._lock:
+            table_id = self.table_id(name)
+            session = self.session(name)
+            first = self._next_seq[table_id]
+            self._next_seq[table_id] = first + len(codes)
+            self._pending.extend(zip(
+                [table_id] * len(codes), range(first, first + len(codes)), [session] * len(codes),
+                np.asarray(timestamps, dtype=np.int64).tolist(), np.asarray(codes, dtype=np.int8).tolist()
+            ))
+            if len(self._pending) >= self.flush_rows:
+                self.flush()
+
+    def flush(self):
+        # Falha transitória (banco ocupado ou travado, disco cheio): o lote volta
+        # ao buffer, antes do que chegou depois, e o erro sobe. Números de
+        # sequência já usados (outro gravador na mesma mesa): o lote é renumerado
+        # a partir do maior seq do banco. Qualquer outro erro não se resolve
+        # tentando de novo: o lote é descartado e fica no log
+        with self._lock:
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            try:
+                try:
+                    self._insert(rows)
+                except sqlite3.IntegrityError:
+                    logger.warning('Sequência já usada em %s: renumerando %d resultados', self.path, len(rows))
+                    rows = self._insert(rows, renumber=True)
+            except sqlite3.OperationalError:
+                self._pending = rows + self._pending
+                raise
+            except sqlite3.Error:
+                self.discarded += len(rows)
+                logger.exception('Descartados %d resultados que %s recusou', len(rows), self.path)
+
+    def _insert(self, rows, renumber=False):
+        # Confirma a transação, ou a desfaz se o INSERT falhar. A renumeração
+        # acontece dentro dela, que trava o banco para outros gravadores
+        with self._db:
+            self._db.execute('BEGIN IMMEDIATE')
+            if renumber:
+                rows = self._renumber(rows)
+            self._db.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?)', rows)
+        return rows
+
+    def _renumber(self, rows):
+        # Sequências de cada mesa do lote a partir do maior seq gravado, na ordem
+        next_seq = {}
+        for table_id in {row[0] for row in rows}:
+            last = self._db.execute('SELECT MAX(seq) FROM results WHERE table_id = ?', (table_id,)).fetchone()[0]
+            next_seq[table_id] = 0 if last is None else last + 1
+        renumbered = []
+        for table_id, _, session, timestamp, code in rows:
+            renumbered.append((table_id, next_seq[table_id], session, timestamp, code))
+            next_seq[table_id] += 1
+        self._next_seq.update(next_seq)
+        return renumbered
+
+    def _flush_periodically(self):
+        # Uma falha de gravação fica no log e os resultados, no buffer; a thread
+        # continua e tenta de novo no próximo intervalo
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger.exception('Falha ao gravar %d resultados em %s', len(self._pending), self.path)
+
+    def roll_over(self, name):
+        # Nova sessão da mesa (reset_history); as anteriores continuam no banco
+        with self._lock:
+            self.flush()
+            table_id = self.table_id(name)
+            self._db.execute('UPDATE tables SET session = session + 1 WHERE id = ?', (table_id,))
+            self._sessions[table_id] += 1
+
+    # Consultas por faixa de índice
+    def load(self, name, session=None):
+        # (códigos, instantes) da sessão corrente (ou da indicada), em ordem
+        with self._lock:
+            self.flush()
+            session = self.session(name) if session is None else session
+            rows = self._db.execute(
+                'SELECT timestamp, code FROM results WHERE table_id = ? AND session = ? ORDER BY seq',
+                (self.table_id(name), session)
+            ).fetchall()
+        return _arrays(rows)
+
+    def window(self, name, size):
+        # Últimos `size` resultados da sessão corrente, pela chave (mesa, seq)
+        with self._lock:
+            self.flush()
+            rows = self._db.execute(
+                'SELECT timestamp, code FROM results WHERE table_id = ? AND session = ? '
+                'ORDER BY seq DESC LIMIT ?',
+                (self.table_id(name), self.session(name), size)
+            ).fetchall()
+        return _arrays(rows[::-1])
+
+    def query(self, name, start=None, end=None):
+        # Resultados da mesa (todas as sessões) com start <= instante < end, em ms
+        with self._lock:
+            self.flush()
+            rows = self._db.execute(
+                'SELECT timestamp, code FROM results INDEXED BY results_by_time '
+                'WHERE table_id = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp, seq',
+                (self.table_id(name), -2 ** 63 if start is None else start, 2 ** 63 - 1 if end is None else end)
+            ).fetchall()
+        return _arrays(rows)
+
+    def sessions(self, name):
+        # (sessão, primeiro seq, último seq + 1) de cada sessão da mesa, em ordem
+        with self._lock:
+            self.flush()
+            return self._db.execute(
+                'SELECT session, MIN(seq), MAX(seq) + 1 FROM results WHERE table_id = ? '
+                'GROUP BY session ORDER BY session', (self.table_id(name),)
+            ).fetchall()
+
+    def codes(self, name, first, stop):
+        # Códigos com first <= seq < stop, por faixa da chave primária
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT code FROM results WHERE table_id = ? AND seq >= ? AND seq < ? ORDER BY seq',
+                (self.table_id(name), first, stop)
+            ).fetchall()
+        return np.fromiter(chain.from_iterable(rows), dtype=np.int8, count=len(rows))
+
+    def count(self, name, session=None):
+        with self._lock:
+            self.flush()
+            if session is None:
+                sql, args = 'SELECT COUNT(*) FROM results WHERE table_id = ?', (self.table_id(name),)
+            else:
+                sql, args = 'SELECT COUNT(*) FROM results WHERE table_id = ? AND session = ?', (self.table_id(name), session)
+            return self._db.execute(sql, args).fetchone()[0]
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self.flush()
+            self._db.close()
+
+class TableLog:
+    # Visão de uma mesa do banco com a interface de registro.ResultLog
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        store.table_id(name)
+
+    def append(self, code, timestamp):
+        self.extend(np.array([code], dtype=np.int8), np.array([timestamp], dtype=np.int64))
+
+    def extend(self, codes, timestamps):
+        self.store.extend(self.name, codes, timestamps)
+
+    def load(self):
+        return self.store.load(self.name)
+
+    def roll_over(self):
+        self.store.roll_over(self.name)
+
+    def close(self):
+        self.store.flush()
+
+def import_log(store, name, directory):
+    # Copia os segmentos de um registro em disco, cada um como uma sessão da mesa
+    log = ResultLog(directory)
+    try:
+        for i, segment in enumerate(log.segments()):
+            if i:
+                store.roll_over(name)
+            codes, timestamps = log.load(segment)
+            store.extend(name, np.array(codes), np.array(timestamps))
+        store.flush()
+    finally:
+        log.close()
+
+def main():
+    from importacao import _parse_timestamp
+
+    parser = argparse.ArgumentParser(description='Histórico de resultados em SQLite')
+    parser.add_argument('path', help='arquivo do banco')
+    parser.add_argument('--table', required=True, help='nome da mesa')
+    parser.add_argument('--import', dest='import_dir', help='diretório de registro (segmentos .seg) a importar')
+    parser.add_argument('--start', help='início do intervalo (ms ou ISO 8601)')
+    parser.add_argument('--end', help='fim do intervalo, exclusivo (ms ou ISO 8601)')
+    args = parser.parse_args()
+
+    store = HistoryStore(args.path)
+    try:
+        if args.import_dir:
+            import_log(store, args.table, args.import_dir)
+            print(f'{store.count(args.table)} resultados na mesa {args.table}')
+            return
+        start = time.perf_counter()
+        codes, timestamps = store.query(
+            args.table,
+            None if args.start is None else _parse_timestamp(args.start),
+            None if args.end is None else _parse_timestamp(args.end)
+        )
+        elapsed = time.perf_counter() - start
+        counts = np.bincount(codes, minlength=3)
+        print(f'{len(codes)} resultados (C={counts[0]} V={counts[1]} E={counts[2]}) em {elapsed * 1000:.1f} ms')
+    finally:
+        store.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# Benchmarks reprodutíveis de cada detector, de cada camada de previsão e da
+# análise completa, sobre sequências sintéticas de tamanhos crescentes.
+#
+# Uso: python benchmark.py [--sizes 27 1000 100000 1000000] [--save base.json]
+#                          [--compare base.json [--tolerance 1.25]]
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+import nucleo
+from nucleo import new_stream, stream_push, stream_features, extract_features
+
+SIZES = (27, 1000, 100000, 1000000)
+PROBABILITIES = (0.45, 0.45, 0.10)   # C, V, E
+SEED = 30
+MIN_TIME = 0.05     # Tempo mínimo de cada medição (repete a chamada até atingi-lo)
+REPEAT = 5
+TOLERANCE = 1.25    # Razão máxima tempo atual / base antes de acusar regressão
+
+def synthetic_sequence(size, seed=SEED, probabilities=PROBABILITIES):
+    rng = random.Random(seed)
+    return rng.choices('CVE', weights=probabilities, k=size)
+
+def cases(results):
+    # (nome, função sem argumentos) para cada etapa medida
+    features = extract_features(results)
+    codes = np.array([nucleo.COLOR_CODES[result] for result in results], dtype=np.int8)
+    patterns = nucleo.detect_patterns(features)
+    risk_level = nucleo.assess_risk(features)
+
+    def stream_replay():
+        stream = new_stream()
+        for result in results:
+            stream_push(stream, result)
+        return stream_features(stream)
+
+    return [
+        ('extract_features', lambda: extract_features(results)),
+        ('stream_replay', stream_replay),
+        ('pattern_scan', lambda: nucleo.AUTOMATON.matches(codes)),
+        ('detect_basic_patterns', lambda: nucleo.detect_basic_patterns(features)),
+        ('detect_markov_patterns', lambda: nucleo.detect_markov_patterns(features)),
+        ('detect_cycles', lambda: nucleo.detect_cycles(features)),
+        ('detect_quantum_patterns', lambda: nucleo.detect_quantum_patterns(features)),
+        ('assess_risk', lambda: nucleo.assess_risk(features)),
+        ('detect_manipulation', lambda: nucleo.detect_manipulation(features)),
+        ('markov_prediction', lambda: nucleo.markov_prediction(features)),
+        ('entropy_prediction', lambda: nucleo.entropy_prediction(features)),
+        ('pattern_based_prediction', lambda: nucleo.pattern_based_prediction(features, patterns)),
+        ('cycle_based_prediction', lambda: nucleo.cycle_based_prediction(features)),
+        ('trend_analysis_prediction', lambda: nucleo.trend_analysis_prediction(features)),
+        ('quantum_simulation_prediction', lambda: nucleo.quantum_simulation_prediction(features)),
+        ('risk_based_prediction', lambda: nucleo.risk_based_prediction(features, risk_level)),
+        ('meta_analysis_prediction', lambda: nucleo.meta_analysis_prediction(features)),
+        ('simulated_rf_prediction', lambda: nucleo.simulated_rf_prediction(features)),
+        ('analyze_data', lambda: nucleo.analyze_data(features)),
+        ('analyze_data_end_to_end', lambda: nucleo.analyze_data(extract_features(results)))
+    ]
+
+def measure(function, min_time=MIN_TIME, repeat=REPEAT):
+    # Calibra o número de chamadas por medição e devolve o tempo por chamada
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        timings.append((time.perf_counter() - start) / loops)
+    return {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'loops': loops
+    }
+
+def run(sizes=SIZES, seed=SEED, min_time=MIN_TIME, repeat=REPEAT, log=sys.stderr):
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'probabilities': PROBABILITIES
+        },
+        'results': {}
+    }
+    for size in sizes:
+        results = synthetic_sequence(size, seed)
+        timings = {}
+        for name, function in cases(results):
+            random.seed(seed)  # Desempates aleatórios das camadas
+            timings[name] = measure(function, min_time, repeat)
+            print(f"{size:>9} {name:<30} {timings[name]['median_s'] * 1e6:>14.1f} µs", file=log)
+        report['results'][str(size)] = timings
+    return report
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    # Lista (tamanho, etapa, base, atual, razão) das etapas acima da tolerância
+    regressions = []
+    for size, timings in report['results'].items():
+        for name, timing in timings.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if base and base['median_s'] > 0:
+                ratio = timing['median_s'] / base['median_s']
+                if ratio > tolerance:
+                    regressions.append((size, name, base['median_s'], timing['median_s'], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks das camadas de análise')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--min-time', type=float, default=MIN_TIME)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--save', help='grava o resultado como base (JSON)')
+    parser.add_argument('--compare', help='base (JSON) para detectar regressões')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.seed, args.min_time, args.repeat)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for size, name, base, current, ratio in regressions:
+            print(f"REGRESSÃO {size:>9} {name:<30} {base * 1e6:.1f} µs -> {current * 1e6:.1f} µs "
+                  f"({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
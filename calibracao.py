@@ -0,0 +1,307 @@
+# Calibração dos limiares por Monte Carlo: gera milhões de janelas aleatórias
+# (C/V/E independentes, probabilidades configuráveis), calcula em lotes NumPy as
+# mesmas estatísticas dos detectores (uma linha por janela) e mede com que
+# frequência cada gatilho dispara sem haver padrão algum (taxa de falsos positivos).
+# As distribuições nulas ficam em histogramas somáveis, o que permite dividir o
+# trabalho entre processos e sugerir limiares para uma taxa-alvo.
+#
+# Uso: python calibracao.py [--samples 1000000] [--probabilities 0.45 0.45 0.10]
+#                           [--window 27] [--workers N] [--check 500] [--json]
+import argparse
+import json
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+import nucleo
+import linha_tempo
+from nucleo import COLORS, COLOR_CODES, WINDOW_SIZE, MAX_LAG, MARKOV_ORDER
+
+SAMPLES = 1000000
+BATCH_SIZE = 20000
+PROBABILITIES = (0.45, 0.45, 0.10)   # C, V, E
+SEED = 30
+TARGET_RATES = (0.05, 0.01)          # Taxas de falso positivo para os limiares sugeridos
+BENFORD = np.array([0] + [nucleo.BENFORD_LAW[digit] for digit in range(1, 10)])
+C, V, E = (COLOR_CODES[color] for color in COLORS)
+
+# Estatística -> (limites do histograma, gatilho: limiar e se dispara com >= ou >)
+STATISTICS = {
+    'entropy': (np.linspace(0, np.log2(3), 1001), nucleo.HIGH_ENTROPY, '>'),
+    'markov_probability': (np.linspace(0, 1, 1001), nucleo.MARKOV_THRESHOLD, '>'),
+    'cycle_correlation': (np.linspace(0, 1, 1001), nucleo.CYCLE_THRESHOLD, '>'),
+    'benford_chi_square': (np.linspace(0, 200, 2001), nucleo.BENFORD_THRESHOLD, '>'),
+    'risk_score': (np.arange(0, 401) - 0.5, nucleo.RISK_MEDIUM, '>='),
+    'manipulation_score': (np.arange(0, 401) - 0.5, nucleo.MANIPULATION_MEDIUM, '>=')
+}
+# Gatilhos além do limiar principal de cada estatística
+EXTRA_TRIGGERS = {
+    'risk_high': ('risk_score', nucleo.RISK_HIGH, '>='),
+    'manipulation_high': ('manipulation_score', nucleo.MANIPULATION_HIGH, '>=')
+}
+
+def random_windows(rng, count, window, probabilities):
+    return rng.choice(len(COLORS), size=(count, window), p=probabilities).astype(np.int8)
+
+def _entropy(counts, n):
+    p = counts / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -np.where(p > 0, p * np.log2(p), 0).sum(axis=1)
+
+def _cycle_correlation(x, max_lag):
+    # max |correlação| nas defasagens 1..max_lag, como autocorrelacao.correlations_from_sums
+    best = np.zeros(len(x))
+    n = x.shape[1]
+    for lag in range(1, max_lag + 1):
+        a, b = x[:, :-lag], x[:, lag:]
+        m = n - lag
+        s1, s2 = a.sum(axis=1), b.sum(axis=1)
+        var1 = m * (a * a).sum(axis=1) - s1 * s1
+        var2 = m * (b * b).sum(axis=1) - s2 * s2
+        defined = (var1 > 0) & (var2 > 0)
+        numerator = m * (a * b).sum(axis=1) - s1 * s2
+        corr = np.zeros(len(x))
+        corr[defined] = np.abs(numerator[defined]) / np.sqrt(var1[defined].astype(np.float64) * var2[defined])
+        best = np.maximum(best, corr)
+    return best
+
+def _markov_probability(codes, order):
+    # Maior probabilidade de transição a partir do estado final (ordem 2), na janela
+    n = codes.shape[1]
+    states = np.zeros((len(codes), n - order), dtype=np.int64)
+    for k in range(order):
+        states = states * 3 + codes[:, k:n - order + k]
+    current = (codes[:, n - order:].astype(np.int64) * (3 ** np.arange(order - 1, -1, -1))).sum(axis=1)
+    matches = states == current[:, None]
+    following = codes[:, order:]
+    counts = np.stack([(matches & (following == code)).sum(axis=1) for code in (C, V, E)], axis=1)
+    total = counts.sum(axis=1)
+    return np.where(total > 0, counts.max(axis=1) / np.maximum(total, 1), 0.0)
+
+def statistics(codes, max_lag=MAX_LAG, order=MARKOV_ORDER):
+    # Estatísticas dos detectores para cada janela (linha) de codes
+    rows, n = codes.shape
+    counts = np.stack([(codes == code).sum(axis=1) for code in (C, V, E)], axis=1)
+    c_count, v_count, e_count = counts.T.astype(np.int64)
+    entropy = _entropy(counts, n)
+    numeric = np.select([codes == C, codes == V], [1, -1], 0).astype(np.int64)
+
+    # Sequências: tamanho corrente por coluna, maiores de cor e de empates, mudanças
+    run = np.ones(rows, dtype=np.int64)
+    max_streak = np.where(codes[:, 0] != E, 1, 0)
+    empate_streak = np.where(codes[:, 0] == E, 1, 0)
+    changes = np.zeros(rows, dtype=np.int64)
+    previous_e = np.where(codes[:, 0] == E, 0, -1)
+    e_intervals = np.zeros(rows, dtype=np.int64)
+    e_sum = np.zeros(rows)
+    e_sum_sq = np.zeros(rows)
+    for j in range(1, n):
+        same = codes[:, j] == codes[:, j - 1]
+        changes += ~same
+        run = np.where(same, run + 1, 1)
+        is_e = codes[:, j] == E
+        max_streak = np.where(~is_e, np.maximum(max_streak, run), max_streak)
+        empate_streak = np.where(is_e, np.maximum(empate_streak, run), empate_streak)
+        gap = is_e & (previous_e >= 0)
+        interval = j - previous_e
+        e_intervals += gap
+        e_sum += np.where(gap, interval, 0)
+        e_sum_sq += np.where(gap, interval * interval, 0)
+        previous_e = np.where(is_e, j, previous_e)
+    max_streak = np.maximum(max_streak, 1)   # Janela só de empates conta 1, como no detector
+
+    # Final alternado (limitado ao maior final das features)
+    alternating = np.ones(rows, dtype=np.int64)
+    open_tail = np.ones(rows, dtype=bool)
+    for i in range(2, min(n, nucleo.TAIL_LENGTHS[-1]) + 1):
+        open_tail &= codes[:, n - i] != codes[:, n - i + 1]
+        alternating += open_tail
+
+    # Risco (assess_risk): sinais da janela pontuados por nucleo.risk_points
+    decided = c_count + v_count
+    imbalance = np.where(decided > 0, np.abs(c_count - v_count) / np.maximum(decided, 1), 0)
+    z_score = np.full(rows, np.nan)
+    if n >= nucleo.RUNS_MIN_RESULTS:
+        n1, n2 = c_count.astype(np.float64), v_count.astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected_runs = 2 * n1 * n2 / (n1 + n2) + 1
+            std_dev = np.sqrt(2 * n1 * n2 * (2 * n1 * n2 - n1 - n2) / ((n1 + n2) ** 2 * (n1 + n2 - 1)))
+            z_score = np.where((decided > 1) & (std_dev != 0), (changes + 1 - expected_runs) / std_dev, np.nan)
+    risk = nucleo.risk_points(entropy, imbalance, z_score, max_streak, empate_streak)
+
+    # Manipulação (detect_manipulation), incluindo o teste de Benford, por nucleo.manipulation_points
+    inversion = np.zeros(rows, dtype=bool)
+    if n >= nucleo.INVERSION_MIN_RESULTS:
+        first_c = (codes[:, -8:-4] == C).sum(axis=1)
+        first_v = (codes[:, -8:-4] == V).sum(axis=1)
+        second_c = (codes[:, -4:] == C).sum(axis=1)
+        second_v = (codes[:, -4:] == V).sum(axis=1)
+        inversion = (first_c - first_v) * (second_c - second_v) < 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = e_sum / e_intervals
+        std = np.sqrt(np.maximum(e_sum_sq / e_intervals - mean * mean, 0))
+    empate_std = np.where(e_intervals >= nucleo.EMPATE_REGULARITY_MIN - 1, std, np.nan)
+
+    chi_square = np.zeros(rows)
+    if n >= nucleo.BENFORD_MIN_RESULTS:
+        digits = np.array([int(str(i)[0]) for i in range(n)])
+        one_hot = (digits[:, None] == np.arange(10)).astype(np.float64)
+        observed = (codes != E).astype(np.float64) @ one_hot
+        expected = BENFORD[None, :] * observed.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = np.where(expected[:, 1:] > 0, (observed[:, 1:] - expected[:, 1:]) ** 2 / expected[:, 1:], 0)
+        chi_square = terms.sum(axis=1)
+    manipulation = nucleo.manipulation_points(
+        e_count / n,
+        alternating if n >= nucleo.ALTERNATING_MIN_RESULTS else 0,
+        inversion,
+        empate_std,
+        chi_square if n >= nucleo.BENFORD_MIN_RESULTS else np.nan
+    )
+
+    return {
+        'entropy': entropy,
+        'markov_probability': _markov_probability(codes, order) if n > order else np.zeros(rows),
+        'cycle_correlation': _cycle_correlation(numeric, min(max_lag, n // 2)) if n >= 8 else np.zeros(rows),
+        'benford_chi_square': chi_square,
+        'risk_score': risk,
+        'manipulation_score': manipulation
+    }
+
+def _fires(values, threshold, comparison):
+    return values >= threshold if comparison == '>=' else values > threshold
+
+def _calibrate_chunk(args):
+    samples, window, probabilities, batch_size, seed = args
+    rng = np.random.default_rng(seed)
+    histograms = {name: np.zeros(len(edges) - 1, dtype=np.int64) for name, (edges, _, _) in STATISTICS.items()}
+    fired = {name: 0 for name in (*STATISTICS, *EXTRA_TRIGGERS)}
+    done = 0
+    while done < samples:
+        count = min(batch_size, samples - done)
+        values = statistics(random_windows(rng, count, window, probabilities))
+        for name, (edges, threshold, comparison) in STATISTICS.items():
+            histograms[name] += np.histogram(np.clip(values[name], edges[0], edges[-1]), edges)[0]
+            fired[name] += int(_fires(values[name], threshold, comparison).sum())
+        for name, (statistic, threshold, comparison) in EXTRA_TRIGGERS.items():
+            fired[name] += int(_fires(values[statistic], threshold, comparison).sum())
+        done += count
+    return histograms, fired
+
+def suggested_threshold(histogram, edges, rate):
+    # Menor limite de classe cuja cauda superior não passa de `rate`
+    tail = np.cumsum(histogram[::-1])[::-1] / histogram.sum()
+    above = np.flatnonzero(tail <= rate)
+    return float(edges[above[0]]) if len(above) else None
+
+def run_calibration(samples=SAMPLES, probabilities=PROBABILITIES, window=WINDOW_SIZE,
+                    batch_size=BATCH_SIZE, workers=None, seed=SEED):
+    workers = workers or os.cpu_count() or 1
+    tasks = min(workers, -(-samples // batch_size))
+    seeds = np.random.SeedSequence(seed).spawn(tasks)
+    shares = [samples // tasks + (i < samples % tasks) for i in range(tasks)]
+    args = [(share, window, probabilities, batch_size, s) for share, s in zip(shares, seeds)]
+    if tasks > 1:
+        with Pool(tasks) as pool:
+            chunks = pool.map(_calibrate_chunk, args)
+    else:
+        chunks = [_calibrate_chunk(arg) for arg in args]
+
+    report = {
+        'samples': samples,
+        'window': window,
+        'probabilities': list(probabilities),
+        'triggers': {}
+    }
+    triggers = {name: (name, threshold, comparison) for name, (_, threshold, comparison) in STATISTICS.items()}
+    triggers.update(EXTRA_TRIGGERS)
+    for name, (statistic, threshold, comparison) in triggers.items():
+        histogram = sum(chunk[0][statistic] for chunk in chunks)
+        edges = STATISTICS[statistic][0]
+        report['triggers'][name] = {
+            'statistic': statistic,
+            'threshold': threshold,
+            'comparison': comparison,
+            'false_positive_rate': sum(chunk[1][name] for chunk in chunks) / samples,
+            'suggested': {str(rate): suggested_threshold(histogram, edges, rate) for rate in TARGET_RATES}
+        }
+    return report
+
+def check(samples=500, probabilities=PROBABILITIES, window=WINDOW_SIZE, seed=SEED):
+    # Confere as estatísticas vetorizadas com os detectores do núcleo; devolve divergências
+    codes = random_windows(np.random.default_rng(seed), samples, window, probabilities)
+    values = statistics(codes)
+    levels = lambda score, high, medium: 'high' if score >= high else 'medium' if score >= medium else 'low'
+    mismatches = []
+    for i, row in enumerate(codes):
+        features = nucleo.extract_features([COLORS[code] for code in row])
+        state = tuple(features['results'][-MARKOV_ORDER:])
+        counts = features['transitions'].get(state)
+        expected = {
+            'entropy': features['entropy'],
+            'markov_probability': max(counts.values()) / sum(counts.values()) if counts else 0.0,
+            'cycle_correlation': abs(features['cycle'][1]),
+            'risk': nucleo.assess_risk(features),
+            'manipulation': nucleo.detect_manipulation(features)
+        }
+        actual = {
+            'entropy': values['entropy'][i],
+            'markov_probability': values['markov_probability'][i],
+            'cycle_correlation': values['cycle_correlation'][i],
+            'risk': levels(values['risk_score'][i], nucleo.RISK_HIGH, nucleo.RISK_MEDIUM),
+            'manipulation': levels(values['manipulation_score'][i], nucleo.MANIPULATION_HIGH,
+                                   nucleo.MANIPULATION_MEDIUM)
+        }
+        for name in expected:
+            if isinstance(expected[name], str):
+                equal = expected[name] == actual[name]
+            else:
+                equal = abs(expected[name] - actual[name]) < 1e-9
+            if not equal:
+                mismatches.append((i, name, expected[name], actual[name]))
+    return mismatches
+
+def format_report(report):
+    lines = [
+        f"Janelas aleatórias: {report['samples']} x {report['window']} "
+        f"(C/V/E = {'/'.join(f'{p:.2f}' for p in report['probabilities'])})",
+        '',
+        f"{'gatilho':<22} {'limiar':>10} {'falsos positivos':>17}   sugerido "
+        + ' '.join(f'{float(rate):.0%}' for rate in TARGET_RATES)
+    ]
+    for name, trigger in report['triggers'].items():
+        suggested = ' '.join('—' if value is None else f'{value:g}' for value in trigger['suggested'].values())
+        lines.append(f"{name:<22} {trigger['comparison']:>3}{trigger['threshold']:>7g} "
+                     f"{trigger['false_positive_rate']:>16.2%}   {suggested}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibração dos limiares por Monte Carlo')
+    parser.add_argument('--samples', type=int, default=SAMPLES)
+    parser.add_argument('--probabilities', type=float, nargs=3, default=list(PROBABILITIES),
+                        metavar=('C', 'V', 'E'))
+    parser.add_argument('--window', type=int, default=WINDOW_SIZE)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--check', type=int, metavar='N',
+                        help='confere N janelas (e a linha do tempo) com os detectores do núcleo antes de calibrar')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    probabilities = np.array(args.probabilities) / sum(args.probabilities)
+    if args.check:
+        mismatches = check(args.check, probabilities, args.window, args.seed)
+        mismatches += linha_tempo.check(window=args.window, seed=args.seed)
+        for mismatch in mismatches[:20]:
+            print('DIVERGÊNCIA', *mismatch)
+        if mismatches:
+            raise SystemExit(1)
+
+    report = run_calibration(args.samples, tuple(probabilities), args.window, args.batch_size,
+                             args.workers, args.seed)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# Árvore de contextos (Markov de ordem variável) sobre todo o histórico: para cada
+# sufixo de até max_order resultados, as contagens do resultado seguinte.
+# Um contexto de ordem k é um inteiro (k dígitos em base 3, o resultado mais
+# recente como dígito menos significativo, somados ao deslocamento da ordem), de
+# modo que inserir um resultado ou consultar todas as ordens custa O(k).
+# Acima de max_contexts, os contextos mais raros são podados, mas só quando o
+# total de resultados é múltiplo de PRUNE_INTERVAL: push e extend (que divide o
+# lote nessas mesmas fronteiras) chegam sempre à mesma árvore, seja a sessão
+# digitada, importada ou restaurada do registro.
+from collections import deque
+
+import numpy as np
+
+CONTEXT_ORDER = 8        # Maior ordem de contexto mantida
+MAX_CONTEXTS = 16384     # Contextos mantidos antes da poda (até a ordem 8 há 9841)
+PRUNE_TARGET = 0.75      # Fração de max_contexts que resta após a poda
+PRUNE_INTERVAL = 1024    # A poda só é avaliada a cada PRUNE_INTERVAL resultados
+SYMBOLS = 3              # C, V, E (códigos 0, 1, 2)
+
+class ContextTree:
+    def __init__(self, max_order=CONTEXT_ORDER, max_contexts=MAX_CONTEXTS, prune_interval=PRUNE_INTERVAL):
+        self.max_order = max_order
+        self.max_contexts = max_contexts
+        self.prune_interval = prune_interval
+        # Contextos de ordem menor que k ocupam as chaves 0 .. (3^k - 1) / 2 - 1
+        self.offsets = [(SYMBOLS ** k - 1) // 2 for k in range(max_order + 2)]
+        self.counts = {}                          # Contexto -> [C, V, E] seguintes
+        self.recent = deque(maxlen=max_order)     # Últimos códigos (o mais recente à direita)
+        self.total = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _keys(self):
+        # Chaves dos contextos de ordem 0..k que terminam no resultado atual
+        keys = [0]
+        recent = self.recent
+        value = 0
+        weight = 1
+        for k in range(1, len(recent) + 1):
+            value += recent[-k] * weight
+            weight *= SYMBOLS
+            keys.append(self.offsets[k] + value)
+        return keys
+
+    def push(self, code):
+        counts = self.counts
+        for key in self._keys():
+            node = counts.get(key)
+            if node is None:
+                counts[key] = node = [0, 0, 0]
+            node[code] += 1
+        self.recent.append(code)
+        self.total += 1
+        self._maybe_prune()
+
+    def _maybe_prune(self):
+        if self.total % self.prune_interval == 0 and len(self.counts) > self.max_contexts:
+            self.prune()
+
+    def extend(self, codes):
+        # Inserção em lote em trechos que terminam nas fronteiras de poda, para
+        # podar nos mesmos pontos que uma sequência de push
+        codes = np.asarray(codes, dtype=np.int64)
+        start = 0
+        while start < len(codes):
+            stop = min(len(codes), start + self.prune_interval - self.total % self.prune_interval)
+            self._extend_counts(codes[start:stop])
+            self._maybe_prune()
+            start = stop
+
+    def _extend_counts(self, codes):
+        # Inserção vetorizada: cada ordem é uma contagem de pares
+        # (contexto, próximo) com np.unique, em vez de um push por resultado
+        start = len(self.recent)
+        history = np.concatenate([np.fromiter(self.recent, dtype=np.int64, count=start), codes])
+        positions = np.arange(start, len(history))
+        values = np.zeros(len(codes), dtype=np.int64)
+        weight = 1
+        counts = self.counts
+        for k in range(self.max_order + 1):
+            valid = positions >= k
+            if k:
+                values[valid] += history[positions[valid] - k] * weight
+                weight *= SYMBOLS
+            pairs = (self.offsets[k] + values[valid]) * SYMBOLS + codes[valid]
+            if not len(pairs):
+                break
+            unique, occurrences = np.unique(pairs, return_counts=True)
+            for pair, count in zip(unique.tolist(), occurrences.tolist()):
+                key, code = divmod(pair, SYMBOLS)
+                node = counts.get(key)
+                if node is None:
+                    counts[key] = node = [0, 0, 0]
+                node[code] += count
+        self.recent.extend(codes[-self.max_order:].tolist() if self.max_order else [])
+        self.total += len(codes)
+
+    def prune(self):
+        # Remove os contextos menos observados (ordem >= 2, os mais longos primeiro
+        # nos empates) até restar PRUNE_TARGET do limite; ordens 0 e 1 ficam sempre
+        target = int(self.max_contexts * PRUNE_TARGET)
+        protected = self.offsets[min(2, self.max_order + 1)]
+        candidates = [(sum(node), -key) for key, node in self.counts.items() if key >= protected]
+        candidates.sort()
+        for _, key in candidates[:max(0, len(self.counts) - target)]:
+            del self.counts[-key]
+
+    def checkpoint(self):
+        # Estado para desfazer o próximo push: os nós que ele vai tocar, ou o
+        # dicionário inteiro se o push puder disparar a poda
+        full = ((self.total + 1) % self.prune_interval == 0
+                and len(self.counts) + self.max_order + 1 > self.max_contexts)
+        if full:
+            nodes = {key: list(node) for key, node in self.counts.items()}
+        else:
+            nodes = {key: list(self.counts[key]) if key in self.counts else None for key in self._keys()}
+        return full, nodes, tuple(self.recent), self.total
+
+    def rollback(self, state):
+        full, nodes, recent, self.total = state
+        if full:
+            self.counts = nodes
+        else:
+            for key, node in nodes.items():
+                if node is None:
+                    self.counts.pop(key, None)
+                else:
+                    self.counts[key] = node
+        self.recent.clear()
+        self.recent.extend(recent)
+
+    def lookup(self):
+        # Contagens (C, V, E) do próximo resultado para cada ordem 0..k no ponto
+        # atual; None onde o contexto nunca foi visto (ou foi podado)
+        get = self.counts.get
+        return [tuple(node) if node else None for node in map(get, self._keys())]
+
+def check(codes, max_contexts=MAX_CONTEXTS, seed=0):
+    # Confere que push a push e extend em lotes de tamanhos aleatórios chegam à
+    # mesma árvore; devolve (posição, ordem, contagens por push, por extend) das
+    # consultas divergentes, no final e em cada fronteira de lote
+    codes = np.asarray(codes, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    pushed = ContextTree(max_contexts=max_contexts)
+    extended = ContextTree(max_contexts=max_contexts)
+    mismatches = []
+    start = 0
+    while start < len(codes):
+        stop = min(len(codes), start + int(rng.integers(1, 3 * PRUNE_INTERVAL)))
+        for code in codes[start:stop].tolist():
+            pushed.push(code)
+        extended.extend(codes[start:stop])
+        for order, (a, b) in enumerate(zip(pushed.lookup(), extended.lookup())):
+            if a != b:
+                mismatches.append((stop, order, a, b))
+        if pushed.counts != extended.counts:
+            mismatches.append((stop, None, len(pushed), len(extended)))
+        start = stop
+    return mismatches
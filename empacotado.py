@@ -0,0 +1,128 @@
+# Resultados empacotados em 2 bits (C=0, V=1, E=2), 32 por palavra uint64: o
+# resultado p ocupa os bits 2*(p % 32) e 2*(p % 32) + 1 da palavra p // 32.
+# É o armazenamento dos códigos do histórico (historico.History): as sequências
+# são calculadas com operações bit a bit sobre palavras inteiras, sem percorrer
+# resultado por resultado. Um milhão de resultados ocupa 250 KB.
+import numpy as np
+
+FIELDS = 32                                   # Resultados por palavra
+LOW = np.uint64(0x5555555555555555)           # Bit baixo de cada campo
+SHIFTS = np.arange(0, 64, 2, dtype=np.uint64)
+INITIAL_WORDS = 32
+
+if hasattr(np, 'bitwise_count'):
+    popcount = np.bitwise_count
+else:
+    _POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        return _POPCOUNT8[np.ascontiguousarray(words).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def pack(codes):
+    codes = np.asarray(codes, dtype=np.uint64)
+    padded = np.zeros(-(-len(codes) // FIELDS) * FIELDS, dtype=np.uint64)
+    padded[:len(codes)] = codes
+    return np.bitwise_or.reduce(padded.reshape(-1, FIELDS) << SHIFTS, axis=1)
+
+def unpack(words, size):
+    fields = (np.asarray(words, dtype=np.uint64)[:, None] >> SHIFTS) & np.uint64(3)
+    return fields.reshape(-1)[:size].astype(np.int8)
+
+def _positions(flags, size):
+    # Posições dos campos com o bit baixo ligado
+    bits = np.unpackbits(np.ascontiguousarray(flags).view(np.uint8), bitorder='little')
+    positions = np.flatnonzero(bits[0::2])
+    return positions[positions < size]
+
+def _last_position(flags):
+    # Última posição com o bit baixo ligado, ou -1
+    nonzero = np.flatnonzero(flags)
+    if not len(nonzero):
+        return -1
+    word = int(nonzero[-1])
+    return word * FIELDS + (int(flags[word]).bit_length() - 1) // 2
+
+class PackedResults:
+    def __init__(self, capacity=INITIAL_WORDS * FIELDS):
+        self._words = np.zeros(max(1, -(-capacity // FIELDS)), dtype=np.uint64)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def words(self):
+        # Visão das palavras em uso (campos além do tamanho valem zero)
+        return self._words[:-(-self._size // FIELDS)]
+
+    def _reserve(self, extra):
+        needed = -(-(self._size + extra) // FIELDS)
+        if needed > len(self._words):
+            words = np.zeros(max(needed, 2 * len(self._words)), dtype=np.uint64)
+            words[:len(self._words)] = self._words
+            self._words = words
+
+    def append(self, code):
+        self._reserve(1)
+        word, field = divmod(self._size, FIELDS)
+        self._words[word] |= np.uint64(code << (2 * field))
+        self._size += 1
+
+    def extend(self, codes):
+        codes = np.asarray(codes, dtype=np.int8)
+        self._reserve(len(codes))
+        # A palavra parcial do final é reempacotada junto com os novos códigos
+        start = self._size - self._size % FIELDS
+        merged = np.concatenate([self.codes(start), codes])
+        packed = pack(merged)
+        self._words[start // FIELDS:start // FIELDS + len(packed)] = packed
+        self._size += len(codes)
+
+    def codes(self, start=0, stop=None):
+        # Códigos int8 de start a stop (desempacotando só as palavras necessárias)
+        stop = self._size if stop is None else min(stop, self._size)
+        start = max(0, min(start, stop))
+        first = start // FIELDS
+        fields = unpack(self._words[first:-(-stop // FIELDS)], stop - first * FIELDS)
+        return fields[start - first * FIELDS:]
+
+    def _valid(self):
+        # Máscara de bits baixos dos campos em uso, por palavra
+        valid = np.full(len(self.words), LOW)
+        if self._size % FIELDS:
+            valid[-1] &= np.uint64((1 << (2 * (self._size % FIELDS))) - 1)
+        return valid
+
+    def change_flags(self):
+        # Bit baixo ligado nos campos diferentes do anterior (a posição 0 nunca)
+        words = self.words
+        previous = np.concatenate([np.zeros(1, dtype=np.uint64), words[:-1]])
+        x = words ^ ((words << np.uint64(2)) | (previous >> np.uint64(62)))
+        flags = (x | (x >> np.uint64(1))) & self._valid()
+        if len(flags):
+            flags[0] &= ~np.uint64(1)
+        return flags
+
+    def tail_run(self):
+        # Tamanho da sequência final de resultados iguais
+        return self._size - max(0, _last_position(self.change_flags()))
+
+    def runs(self):
+        # (códigos, tamanhos) de cada sequência, em ordem
+        if not self._size:
+            return np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64)
+        starts = np.concatenate([[0], _positions(self.change_flags(), self._size)])
+        lengths = np.diff(np.append(starts, self._size))
+        words = self._words[starts // FIELDS]
+        colors = (words >> (2 * (starts % FIELDS)).astype(np.uint64)) & np.uint64(3)
+        return colors.astype(np.int8), lengths
+
+    def max_run(self, code=None, exclude=None):
+        # Maior sequência (só de code, ou de qualquer código exceto exclude)
+        colors, lengths = self.runs()
+        selected = np.ones(len(colors), dtype=bool)
+        if code is not None:
+            selected &= colors == code
+        if exclude is not None:
+            selected &= colors != exclude
+        return int(lengths[selected].max()) if selected.any() else 0
@@ -0,0 +1,90 @@
+# Histórico compacto de resultados: códigos empacotados em 2 bits (C=0, V=1,
+# E=2; ver empacotado.py) e instantes em milissegundos desde a época (int64) em
+# arrays que crescem por duplicação. As janelas de análise são desempacotadas
+# sob demanda e as sequências saem direto das palavras (popcount). Cerca de
+# 8,25 bytes por resultado, contra ~250 de um dict com datetime.
+import time
+from datetime import datetime
+
+import numpy as np
+
+from nucleo import COLORS, COLOR_CODES
+from empacotado import PackedResults
+
+E = COLOR_CODES['E']
+
+INITIAL_CAPACITY = 1024
+DECODE = bytes.maketrans(bytes(range(len(COLORS))), ''.join(COLORS).encode())
+
+def now_ms():
+    return time.time_ns() // 1000000
+
+def decode(codes):
+    # Códigos -> lista de 'C'/'V'/'E'
+    return list(np.asarray(codes, dtype=np.int8).tobytes().translate(DECODE).decode())
+
+class History:
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.packed = PackedResults(capacity)
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._size = 0
+        self.counts = {color: 0 for color in COLORS}   # Totais correntes por resultado
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def codes(self):
+        # Códigos int8 de todo o histórico (desempacotados, uma cópia)
+        return self.packed.codes()
+
+    @property
+    def timestamps(self):
+        return self._timestamps[:self._size]
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= len(self._timestamps):
+            return
+        timestamps = np.empty(max(needed, 2 * len(self._timestamps)), dtype=np.int64)
+        timestamps[:self._size] = self.timestamps
+        self._timestamps = timestamps
+
+    def append(self, result, timestamp=None):
+        self._reserve(1)
+        self.packed.append(COLOR_CODES[result])
+        self._timestamps[self._size] = now_ms() if timestamp is None else timestamp
+        self._size += 1
+        self.counts[result] += 1
+
+    def extend_codes(self, codes, timestamps):
+        codes = np.asarray(codes, dtype=np.int8)
+        self._reserve(len(codes))
+        self.packed.extend(codes)
+        self._timestamps[self._size:self._size + len(codes)] = timestamps
+        self._size += len(codes)
+        for code, count in enumerate(np.bincount(codes, minlength=len(COLORS))):
+            self.counts[COLORS[code]] += int(count)
+
+    def window(self, size):
+        # Últimos `size` códigos, desempacotando só as palavras que os contêm
+        return self.packed.codes(self._size - size)
+
+    def streaks(self):
+        # Sequência final e maiores sequências (de uma cor e de empates) de todo o
+        # histórico, sobre as palavras empacotadas
+        return {
+            'current': self.packed.tail_run(),
+            'longest': self.packed.max_run(exclude=E),
+            'empate': self.packed.max_run(E)
+        }
+
+    def results(self, size=None):
+        return decode(self.codes if size is None else self.window(size))
+
+    def tail(self, size):
+        # (resultado, datetime) dos últimos `size` resultados, do mais recente ao mais antigo
+        codes = self.window(size)
+        timestamps = self.timestamps[self._size - len(codes):]
+        for code, timestamp in zip(codes[::-1], timestamps[::-1]):
+            yield COLORS[code], datetime.fromtimestamp(timestamp / 1000)
@@ -0,0 +1,88 @@
+# Importação em lote de sequências de resultados: texto colado ("CCVEVC..."),
+# CSV (coluna de resultado e, opcionalmente, de horário) ou segmento gravado
+# pelo registro. Tudo vira arrays (códigos int8, instantes em ms int64).
+import csv
+import io
+from datetime import datetime
+
+import numpy as np
+
+from nucleo import COLOR_CODES
+from historico import now_ms
+from registro import RECORD, SEGMENT_SUFFIX
+
+SEPARATORS = set(' \t\r\n,;|-/')
+RESULT_COLUMNS = ('result', 'resultado')
+TIMESTAMP_COLUMNS = ('timestamp', 'horario', 'horário', 'time')
+
+def parse_sequence(text):
+    codes = []
+    for position, char in enumerate(text.upper()):
+        if char in COLOR_CODES:
+            codes.append(COLOR_CODES[char])
+        elif char not in SEPARATORS:
+            raise ValueError(f"Caractere inválido '{char}' na posição {position + 1} (use C, V ou E)")
+    return np.array(codes, dtype=np.int8)
+
+def _parse_timestamp(value):
+    value = value.strip()
+    if value.lstrip('-').isdigit():
+        return int(value)  # Já em ms desde a época
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+def parse_csv(text):
+    rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+    if not rows:
+        return np.empty(0, dtype=np.int8), None
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    result_column = next((header.index(name) for name in RESULT_COLUMNS if name in header), None)
+    timestamp_column = next((header.index(name) for name in TIMESTAMP_COLUMNS if name in header), None)
+    if result_column is None and timestamp_column is None:
+        result_column = 0           # Sem cabeçalho: resultado na primeira coluna
+    elif result_column is None:
+        raise ValueError(f"Cabeçalho do CSV sem coluna de resultado (use {' ou '.join(RESULT_COLUMNS)})")
+    else:
+        rows = rows[1:]
+
+    codes = np.empty(len(rows), dtype=np.int8)
+    timestamps = np.empty(len(rows), dtype=np.int64) if timestamp_column is not None else None
+    for i, row in enumerate(rows):
+        value = row[result_column].strip().upper() if result_column < len(row) else ''
+        if value not in COLOR_CODES:
+            raise ValueError(f"Resultado inválido '{value}' na linha {i + 1} do CSV (use C, V ou E)")
+        codes[i] = COLOR_CODES[value]
+        if timestamps is not None:
+            try:
+                timestamps[i] = _parse_timestamp(row[timestamp_column])
+            except (ValueError, IndexError):
+                raise ValueError(f"Horário inválido na linha {i + 1} do CSV") from None
+    return codes, timestamps
+
+def parse_segment(data):
+    size = len(data) - len(data) % RECORD.itemsize
+    records = np.frombuffer(data[:size], dtype=RECORD)
+    invalid = np.flatnonzero((records['code'] < 0) | (records['code'] >= len(COLOR_CODES)))
+    if len(invalid):
+        raise ValueError(f"Código inválido {records['code'][invalid[0]]} no registro {invalid[0] + 1} "
+                         f"do segmento (esperado 0, 1 ou 2)")
+    return records['code'].copy(), records['timestamp'].copy()
+
+def load_bytes(name, data):
+    # (códigos, instantes) a partir do conteúdo de um arquivo, pelo tipo do nome;
+    # sem horário no arquivo, todos recebem o instante da importação
+    name = name.lower()
+    if name.endswith(SEGMENT_SUFFIX):
+        return parse_segment(data)
+    text = data.decode('utf-8-sig')
+    if name.endswith('.csv'):
+        codes, timestamps = parse_csv(text)
+    else:
+        codes, timestamps = parse_sequence(text), None
+    if timestamps is None:
+        timestamps = np.full(len(codes), now_ms(), dtype=np.int64)
+    return codes, timestamps
+
+def load_file(path):
+    with open(path, 'rb') as f:
+        return load_bytes(path, f.read())
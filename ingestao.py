@@ -0,0 +1,324 @@
+# Ingestão assíncrona de resultados de fontes locais (substituto local do feed
+# do crupiê): socket Unix ou TCP, pipe nomeado (FIFO) ou stdin, e arquivo
+# acompanhado como `tail -f`. Cada linha traz `[mesa] resultados [instante]`,
+# por exemplo `mesa-3 C`, `mesa-3 CCV 1718000000000` ou só `V` (mesa padrão).
+#
+# Os leitores interpretam blocos inteiros de linhas e os põem numa fila limitada:
+# com a fila cheia, param de ler (e o remetente do socket, de escrever), sem
+# descartar nada. O consumidor junta tudo o que estiver na fila num lote, grava
+# cada mesa com um único extend e chama TableManager.analyze uma vez por lote,
+# de modo que uma rajada custa uma análise por mesa, e não uma por resultado.
+# Um lote tem no máximo MAX_BATCH resultados: um evento maior é dividido e o
+# restante abre o lote seguinte. Um lote que falha é registrado no log e o
+# consumidor segue com os próximos.
+#
+# Uso: python ingestao.py [--socket CAMINHO|HOST:PORTA] [--pipe FIFO|-] [--tail ARQUIVO]
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from nucleo import COLOR_CODES
+from historico import now_ms
+from importacao import _parse_timestamp
+from mesas import TableManager, TABLES_DIR
+from agregados import PRIORS_FILE, load_priors
+from automato import CUSTOM_PATTERNS_FILE, catalogue_automaton, load_custom_patterns
+
+DEFAULT_TABLE = 'principal'
+QUEUE_BLOCKS = 256        # Blocos de linhas na fila antes de os leitores pararem
+READ_SIZE = 65536         # Bytes lidos por vez de cada fonte
+TAIL_INTERVAL = 0.05      # Espera entre verificações do arquivo acompanhado (s)
+MAX_BATCH = 100000        # Resultados por lote, no máximo
+
+logger = logging.getLogger(__name__)
+
+def parse_line(line, default_table=DEFAULT_TABLE):
+    # Linha -> (mesa, códigos, instante ou None); ValueError se inválida
+    fields = line.split()
+    if not fields:
+        return None
+    timestamp = None
+    if len(fields) >= 2 and fields[-1][0].isdigit():
+        timestamp = _parse_timestamp(fields.pop())
+    if len(fields) == 1:
+        name, results = default_table, fields[0]
+    elif len(fields) == 2:
+        name, results = fields
+    else:
+        raise ValueError(f"Linha inválida: '{line.strip()}'")
+    try:
+        codes = [COLOR_CODES[char] for char in results.upper()]
+    except KeyError:
+        raise ValueError(f"Resultado inválido '{results}' (use C, V ou E)") from None
+    return name, codes, timestamp
+
+def split_batch(events, limit=MAX_BATCH):
+    # (lote com até `limit` resultados, eventos restantes); um evento que não
+    # cabe inteiro é dividido, mantendo a ordem de chegada
+    batch = []
+    size = 0
+    for i, (name, codes, timestamp) in enumerate(events):
+        room = limit - size
+        if len(codes) > room:
+            if room:
+                batch.append((name, codes[:room], timestamp))
+            return batch, [(name, codes[room:], timestamp)] + events[i + 1:]
+        batch.append((name, codes, timestamp))
+        size += len(codes)
+    return batch, []
+
+def _file_changed(f, path):
+    # (substituído, truncado) do arquivo acompanhado; None se sumiu
+    try:
+        return os.stat(path).st_ino != os.fstat(f.fileno()).st_ino, os.path.getsize(path) < f.tell()
+    except FileNotFoundError:
+        return None
+
+class FeedService:
+    def __init__(self, manager, default_table=DEFAULT_TABLE, queue_blocks=QUEUE_BLOCKS, on_update=None):
+        self.manager = manager
+        self.default_table = default_table
+        self.queue_blocks = queue_blocks
+        self.on_update = on_update      # Chamada com {mesa: análise} após cada lote
+        self.received = 0               # Resultados aceitos pelos leitores
+        self.applied = 0                # Resultados gravados nas mesas (inclusive de lotes com falha)
+        self.invalid = 0                # Linhas rejeitadas
+        self.rejected = 0               # Resultados descartados (nome de mesa inválido)
+        self.batches = 0
+        self.failed = 0                 # Lotes que falharam ao gravar ou analisar
+        self.partial = 0                # Lotes com falha depois de gravar parte dos resultados
+        self.last_batch = 0
+        self.version = 0                # Muda a cada lote que altera as mesas (para a interface)
+        self.errors = []                # Últimas linhas e eventos rejeitados, com o motivo
+        self.last_failure = None        # Motivo da última falha de lote
+        self._written = 0               # Resultados gravados do lote em andamento
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+        self._servers = []
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'applied': self.applied,
+            'invalid': self.invalid,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'failed': self.failed,
+            'partial': self.partial,
+            'last_batch': self.last_batch,
+            'queued_blocks': self._queue.qsize() if self._queue is not None else 0
+        }
+
+    # Leitores: bytes -> blocos de eventos na fila
+    async def _feed(self, reader, source):
+        pending = b''
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+            lines = (pending + data).split(b'\n')
+            pending = lines.pop()
+            await self._put(lines, source)
+        if pending.strip():
+            await self._put([pending], source)
+
+    async def _put(self, lines, source):
+        events = []
+        now = now_ms()
+        for raw in lines:
+            line = raw.decode('utf-8', 'replace')
+            try:
+                event = parse_line(line, self.default_table)
+            except ValueError as error:
+                self.invalid += 1
+                self.errors = (self.errors + [f'{source}: {error}'])[-20:]
+                continue
+            if event is not None:
+                name, codes, timestamp = event
+                events.append((name, codes, now if timestamp is None else timestamp))
+                self.received += len(codes)
+        if events:
+            await self._queue.put(events)     # Fila cheia: o leitor espera (contrapressão)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            await self._feed(reader, 'socket')
+        finally:
+            writer.close()
+
+    async def serve_socket(self, address):
+        # CAMINHO: socket Unix; HOST:PORTA: TCP
+        if ':' in address:
+            host, port = address.rsplit(':', 1)
+            server = await asyncio.start_server(self._handle_connection, host, int(port))
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            server = await asyncio.start_unix_server(self._handle_connection, address)
+        self._servers.append(server)
+        return server
+
+    async def read_pipe(self, path):
+        # FIFO aberto também para escrita: sem escritores conectados não há EOF,
+        # e o leitor continua esperando o próximo processo que escrever
+        loop = asyncio.get_running_loop()
+        if path == '-':
+            pipe = sys.stdin.buffer
+        else:
+            pipe = os.fdopen(os.open(path, os.O_RDWR | os.O_NONBLOCK), 'rb', buffering=0)
+        reader = asyncio.StreamReader(limit=READ_SIZE)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+        await self._feed(reader, 'pipe')
+
+    async def tail_file(self, path, from_start=False):
+        # Acompanha as linhas acrescentadas; arquivo truncado ou recriado volta ao início.
+        # Aberturas, leituras e stat de arquivo comum bloqueiam: rodam em threads,
+        # fora do laço de eventos
+        while not await asyncio.to_thread(os.path.exists, path):
+            await asyncio.sleep(TAIL_INTERVAL)
+        f = await asyncio.to_thread(open, path, 'rb')
+        try:
+            if not from_start:
+                await asyncio.to_thread(f.seek, 0, os.SEEK_END)
+            pending = b''
+            while True:
+                data = await asyncio.to_thread(f.read, READ_SIZE)
+                if data:
+                    lines = (pending + data).split(b'\n')
+                    pending = lines.pop()
+                    await self._put(lines, 'tail')
+                    continue
+                await asyncio.sleep(TAIL_INTERVAL)
+                changed = await asyncio.to_thread(_file_changed, f, path)
+                if changed is not None and any(changed):
+                    f.close()
+                    f = await asyncio.to_thread(open, path, 'rb')
+                    pending = b''
+        finally:
+            f.close()
+
+    # Consumidor: lotes da fila -> mesas -> análise
+    def _apply(self, batch):
+        self._written = 0
+        grouped = {}
+        for name, codes, timestamp in batch:
+            table_codes, table_timestamps = grouped.setdefault(name, ([], []))
+            table_codes.extend(codes)
+            table_timestamps.extend([timestamp] * len(codes))
+        for name, (codes, timestamps) in grouped.items():
+            try:
+                self.manager.extend(name, np.array(codes, dtype=np.int8), np.array(timestamps, dtype=np.int64))
+            except ValueError as error:
+                self.rejected += len(codes)
+                self.errors = (self.errors + [str(error)])[-20:]
+                continue
+            self.applied += len(codes)
+            self._written += len(codes)
+        return self.manager.analyze()
+
+    async def consume(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        carry = []                      # Restante do último lote dividido
+        while True:
+            events = carry or list(await queue.get())
+            size = sum(len(codes) for _, codes, _ in events)
+            # Junta o que chegou enquanto o lote anterior era processado
+            while not queue.empty() and size < MAX_BATCH:
+                block = queue.get_nowait()
+                events.extend(block)
+                size += sum(len(codes) for _, codes, _ in block)
+            batch, carry = split_batch(events)
+            size = sum(len(codes) for _, codes, _ in batch)
+            try:
+                # A gravação e a análise rodam fora do laço, que continua aceitando dados
+                analyses = await loop.run_in_executor(None, self._apply, batch)
+                self.batches += 1
+                self.last_batch = size
+                self.version += 1
+                if self.on_update is not None and analyses:
+                    self.on_update(analyses)
+            except Exception as error:
+                # O que já foi gravado fica nas mesas (e em `applied`); a análise
+                # das mesas alteradas é refeita no próximo lote
+                self.failed += 1
+                if self._written:
+                    self.partial += 1
+                    self.version += 1
+                self.last_failure = f'{self._written} de {size} resultados gravados: {error!r}'
+                logger.exception('Falha ao aplicar um lote de %d eventos', len(batch))
+
+    async def run(self, socket=None, pipe=None, tail=None, from_start=False):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_blocks)
+        self._tasks = [asyncio.ensure_future(self.consume())]
+        if socket:
+            await self.serve_socket(socket)
+        if pipe:
+            self._tasks.append(asyncio.ensure_future(self.read_pipe(pipe)))
+        if tail:
+            self._tasks.append(asyncio.ensure_future(self.tail_file(tail, from_start)))
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for server in self._servers:
+                server.close()
+
+    def start(self, **sources):
+        # Roda o serviço num laço próprio, numa thread de fundo (uso pela interface)
+        thread = threading.Thread(target=asyncio.run, args=(self.run(**sources),), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        if self._loop is not None:
+            for task in self._tasks:
+                self._loop.call_soon_threadsafe(task.cancel)
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingestão assíncrona de resultados para as mesas')
+    parser.add_argument('--socket', help='socket Unix (caminho) ou TCP (host:porta)')
+    parser.add_argument('--pipe', help="pipe nomeado (FIFO) ou '-' para stdin")
+    parser.add_argument('--tail', help='arquivo acompanhado como tail -f')
+    parser.add_argument('--from-start', action='store_true', help='lê o arquivo acompanhado desde o início')
+    parser.add_argument('--tables-dir', default=TABLES_DIR, help='diretório dos registros das mesas')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--priors', nargs='?', const=PRIORS_FILE, metavar='ARQUIVO',
+                        help=f'prioris dos arquivos para as mesas (padrão: {PRIORS_FILE})')
+    parser.add_argument('--patterns', nargs='?', const=CUSTOM_PATTERNS_FILE, metavar='ARQUIVO',
+                        help=f'inclui os padrões do usuário nas mesas (padrão: {CUSTOM_PATTERNS_FILE})')
+    args = parser.parse_args()
+    if not (args.socket or args.pipe or args.tail):
+        parser.error('informe ao menos uma fonte (--socket, --pipe ou --tail)')
+    priors = load_priors(args.priors) if args.priors else None
+    if args.priors and priors is None:
+        parser.error(f'arquivo de prioris não encontrado: {args.priors}')
+
+    automaton = catalogue_automaton(load_custom_patterns(args.patterns)) if args.patterns else None
+
+    manager = TableManager(args.tables_dir, args.workers, priors=priors, automaton=automaton)
+    service = FeedService(manager)
+    started = time.perf_counter()
+
+    def report(analyses):
+        rate = service.applied / max(time.perf_counter() - started, 1e-9)
+        print(f'{service.applied} resultados, {service.batches} lotes, {len(analyses)} mesas '
+              f'analisadas no último ({rate:.0f}/s)', file=sys.stderr)
+
+    service.on_update = report
+    try:
+        asyncio.run(service.run(args.socket, args.pipe, args.tail, args.from_start))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# Estatísticas de múltiplas janelas sobre todo o histórico: contagens prefixadas
+# de C, V e E (prefix[k] = contagens dos k primeiros resultados) dão as contagens,
+# proporções e entropia dos últimos `length` resultados em O(1) por janela,
+# qualquer que seja o tamanho (10, 50, 200, 1000, ...).
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+SYMBOLS = 3              # C, V, E (códigos 0, 1, 2)
+HORIZONS = (10, 50, 200, 1000)   # Janelas da meta-análise, do curto ao longo prazo
+
+class WindowStatistics:
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self._prefix = np.zeros((capacity + 1, SYMBOLS), dtype=np.int64)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, extra):
+        needed = self.size + extra + 1
+        if needed > len(self._prefix):
+            prefix = np.zeros((max(needed, 2 * len(self._prefix)), SYMBOLS), dtype=np.int64)
+            prefix[:self.size + 1] = self._prefix[:self.size + 1]
+            self._prefix = prefix
+
+    def push(self, code):
+        self._reserve(1)
+        k = self.size
+        self._prefix[k + 1] = self._prefix[k]
+        self._prefix[k + 1, code] += 1
+        self.size += 1
+
+    def extend(self, codes):
+        codes = np.asarray(codes, dtype=np.int64)
+        count = len(codes)
+        if not count:
+            return
+        self._reserve(count)
+        k = self.size
+        onehot = np.zeros((count, SYMBOLS), dtype=np.int64)
+        onehot[np.arange(count), codes] = 1
+        self._prefix[k + 1:k + count + 1] = self._prefix[k] + np.cumsum(onehot, axis=0)
+        self.size += count
+
+    def checkpoint(self):
+        return self.size
+
+    def rollback(self, state):
+        self.size = state
+
+    def counts(self, length):
+        # [C, V, E] dos últimos `length` resultados (todos, se houver menos)
+        k = self.size
+        return (self._prefix[k] - self._prefix[k - min(length, k)]).tolist()
+
+    def statistics(self, lengths=HORIZONS):
+        # Janela -> contagens, proporções e entropia, com uma única indexação
+        k = self.size
+        sizes = np.minimum(np.asarray(lengths), k)
+        counts = self._prefix[k] - self._prefix[k - sizes]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(sizes[:, None] > 0, counts / sizes[:, None], 0.0)
+            entropy = np.where(ratios > 0, -ratios * np.log2(np.where(ratios > 0, ratios, 1)), 0).sum(axis=1)
+        return {
+            length: {
+                'n': int(size),
+                'C': int(c), 'V': int(v), 'E': int(e),
+                'ratios': {'C': float(rc), 'V': float(rv), 'E': float(re)},
+                'entropy': float(h)
+            }
+            for length, size, (c, v, e), (rc, rv, re), h in zip(lengths, sizes, counts, ratios, entropy)
+        }
@@ -0,0 +1,172 @@
+# Linha do tempo de risco e manipulação: para cada posição do histórico, os
+# escores de risk_score e manipulation_score (e os sinais que os compõem) sobre a
+# janela de análise que termina nela. Contagens, mudanças, intervalos entre
+# empates e o teste de Benford saem de somas prefixadas (O(1) por posição); as
+# maiores sequências, de uma visão deslizante dos tamanhos de sequência. Os
+# pontos vêm dos mesmos pontuadores do núcleo (risk_points, manipulation_points).
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import nucleo
+from nucleo import WINDOW_SIZE, COLORS, COLOR_CODES
+
+C, V, E = COLOR_CODES['C'], COLOR_CODES['V'], COLOR_CODES['E']
+ALTERNATING_LIMIT = nucleo.TAIL_LENGTHS[-1]   # Final alternado considerado pelas features
+CHECK_SIZE = 300         # Tamanho das sequências aleatórias de check
+
+def _prefix(values):
+    return np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+
+def _run_lengths(breaks):
+    # Tamanho do trecho corrente em cada posição, reiniciado onde breaks é verdadeiro
+    index = np.arange(len(breaks))
+    return index - np.maximum.accumulate(np.where(breaks, index, 0)) + 1
+
+def _digit_ranges(window):
+    # Trechos [início, fim) de índices relativos 0..window-1 com o mesmo primeiro dígito
+    ranges = []
+    for i in range(window):
+        digit = int(str(i)[0])
+        if ranges and ranges[-1][0] == digit:
+            ranges[-1][2] = i + 1
+        else:
+            ranges.append([digit, i, i + 1])
+    return ranges
+
+def timeline(codes, window=WINDOW_SIZE):
+    codes = np.asarray(codes, dtype=np.int8)
+    size = len(codes)
+    t = np.arange(size)
+    n = np.minimum(t + 1, window)            # Tamanho da janela que termina em t
+    start = t + 1 - n
+    stop = t + 1
+
+    def window_sum(prefix, first=start):
+        return prefix[stop] - prefix[first]
+
+    is_e = codes == E
+    c_count = window_sum(_prefix(codes == C))
+    v_count = window_sum(_prefix(codes == V))
+    e_count = window_sum(_prefix(is_e))
+    decided = c_count + v_count
+
+    # Entropia
+    entropy = np.zeros(size)
+    for count in (c_count, v_count, e_count):
+        p = count / n
+        entropy -= np.where(count > 0, p * np.log2(np.where(count > 0, p, 1)), 0)
+
+    # Mudanças entre vizinhos (runs - 1), só dentro da janela
+    change = np.zeros(size, dtype=bool)
+    change[1:] = codes[1:] != codes[:-1]
+    changes = window_sum(_prefix(change), np.minimum(start + 1, stop))
+
+    # Maiores sequências na janela: tamanho corrente cortado no início da janela
+    run = _run_lengths(change)
+    padded_run = np.concatenate([np.zeros(window - 1, dtype=np.int64), run])
+    padded_e = np.concatenate([np.zeros(window - 1, dtype=bool), is_e])
+    offsets = np.arange(window)[None, :] - (window - n)[:, None] + 1
+    clipped = np.minimum(sliding_window_view(padded_run, window), np.maximum(offsets, 0))
+    e_view = sliding_window_view(padded_e, window)
+    max_streak = np.maximum(np.where(e_view, 0, clipped).max(axis=1), 1)
+    empate_streak = np.where(e_view, clipped, 0).max(axis=1)
+
+    # Final alternado
+    alternating = np.minimum(_run_lengths(~change), np.minimum(n, ALTERNATING_LIMIT))
+
+    # Risco
+    imbalance = np.where(decided > 0, np.abs(c_count - v_count) / np.maximum(decided, 1), 0)
+    n1, n2 = c_count.astype(np.float64), v_count.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected_runs = 2 * n1 * n2 / (n1 + n2) + 1
+        std_dev = np.sqrt(2 * n1 * n2 * (2 * n1 * n2 - n1 - n2) / ((n1 + n2) ** 2 * (n1 + n2 - 1)))
+        runs_z = (changes + 1 - expected_runs) / std_dev
+    runs_z = np.where((n >= nucleo.RUNS_MIN_RESULTS) & (decided > 1) & (std_dev != 0), runs_z, np.nan)
+    risk = nucleo.risk_points(entropy, imbalance, runs_z, max_streak, empate_streak)
+
+    # Manipulação: inversão entre as metades dos últimos 8
+    c_prefix, v_prefix = _prefix(codes == C), _prefix(codes == V)
+    last4 = np.maximum(stop - 4, 0)
+    last8 = np.maximum(stop - 8, 0)
+    first_balance = (c_prefix[last4] - c_prefix[last8]) - (v_prefix[last4] - v_prefix[last8])
+    second_balance = (c_prefix[stop] - c_prefix[last4]) - (v_prefix[stop] - v_prefix[last4])
+    inversion = (n >= nucleo.INVERSION_MIN_RESULTS) & (first_balance * second_balance < 0)
+
+    # Regularidade dos empates: desvio dos intervalos entre empates da janela
+    # (cada empate guarda a distância ao anterior; o primeiro da janela fica de fora)
+    # (sem empates, o primeiro da janela fica em `size`, além de qualquer janela)
+    positions = np.append(np.flatnonzero(is_e), size)
+    gap = np.zeros(size, dtype=np.int64)
+    gap[positions[1:-1]] = np.diff(positions[:-1])
+    gap_prefix, gap_sq_prefix = _prefix(gap), _prefix(gap * gap)
+    first_e = positions[np.searchsorted(positions, start)]
+    after_first = np.minimum(first_e + 1, stop)
+    intervals = np.maximum(e_count - 1, 0)
+    gap_sum = window_sum(gap_prefix, after_first)
+    gap_sum_sq = window_sum(gap_sq_prefix, after_first)
+    spread = intervals * gap_sum_sq - gap_sum * gap_sum     # intervals² * variância, inteiro
+    with np.errstate(divide='ignore', invalid='ignore'):
+        empate_std = np.where(e_count >= nucleo.EMPATE_REGULARITY_MIN,
+                              np.sqrt(np.maximum(spread, 0)) / intervals, np.nan)
+
+    # Teste de Benford sobre os índices (relativos à janela) dos resultados que não são empate
+    not_e = _prefix(~is_e)
+    first_digits = window_sum(not_e)
+    observed = {digit: np.zeros(size, dtype=np.int64) for digit in nucleo.BENFORD_LAW}
+    for digit, low, high in _digit_ranges(window):
+        if digit in nucleo.BENFORD_LAW:
+            first = np.minimum(start + low, stop)
+            observed[digit] += window_sum(not_e, first) - window_sum(not_e, np.minimum(start + high, stop))
+    chi_square = np.zeros(size)
+    for digit, share in nucleo.BENFORD_LAW.items():
+        expected = share * first_digits
+        with np.errstate(divide='ignore', invalid='ignore'):
+            chi_square += np.where(expected > 0, (observed[digit] - expected) ** 2 / expected, 0)
+    chi_square = np.where(n >= nucleo.BENFORD_MIN_RESULTS, chi_square, np.nan)
+
+    manipulation = nucleo.manipulation_points(
+        e_count / n,
+        np.where(n >= nucleo.ALTERNATING_MIN_RESULTS, alternating, 0),
+        inversion,
+        empate_std,
+        chi_square
+    )
+
+    return {
+        'risk': risk,
+        'manipulation': manipulation,
+        'entropy': entropy,
+        'imbalance': imbalance,
+        'runs_z': runs_z,
+        'max_streak': max_streak,
+        'empate_streak': empate_streak,
+        'empate_std': empate_std,
+        'benford_chi_square': chi_square
+    }
+
+def levels(scores, high, medium):
+    # Escores -> códigos de nível (0 baixo, 1 médio, 2 alto)
+    return (scores >= medium).astype(np.int8) + (scores >= high)
+
+def check(samples=20, size=CHECK_SIZE, window=WINDOW_SIZE, seed=0):
+    # Confere a linha do tempo com risk_score e manipulation_score do núcleo,
+    # posição a posição (estado incremental); além das sequências aleatórias,
+    # uma sem empates e uma com um único empate. Devolve as divergências
+    rng = np.random.default_rng(seed)
+    histories = [rng.choice(len(COLORS), size=size, p=(0.45, 0.45, 0.10)) for _ in range(samples)]
+    no_empate = rng.choice([C, V], size=size)
+    single_empate = no_empate.copy()
+    single_empate[size // 2] = E
+    histories += [no_empate, single_empate]
+    mismatches = []
+    for index, codes in enumerate(histories):
+        points = timeline(codes, window)
+        stream = nucleo.new_stream(size=window)
+        for t, code in enumerate(codes.tolist()):
+            nucleo.stream_push(stream, COLORS[code])
+            features = nucleo.stream_features(stream)
+            expected = (nucleo.risk_score(features), nucleo.manipulation_score(features))
+            actual = (points['risk'][t], points['manipulation'][t])
+            if any(abs(a - b) > 1e-9 for a, b in zip(expected, actual)):
+                mismatches.append((index, t, expected, actual))
+    return mismatches
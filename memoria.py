@@ -0,0 +1,85 @@
+# Cache LRU de analyze_data, compartilhável entre sessões. A chave reúne tudo de
+# que a análise depende: a janela de análise e os padrões do catálogo
+# reconhecidos no final; do histórico inteiro, os contextos longos, as
+# ocorrências dos padrões presentes e as contagens das janelas longas (a mesma
+# janela com outro histórico pode ter outra previsão); e o que as prioris dos
+# arquivos dizem desse final, quando há prioris.
+# Os desempates aleatórios das camadas usam uma semente derivada da chave, de
+# modo que a mesma entrada dá a mesma análise em qualquer sessão ou processo.
+import hashlib
+import random
+import threading
+from collections import OrderedDict
+
+from nucleo import analyze_data
+
+CACHE_SIZE = 4096     # Análises mantidas antes de descartar as usadas há mais tempo
+CACHE_SEED = 0
+
+def analysis_key(features):
+    return (
+        ''.join(features['results']),
+        features['matches'],
+        tuple(features['contexts']),
+        tuple(features['pattern_outcomes'].items()),
+        tuple((window['C'], window['V'], window['E']) for window in features['horizons'].values()),
+        features['prior_context'],
+        tuple(features['prior_patterns'].items())
+    )
+
+class AnalysisCache:
+    def __init__(self, maxsize=CACHE_SIZE, seed=CACHE_SEED):
+        self.maxsize = maxsize
+        self.seed = seed
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()   # O cálculo também fica sob o lock: a semente é do gerador global
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _seed_for(self, key):
+        digest = hashlib.blake2b(repr((self.seed, key)).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+
+    def analyze(self, features):
+        # Análise memorizada (o dict devolvido é compartilhado: não deve ser alterado)
+        key = analysis_key(features)
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return analysis
+
+            self.misses += 1
+            state = random.getstate()
+            random.seed(self._seed_for(key))
+            try:
+                analysis = analyze_data(features)
+            finally:
+                random.setstate(state)
+            self._entries[key] = analysis
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return analysis
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0
+            }
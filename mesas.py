@@ -0,0 +1,162 @@
+# Várias mesas independentes num só processo. Cada mesa é um motor.Table com
+# histórico (historico.History: código em 2 bits e instante int64 por resultado),
+# estado incremental e análise próprios, e registro em disco num subdiretório
+# com o nome da mesa. Os resultados são roteados pelo nome e apenas registrados;
+# analyze() analisa de uma vez as mesas alteradas desde a última chamada. As
+# features são montadas aqui (leitura do estado incremental) e só analyze_data,
+# a parte cara, roda no pool de processos; poucas mesas alteradas são analisadas
+# no próprio processo. Com um banco (banco.HistoryStore), os registros das mesas
+# ficam no SQLite em vez de segmentos; nomes iniciados por '_' são reservados
+# (mesas das sessões da interface).
+import os
+import threading
+from multiprocessing import get_context
+
+from nucleo import analyze_data
+from motor import Table
+from registro import ResultLog
+
+TABLES_DIR = os.environ.get('PADRAO30_TABLES_DIR', 'mesas')
+PARALLEL_MIN = 8      # Mesas alteradas a partir das quais o pool compensa a serialização
+
+def check_name(name):
+    # O nome vira diretório do registro: nada de caminhos
+    if not name or name.startswith(('.', '_')) or os.sep in name or (os.altsep and os.altsep in name):
+        raise ValueError(f"Nome de mesa inválido: '{name}'")
+    return name
+
+class TableManager:
+    def __init__(self, directory=TABLES_DIR, workers=None, store=None, priors=None, automaton=None):
+        self.directory = directory    # None (e sem banco): mesas só em memória
+        self.store = store
+        self.priors = priors          # Prioris passadas a todas as mesas (None: nenhuma)
+        self.automaton = automaton    # Catálogo de padrões das mesas (None: só os básicos)
+        self.workers = workers or os.cpu_count() or 1
+        self.tables = {}              # Nome -> Table
+        self.dirty = set()            # Mesas com resultados ainda não analisados
+        self._lock = threading.Lock()
+        self._pool = None
+        if store is not None:
+            for name in store.tables():
+                if not name.startswith('_'):
+                    self.table(name)
+        elif directory is not None and os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if os.path.isdir(os.path.join(directory, name)):
+                    self.table(name)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __contains__(self, name):
+        return name in self.tables
+
+    def names(self):
+        with self._lock:
+            return sorted(self.tables)
+
+    def table(self, name):
+        # Mesa existente ou nova (retomando o registro em disco, se houver)
+        with self._lock:
+            table = self.tables.get(name)
+            if table is None:
+                check_name(name)
+                if self.store is not None:
+                    log = self.store.log(name)
+                elif self.directory is not None:
+                    log = ResultLog(os.path.join(self.directory, name))
+                else:
+                    log = None
+                table = self.tables[name] = Table(log=log, priors=self.priors, automaton=self.automaton)
+            return table
+
+    def add(self, name, result, timestamp=None):
+        table = self.table(name)
+        table.add(result, timestamp, analyze=False)
+        with self._lock:
+            self.dirty.add(name)
+
+    def extend(self, name, codes, timestamps):
+        table = self.table(name)
+        table.extend(codes, timestamps, analyze=False)
+        if len(codes):
+            with self._lock:
+                self.dirty.add(name)
+
+    def route(self, events):
+        # Eventos (mesa, resultado, instante) na ordem de chegada
+        for name, result, timestamp in events:
+            self.add(name, result, timestamp)
+
+    def reset(self, name):
+        self.table(name).reset()
+        with self._lock:
+            self.dirty.discard(name)
+
+    def remove(self, name):
+        with self._lock:
+            table = self.tables.pop(name)
+            self.dirty.discard(name)
+        if table.log is not None:
+            table.log.close()
+
+    def _get_pool(self):
+        # Processos criados por spawn: o servidor do Streamlit tem várias threads
+        if self._pool is None:
+            self._pool = get_context('spawn').Pool(self.workers)
+        return self._pool
+
+    def analyze(self):
+        # Analisa as mesas alteradas; devolve nome -> nova análise
+        with self._lock:
+            # Mesas removidas entre o registro e a análise ficam de fora
+            names = sorted(name for name in self.dirty if name in self.tables)
+            tables = [self.tables[name] for name in names]
+            self.dirty.clear()
+        if not names:
+            return {}
+        try:
+            features = [table.features() for table in tables]
+            if self.workers > 1 and len(names) >= PARALLEL_MIN:
+                chunk = max(1, len(names) // (4 * self.workers))
+                analyses = self._get_pool().map(analyze_data, features, chunk)
+            else:
+                analyses = [analyze_data(item) for item in features]
+        except Exception:
+            # As mesas continuam pendentes para a próxima chamada
+            with self._lock:
+                self.dirty.update(name for name in names if name in self.tables)
+            raise
+        for table, analysis in zip(tables, analyses):
+            table.analysis = analysis
+        return dict(zip(names, analyses))
+
+    def summary(self):
+        # Uma linha por mesa: previsão, confiança e recomendação da última análise
+        with self._lock:
+            tables = sorted(self.tables.items())
+            dirty = set(self.dirty)
+        rows = []
+        for name, table in tables:
+            analysis = table.analysis
+            rows.append({
+                'mesa': name,
+                'resultados': len(table.history),
+                'previsão': analysis['prediction'],
+                'confiança': analysis['confidence'],
+                'recomendação': analysis['recommendation'],
+                'risco': analysis['riskLevel'],
+                'manipulação': analysis['manipulation'],
+                'pendente': name in dirty
+            })
+        return rows
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        with self._lock:
+            tables = list(self.tables.values())
+        for table in tables:
+            if table.log is not None:
+                table.log.close()
@@ -0,0 +1,175 @@
+# Motor de análise sem interface: uma mesa reúne o histórico compacto, o estado
+# incremental da janela, o registro em disco (opcional) e a última análise.
+# Importável por backtests, benchmarks e processos de trabalho sem o Streamlit.
+#
+# Com speculate=True, depois de cada atualização uma thread calcula em segundo
+# plano as análises dos três próximos resultados possíveis (C, V, E), empurrando
+# cada um no estado incremental e desfazendo em seguida (stream_checkpoint /
+# stream_rollback). No clique, o resultado entra no estado em O(1) e a análise
+# correspondente já pronta é usada no lugar de analyze_data.
+#
+# Com um AnalysisCache (memoria.py), as análises passam pelo cache LRU
+# compartilhado: estados repetidos (reset e nova digitação da mesma sequência,
+# sessões com o mesmo histórico) não são recalculados.
+import threading
+import time
+import weakref
+
+from nucleo import (
+    COLORS, COLOR_CODES, new_stream, stream_push, stream_extend, stream_features, analyze_data,
+    stream_checkpoint, stream_rollback
+)
+from historico import History, now_ms
+from perfil import PROFILER, profiled
+
+def initial_analysis():
+    return {
+        'patterns': [],
+        'riskLevel': 'low',
+        'manipulation': 'low',
+        'prediction': None,
+        'confidence': 0,
+        'recommendation': 'watch',
+        'layers': {}
+    }
+
+SPECULATION_IDLE = 60   # Segundos sem atualizações até a thread especulativa encerrar
+
+def analyze_sequence(results, priors=None, automaton=None):
+    # Análise avulsa do final de uma sequência, sem estado (contextos longos
+    # sobre a sequência inteira)
+    stream = new_stream(priors=priors, automaton=automaton)
+    stream_extend(stream, [COLOR_CODES[result] for result in results])
+    return analyze_data(stream_features(stream))
+
+class Table:
+    def __init__(self, log=None, speculate=False, cache=None, priors=None, automaton=None):
+        self.log = log
+        self.speculate = speculate
+        self.cache = cache
+        self.priors = priors              # Prioris dos arquivos (agregados.load_priors), se pedidas
+        self.automaton = automaton        # Catálogo com os padrões do usuário, se pedido
+        self._lock = threading.Lock()     # Protege o estado incremental da thread especulativa
+        self._generation = 0              # Muda a cada atualização; invalida a especulação em curso
+        self._speculation = {}            # Próximo resultado -> análise pré-calculada
+        self._wake = threading.Event()
+        self._worker = None
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+        self.history = History()
+        self.stream = new_stream(priors=priors, automaton=automaton)
+        self.analysis = initial_analysis()
+        if log is not None:
+            self.history.extend_codes(*log.load())
+            stream_extend(self.stream, self.history.codes)
+            if self.history:
+                self.analyze()
+        self._speculate()
+
+    def _analyze_stream(self):
+        features = profiled(stream_features, self.stream)
+        if self.cache is not None:
+            return profiled(self.cache.analyze, features)
+        return profiled(analyze_data, features)
+
+    def features(self):
+        # Quadro de features do estado atual, para análise fora da mesa (TableManager)
+        with self._lock:
+            return profiled(stream_features, self.stream)
+
+    def analyze(self):
+        self.analysis = self._analyze_stream()
+        return self.analysis
+
+    def _invalidate(self):
+        # Chamado com o lock: descarta as análises especulativas do estado anterior
+        self._generation += 1
+        speculation, self._speculation = self._speculation, {}
+        return speculation
+
+    def _speculate(self):
+        # Acorda a thread especulativa (sem esperar por ela); criá-la a cada clique
+        # custaria a espera de Thread.start() no caminho do clique
+        if not (self.speculate and self.history):
+            return
+        self._wake.set()
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=_speculation_worker, args=(weakref.ref(self), self._wake),
+                                            daemon=True)
+            self._worker.start()
+
+    def _precompute(self, generation):
+        # O resultado previsto primeiro: é o que tem mais chance de ser o próximo clique
+        prediction = self.analysis['prediction']
+        for result in sorted(COLORS, key=lambda color: color != prediction):
+            with self._lock:
+                if generation != self._generation:
+                    return
+                checkpoint = stream_checkpoint(self.stream)
+                stream_push(self.stream, result)
+                try:
+                    self._speculation[result] = self._analyze_stream()
+                finally:
+                    stream_rollback(self.stream, checkpoint)
+
+    def add(self, result, timestamp=None, analyze=True):
+        # Com analyze=False o resultado só é registrado; a análise fica para depois
+        # (TableManager analisa as mesas alteradas em lote)
+        start = time.perf_counter()
+        timestamp = now_ms() if timestamp is None else timestamp
+        with self._lock:
+            speculated = self._invalidate().get(result)
+            # O registro primeiro: se a gravação falhar, histórico e estado
+            # incremental continuam iguais ao que está em disco
+            if self.log is not None:
+                self.log.append(COLOR_CODES[result], timestamp)
+            self.history.append(result, timestamp)
+            profiled(stream_push, self.stream, result)
+            if not analyze:
+                return self.analysis
+            if speculated is not None:
+                self.speculation_hits += 1
+                self.analysis = speculated
+            else:
+                if self.speculate:
+                    self.speculation_misses += 1
+                self.analyze()
+        if PROFILER.enabled:
+            PROFILER.record_latency(time.perf_counter() - start)
+        self._speculate()
+        return self.analysis
+
+    def extend(self, codes, timestamps, analyze=True):
+        # Acréscimo em lote: uma gravação e uma única análise ao final
+        with self._lock:
+            self._invalidate()
+            if self.log is not None:
+                self.log.extend(codes, timestamps)
+            self.history.extend_codes(codes, timestamps)
+            stream_extend(self.stream, codes)
+            if not analyze:
+                return self.analysis
+            if len(codes):
+                self.analyze()
+        self._speculate()
+        return self.analysis
+
+    def reset(self):
+        with self._lock:
+            self._invalidate()
+            if self.log is not None:
+                self.log.roll_over()
+            self.history = History()
+            self.stream = new_stream(priors=self.priors, automaton=self.automaton)
+            self.analysis = initial_analysis()
+
+def _speculation_worker(table_ref, wake):
+    # Só uma referência fraca à mesa: a thread não a mantém viva depois que a
+    # sessão termina, e encerra após SPECULATION_IDLE segundos sem atualizações
+    while wake.wait(SPECULATION_IDLE):
+        wake.clear()
+        table = table_ref()
+        if table is None:
+            return
+        table._precompute(table._generation)
+        del table
@@ -0,0 +1,1070 @@
+# Núcleo de análise preditiva: estado incremental da janela, detectores e
+# camadas de previsão. Não depende do Streamlit, para poder ser usado por
+# backtests, benchmarks e processos de trabalho.
+import numpy as np
+from collections import Counter, deque
+import math
+import random
+from autocorrelacao import autocorrelation, correlations_from_sums, strongest_lag
+from contexto import ContextTree, CONTEXT_ORDER
+from ocorrencias import OccurrenceIndex
+from automato import basic_catalogue, catalogue_automaton
+from tendencia import TrendEstimator
+from janelas import WindowStatistics, HORIZONS
+from perfil import profiled
+
+WINDOW_SIZE = 27      # Janela de análise
+MARKOV_ORDER = 2      # Ordem da cadeia de Markov mantida na janela
+MAX_LAG = 10          # Maior defasagem de autocorrelação (ciclos) mantida na janela
+TAIL_LENGTHS = (4, 5, 6, 8, 10, 20, 30)  # Finais da janela usados pelas camadas
+MIN_RESULTS = 5       # Mínimo de resultados para gerar previsões
+MIN_CONTEXT_SUPPORT = 10  # Ocorrências mínimas de um contexto longo (ordem > MARKOV_ORDER)
+MIN_PATTERN_SUPPORT = 20  # Ocorrências (seguidas de C ou V) para usar a estatística de um padrão
+
+# Limiares das detecções e dos níveis de risco/manipulação
+# (taxa de falsos positivos sob sequências aleatórias: python calibracao.py)
+HIGH_ENTROPY = 0.9        # Padrão de alta aleatoriedade
+LOW_ENTROPY = 0.5         # Padrão muito definido (risco)
+MARKOV_THRESHOLD = 0.7    # Probabilidade de transição significativa
+CYCLE_THRESHOLD = 0.4     # |Autocorrelação| de um ciclo
+IMBALANCE_THRESHOLD = 0.4 # Desequilíbrio C/V (risco)
+BENFORD_THRESHOLD = 15    # Qui-quadrado do teste de Benford
+RISK_HIGH = 70
+RISK_MEDIUM = 40
+MANIPULATION_HIGH = 65
+MANIPULATION_MEDIUM = 35
+# Pontos de cada sinal nos escores de risco e de manipulação (risk_points e
+# manipulation_points, usados também pela calibração e pela linha do tempo)
+RISK_LOW_ENTROPY_POINTS = 30  # Entropia abaixo de LOW_ENTROPY
+RISK_IMBALANCE_POINTS = 40    # Desequilíbrio acima de IMBALANCE_THRESHOLD
+RUNS_MIN_RESULTS = 10         # Tamanho mínimo da janela para o teste de runs
+RUNS_Z_THRESHOLD = 1.96       # |z| do teste de runs (95% de confiança)
+RISK_RUNS_POINTS = 20
+STREAK_THRESHOLD = 5          # Maior sequência de uma cor a partir da qual pontua
+STREAK_POINTS = 10            # Por resultado da sequência
+STREAK_MAX_POINTS = 50
+EMPATE_STREAK_THRESHOLD = 2   # Maior sequência de empates a partir da qual pontua
+EMPATE_STREAK_POINTS = 15     # Por empate da sequência
+EMPATE_RATIO_THRESHOLD = 0.25 # Proporção de empates na janela
+EMPATE_RATIO_MAX_POINTS = 40  # Pontos = 100 x proporção, até este limite
+ALTERNATING_MIN_RESULTS = 10  # Tamanho mínimo da janela e do final alternado
+ALTERNATING_POINTS = 30
+INVERSION_MIN_RESULTS = 8     # Inversão C/V entre as metades dos últimos 8
+INVERSION_POINTS = 25
+EMPATE_REGULARITY_MIN = 3     # Empates na janela para avaliar os intervalos
+EMPATE_REGULARITY_STD = 1.0   # Desvio dos intervalos abaixo do qual são regulares demais
+EMPATE_REGULARITY_POINTS = 30
+BENFORD_MIN_RESULTS = 20
+BENFORD_POINTS = 35
+BENFORD_LAW = {1: 0.301, 2: 0.176, 3: 0.125, 4: 0.097, 5: 0.079, 6: 0.067, 7: 0.058, 8: 0.051, 9: 0.046}
+BET_CONFIDENCE = 70       # Confiança mínima para recomendar aposta
+WATCH_CONFIDENCE = 55     # Confiança mínima para recomendar observar
+NUMERIC = {'C': 1, 'V': -1, 'E': 0}
+COLORS = ('C', 'V', 'E')                  # Códigos compactos 0, 1, 2 (histórico, backtest)
+COLOR_CODES = {color: i for i, color in enumerate(COLORS)}
+BASIC_PATTERNS = frozenset(basic_catalogue())
+AUTOMATON = catalogue_automaton()         # Só os básicos; os do usuário, por new_stream(automaton=...)
+
+def get_color_name(color):
+    return {
+        'C': 'Vermelho',
+        'V': 'Azul',
+        'E': 'Empate'
+    }.get(color, '')
+
+# Estado incremental da janela de análise
+# Cada novo resultado atualiza contagens, sequências, transições e somas em O(1)
+# amortizado; o resultado que sai da janela é descontado de todas as estruturas.
+# A árvore de contextos e o índice de ocorrências acumulam todo o histórico.
+def new_stream(size=WINDOW_SIZE, order=MARKOV_ORDER, max_lag=MAX_LAG, context_order=CONTEXT_ORDER,
+               priors=None, automaton=None):
+    # `priors`: estatísticas das sessões arquivadas (agregados.load_priors), só
+    # quando quem cria o estado as pede (a interface); None, nenhuma.
+    # `automaton`: catálogo com os padrões do usuário (automato.catalogue_automaton);
+    # None, só os básicos
+    return {
+        'size': size,
+        'order': order,
+        'max_lag': max_lag,
+        'priors': priors,
+        'automaton': automaton or AUTOMATON,
+        'context': ContextTree(context_order),  # Markov de ordem variável (todo o histórico)
+        'occurrences': OccurrenceIndex(),       # Padrões básicos -> resultado seguinte
+        'automaton_state': 0,                   # Estado do autômato de padrões (todo o histórico)
+        'trend': TrendEstimator(),              # Somas da tendência sem empates (todo o histórico)
+        'horizons': WindowStatistics(),         # Contagens prefixadas (todo o histórico)
+        'window': deque(),
+        'total': 0,                           # Resultados já recebidos
+        'counts': {'C': 0, 'V': 0, 'E': 0},
+        'changes': 0,                         # Pares vizinhos diferentes (runs - 1)
+        'runs': deque(),                      # [cor, tamanho] de cada sequência
+        'transitions': {},                    # Estado de Markov -> próximos resultados
+        'e_positions': deque(),               # Posições absolutas dos empates
+        'sum': 0,                             # Soma da série numérica
+        'lag_sums': [0] * (max_lag + 1)       # Soma de x[i] * x[i + lag]
+    }
+
+def stream_push(stream, result):
+    code = COLOR_CODES[result]
+    stream['context'].push(code)
+    stream['occurrences'].push(code)
+    stream['automaton_state'] = stream['automaton'].step(stream['automaton_state'], code)
+    if result != 'E':
+        stream['trend'].push(NUMERIC[result])
+    stream['horizons'].push(code)
+    _window_push(stream, result)
+
+def stream_extend(stream, codes):
+    # Acréscimo em lote (códigos 0/1/2): árvore de contextos e índice de ocorrências
+    # recebem tudo de uma vez e só o final que cabe na janela passa pelo estado incremental
+    codes = np.asarray(codes)
+    stream['context'].extend(codes)
+    stream['occurrences'].extend(codes)
+    stream['automaton_state'] = stream['automaton'].run(codes, stream['automaton_state'])
+    stream['trend'].extend(1 - 2 * codes[codes != COLOR_CODES['E']].astype(np.int64))
+    stream['horizons'].extend(codes)
+    tail = [COLORS[code] for code in codes[-stream['size']:].tolist()]
+    stream['total'] += len(codes) - len(tail)
+    for result in tail:
+        _window_push(stream, result)
+
+def stream_checkpoint(stream):
+    # Estado para desfazer um stream_push (análise especulativa do próximo
+    # resultado): a janela é pequena e é copiada; as estruturas de todo o
+    # histórico guardam só o que o push vai alterar
+    return {
+        'context': stream['context'].checkpoint(),
+        'occurrences': stream['occurrences'].checkpoint(),
+        'automaton_state': stream['automaton_state'],
+        'trend': stream['trend'].checkpoint(),
+        'horizons': stream['horizons'].checkpoint(),
+        'window': list(stream['window']),
+        'total': stream['total'],
+        'counts': dict(stream['counts']),
+        'changes': stream['changes'],
+        'runs': [list(run) for run in stream['runs']],
+        'transitions': {state: dict(counts) for state, counts in stream['transitions'].items()},
+        'e_positions': list(stream['e_positions']),
+        'sum': stream['sum'],
+        'lag_sums': list(stream['lag_sums'])
+    }
+
+def stream_rollback(stream, checkpoint):
+    for key in ('context', 'occurrences', 'trend', 'horizons'):
+        stream[key].rollback(checkpoint[key])
+    for key in ('automaton_state', 'total', 'counts', 'changes', 'transitions', 'sum', 'lag_sums'):
+        stream[key] = checkpoint[key]
+    for key in ('window', 'runs', 'e_positions'):
+        stream[key] = deque(checkpoint[key])
+
+def _window_push(stream, result):
+    window = stream['window']
+    if len(window) == stream['size']:
+        _stream_evict(stream)
+
+    n = len(window)
+    value = NUMERIC[result]
+    lag_sums = stream['lag_sums']
+    for lag in range(1, min(stream['max_lag'], n) + 1):
+        lag_sums[lag] += NUMERIC[window[-lag]] * value
+
+    order = stream['order']
+    if n >= order:
+        state = tuple(window[i] for i in range(n - order, n))
+        if state not in stream['transitions']:
+            stream['transitions'][state] = {'C': 0, 'V': 0, 'E': 0}
+        stream['transitions'][state][result] += 1
+
+    runs = stream['runs']
+    if runs and runs[-1][0] == result:
+        runs[-1][1] += 1
+    else:
+        if n:
+            stream['changes'] += 1
+        runs.append([result, 1])
+
+    if result == 'E':
+        stream['e_positions'].append(stream['total'])
+
+    window.append(result)
+    stream['counts'][result] += 1
+    stream['sum'] += value
+    stream['total'] += 1
+
+def _stream_evict(stream):
+    window = stream['window']
+    oldest = window[0]
+    n = len(window)
+    value = NUMERIC[oldest]
+    lag_sums = stream['lag_sums']
+    for lag in range(1, min(stream['max_lag'], n - 1) + 1):
+        lag_sums[lag] -= value * NUMERIC[window[lag]]
+
+    order = stream['order']
+    if n > order:
+        state = tuple(window[i] for i in range(order))
+        counts = stream['transitions'][state]
+        counts[window[order]] -= 1
+        if not any(counts.values()):
+            del stream['transitions'][state]
+
+    runs = stream['runs']
+    runs[0][1] -= 1
+    if runs[0][1] == 0:
+        runs.popleft()
+        if runs:
+            stream['changes'] -= 1
+
+    if oldest == 'E':
+        stream['e_positions'].popleft()
+
+    window.popleft()
+    stream['counts'][oldest] -= 1
+    stream['sum'] -= value
+
+def stream_features(stream):
+    window = stream['window']
+    n = len(window)
+    offset = stream['total'] - n
+    runs = stream['runs']
+    results = list(window)
+    numeric = [NUMERIC[r] for r in results]
+    counts = dict(stream['counts'])
+    return _finish_features({
+        'results': results,
+        'numeric': numeric,
+        'n': n,
+        'total': stream['total'],
+        'order': stream['order'],
+        'max_lag': stream['max_lag'],
+        'counts': counts,
+        'changes': stream['changes'],
+        'last_run': runs[-1][1] if runs else 0,
+        'max_streak': max((length for color, length in runs if color != 'E'), default=1) if n else 0,
+        'empate_streak': max((length for color, length in runs if color == 'E'), default=0),
+        'transitions': stream['transitions'],
+        'e_positions': [p - offset for p in stream['e_positions']],
+        'autocorr': correlations_from_sums(numeric, stream['lag_sums'], stream['max_lag']),
+        'contexts': stream['context'].lookup(),
+        'pattern_outcomes': stream['occurrences'].current(),
+        'matches': stream['automaton'].matched[stream['automaton_state']],
+        'trend_slope': stream['trend'].slope(counts['C'] + counts['V']),
+        'horizons': stream['horizons'].statistics()
+    }, stream['priors'])
+
+def extract_features(results, order=MARKOV_ORDER, max_lag=MAX_LAG, context_order=CONTEXT_ORDER,
+                     priors=None, automaton=None):
+    # Mesmo quadro de stream_features, construído numa única passada sobre a janela
+    # (árvore de contextos e índice de ocorrências cobrem apenas os resultados recebidos)
+    automaton = automaton or AUTOMATON
+    codes = [COLOR_CODES[result] for result in results]
+    context = ContextTree(context_order)
+    context.extend(codes)
+    occurrences = OccurrenceIndex()
+    occurrences.extend(codes)
+    trend = TrendEstimator()
+    trend.extend([NUMERIC[result] for result in results if result != 'E'])
+    horizons = WindowStatistics()
+    horizons.extend(codes)
+    counts = {'C': 0, 'V': 0, 'E': 0}
+    transitions = {}
+    numeric = []
+    e_positions = []
+    changes = 0
+    streak = 0
+    max_streak = 1 if results else 0
+    empate_streak = 0
+
+    for i, result in enumerate(results):
+        if i >= order:
+            state = tuple(results[i - order:i])
+            if state not in transitions:
+                transitions[state] = {'C': 0, 'V': 0, 'E': 0}
+            transitions[state][result] += 1
+
+        if i and result == results[i - 1]:
+            streak += 1
+        else:
+            if i:
+                changes += 1
+            streak = 1
+
+        if result == 'E':
+            empate_streak = max(empate_streak, streak)
+            e_positions.append(i)
+        else:
+            max_streak = max(max_streak, streak)
+
+        counts[result] += 1
+        numeric.append(NUMERIC[result])
+
+    return _finish_features({
+        'results': list(results),
+        'numeric': numeric,
+        'n': len(results),
+        'total': len(results),
+        'order': order,
+        'max_lag': max_lag,
+        'counts': counts,
+        'changes': changes,
+        'last_run': streak,
+        'max_streak': max_streak,
+        'empate_streak': empate_streak,
+        'transitions': transitions,
+        'e_positions': e_positions,
+        'autocorr': autocorrelation(numeric, max_lag),
+        'contexts': context.lookup(),
+        'pattern_outcomes': occurrences.current(),
+        'matches': automaton.matched[automaton.run(codes)],
+        'trend_slope': trend.slope(counts['C'] + counts['V']),
+        'horizons': horizons.statistics()
+    }, priors)
+
+def _finish_features(features, priors=None):
+    # Grandezas derivadas comuns aos dois construtores: entropia, runs, finais da
+    # janela e o que as prioris dizem do final atual
+    results = features['results']
+    n = features['n']
+    features['prior_context'] = lookup_prior_context(priors, results, features['order'])
+    features['prior_patterns'] = {} if priors is None else {
+        key: priors['patterns'][key] for key in features['pattern_outcomes'] if key in priors['patterns']
+    }
+    features['entropy'] = entropy_from_counts(features['counts'], n)
+    features['runs'] = features['changes'] + 1 if n else 0
+
+    # Ciclo mais forte (defasagem de maior |correlação|), compartilhado pelas camadas de ciclo
+    if n >= 8:
+        features['cycle'] = strongest_lag(features['autocorr'], min(features['max_lag'], n // 2))
+    else:
+        features['cycle'] = (None, 0.0)
+
+    # Contagens dos últimos k resultados e tamanho do final alternado, numa passada reversa
+    counts = {'C': 0, 'V': 0, 'E': 0}
+    tails = {}
+    alternating = 0
+    previous = None
+    for i in range(1, min(n, TAIL_LENGTHS[-1]) + 1):
+        result = results[-i]
+        counts[result] += 1
+        if alternating == i - 1 and result != previous:
+            alternating = i
+        previous = result
+        if i in TAIL_LENGTHS:
+            tails[i] = dict(counts)
+    for length in TAIL_LENGTHS:
+        tails.setdefault(length, dict(counts))
+    features['tail_counts'] = tails
+    features['alternating_tail'] = alternating
+
+    # Interferência "quântica" dos 5 resultados anteriores ao último
+    if n >= 6:
+        previous5 = dict(tails[6])
+        previous5[results[-1]] -= 1
+        features['interference'] = (
+            (previous5['C'] + previous5['E'] * 0.5) / 5,
+            (previous5['V'] + previous5['E'] * 0.5) / 5
+        )
+    else:
+        features['interference'] = None
+    return features
+
+# Núcleo de análise preditiva (estrutura mantida, lógica interna aprimorada)
+def analyze_data(features):
+    if features['total'] < MIN_RESULTS:
+        return {
+            'patterns': [],
+            'riskLevel': 'low',
+            'manipulation': 'low',
+            'prediction': None,
+            'confidence': 0,
+            'recommendation': 'more-data',
+            'layers': {}
+        }
+
+    # A janela (WINDOW_SIZE) já é mantida pelo estado incremental; cada camada
+    # é avaliada uma única vez sobre o mesmo quadro de features
+    patterns = detect_patterns(features)
+    risk_level = profiled(assess_risk, features)
+    manipulation = profiled(detect_manipulation, features)
+    layers = layer_predictions(features, patterns, risk_level)
+    prediction = profiled(combine_predictions, layers, features['results'][-1], manipulation)
+
+    return {
+        'patterns': patterns,
+        'riskLevel': risk_level,
+        'manipulation': manipulation,
+        'prediction': prediction['color'],
+        'confidence': prediction['confidence'],
+        'recommendation': get_recommendation(risk_level, manipulation, prediction['confidence']),
+        'layers': layers
+    }
+
+# Camada 1: Detecção de padrões com algoritmos avançados
+def detect_patterns(features):
+    patterns = []
+    results = features['results']
+    
+    if not results:
+        return patterns
+
+    # Análise de entropia para detectar aleatoriedade
+    entropy = features['entropy']
+    if entropy > HIGH_ENTROPY:
+        patterns.append({
+            'type': 'high-entropy',
+            'description': f'Alta aleatoriedade detectada (entropia: {entropy:.2f})'
+        })
+
+    # Detecção de padrões ocultos usando Markov
+    markov_patterns = profiled(detect_markov_patterns, features)
+    patterns.extend(markov_patterns)
+
+    # Detecção de ciclos usando autocorrelação simplificada
+    cycle_patterns = profiled(detect_cycles, features)
+    patterns.extend(cycle_patterns)
+
+    # Padrões tradicionais (mantidos para compatibilidade)
+    patterns.extend(profiled(detect_basic_patterns, features))
+    
+    # Padrões quânticos simulados (não lineares)
+    quantum_patterns = profiled(detect_quantum_patterns, features)
+    patterns.extend(quantum_patterns)
+
+    return patterns
+
+def detect_basic_patterns(features):
+    basic_patterns = []
+    results = features['results']
+    # Padrões reconhecidos no final da sequência pelo autômato (uma transição por resultado)
+    matches = features['matches']
+
+    # Sequências repetidas
+    if 'streak' in matches:
+        current_streak = features['last_run']
+        current_color = results[-1]
+        basic_patterns.append(with_history(features, ('streak', COLOR_CODES[current_color], current_streak), {
+            'type': 'streak',
+            'color': current_color,
+            'length': current_streak,
+            'description': f'{current_streak}x {get_color_name(current_color)} seguidas'
+        }))
+
+    # Alternância
+    if 'alternating' in matches:
+        basic_patterns.append(with_history(features, ('alternating', COLOR_CODES[results[-1]]), {
+            'type': 'alternating',
+            'description': 'Padrão alternado detectado'
+        }))
+
+    # Padrões 2x2
+    if '2x2' in matches:
+        basic_patterns.append(with_history(features, ('2x2', COLOR_CODES[results[-4]], COLOR_CODES[results[-2]]), {
+            'type': '2x2',
+            'description': 'Padrão 2x2 detectado'
+        }))
+            
+    # Padrões com empates
+    if 'high-empate' in matches:
+        basic_patterns.append(with_history(features, ('high-empate',), {
+            'type': 'high-empate',
+            'description': 'Alta frequência de empates'
+        }))
+            
+    # Padrão ZigZag
+    if 'zigzag' in matches:
+        basic_patterns.append(with_history(features, ('zigzag', COLOR_CODES[results[-1]]), {
+            'type': 'zigzag',
+            'color': results[-1],
+            'description': 'Padrão ZigZag detectado'
+        }))
+
+    # Sequências personalizadas
+    for name in matches:
+        if name not in BASIC_PATTERNS:
+            basic_patterns.append({
+                'type': 'custom',
+                'name': name,
+                'description': f'Sequência personalizada "{name}" detectada'
+            })
+    
+    return basic_patterns
+
+def _outcome_summary(counts):
+    total = sum(counts)
+    return '{} ocorrências: {}'.format(
+        total, ', '.join(f'{get_color_name(color)} {count / total:.0%}' for color, count in zip(COLORS, counts))
+    )
+
+def with_history(features, key, pattern):
+    # Anexa ao padrão o que veio depois das suas ocorrências em todo o histórico
+    counts = features['pattern_outcomes'].get(key)
+    if counts and sum(counts):
+        pattern['history'] = counts
+        pattern['description'] += ' · depois, em ' + _outcome_summary(counts)
+
+    # Sem ocorrências suficientes nesta sessão, as das sessões arquivadas
+    if not counts or counts[0] + counts[1] < MIN_PATTERN_SUPPORT:
+        prior = features['prior_patterns'].get(key)
+        if prior and prior[0] + prior[1] >= MIN_PATTERN_SUPPORT:
+            pattern['prior'] = prior
+            pattern['description'] += ' · nos arquivos, em ' + _outcome_summary(prior)
+    return pattern
+
+def historical_prediction(pattern, default):
+    # Resultado seguinte mais frequente (C ou V) nas ocorrências do padrão, com a
+    # frequência observada como confiança; sem ocorrências suficientes nesta sessão
+    # nem nos arquivos, a previsão fixa
+    counts = pattern.get('history')
+    if not counts or counts[0] + counts[1] < MIN_PATTERN_SUPPORT:
+        counts = pattern.get('prior')
+        if not counts:
+            return default
+    c_count, v_count, _ = counts
+    color = 'C' if c_count > v_count else 'V' if v_count > c_count else random.choice(['C', 'V'])
+    return {'color': color, 'confidence': int(max(c_count, v_count) / sum(counts) * 100)}
+
+def entropy_from_counts(counts, total):
+    if total == 0:
+        return 0
+    probs = [count/total for count in counts.values() if count > 0]
+    return -sum(p * math.log2(p) for p in probs)
+
+def detect_markov_patterns(features):
+    patterns = []
+    results = features['results']
+    order = features['order']
+    if len(results) < order + 1:
+        return patterns
+    
+    # Matriz de transição de Markov (mantida incrementalmente)
+    transitions = features['transitions']
+    
+    # Analisar transições significativas
+    current_state = tuple(results[-order:])
+    if current_state in transitions:
+        total = sum(transitions[current_state].values())
+        if total > 0:
+            for color, count in transitions[current_state].items():
+                prob = count / total
+                if prob > MARKOV_THRESHOLD:  # Probabilidade significativa
+                    patterns.append({
+                        'type': f'markov-{order}',
+                        'color': color,
+                        'description': f'Padrão Markov (ordem {order}): {prob*100:.1f}% para {get_color_name(color)}'
+                    })
+
+    # Contexto mais longo do histórico completo (árvore de contextos) ou, sem
+    # suporte nesta sessão, das sessões arquivadas
+    context = longest_context(features)
+    source = ''
+    if context is None:
+        context = prior_context(features)
+        source = ' nos arquivos'
+    if context:
+        context_order, counts = context
+        total = sum(counts)
+        for color, count in zip(COLORS, counts):
+            prob = count / total
+            if prob > MARKOV_THRESHOLD:
+                patterns.append({
+                    'type': f'markov-{context_order}',
+                    'color': color,
+                    'description': f'Padrão Markov (ordem {context_order}, {total} ocorrências{source}): '
+                                   f'{prob*100:.1f}% para {get_color_name(color)}'
+                })
+    
+    return patterns
+
+def longest_context(features):
+    # (ordem, contagens C/V/E seguintes) do contexto mais longo acima de MARKOV_ORDER
+    # com ao menos MIN_CONTEXT_SUPPORT ocorrências; None se nenhum tiver suporte
+    contexts = features['contexts']
+    for order in range(len(contexts) - 1, features['order'], -1):
+        counts = contexts[order]
+        if counts and sum(counts) >= MIN_CONTEXT_SUPPORT:
+            return order, counts
+    return None
+
+def prior_context(features):
+    # Contexto das sessões arquivadas, procurado na montagem das features
+    return features['prior_context']
+
+def lookup_prior_context(priors, results, markov_order):
+    # Mesmo critério de longest_context sobre as transições globais dos arquivos
+    # (mesmas chaves da árvore de contextos: dígitos em base 3, o mais recente
+    # como menos significativo, somados ao deslocamento da ordem)
+    if priors is None:
+        return None
+    contexts = priors['contexts']
+    keys = []
+    value = 0
+    for k in range(1, min(priors['max_order'], len(results)) + 1):
+        value += COLOR_CODES[results[-k]] * 3 ** (k - 1)
+        keys.append((3 ** k - 1) // 2 + value)
+    for order in range(len(keys), markov_order, -1):
+        counts = contexts[keys[order - 1]]
+        if sum(counts) >= MIN_CONTEXT_SUPPORT:
+            return order, counts
+    return None
+
+def detect_cycles(features):
+    patterns = []
+    
+    # Defasagem de maior autocorrelação na janela
+    best_lag, best_corr = features['cycle']
+    
+    if best_lag and abs(best_corr) > CYCLE_THRESHOLD:
+        patterns.append({
+            'type': 'cycle',
+            'length': best_lag,
+            'description': f'Ciclo detectado (tamanho {best_lag})'
+        })
+    
+    return patterns
+
+def detect_quantum_patterns(features):
+    patterns = []
+    if features['interference'] is None:
+        return patterns
+    
+    # Simulação de superposição quântica (empate conta 0.5 para cada lado)
+    c_interference, v_interference = features['interference']
+    
+    if abs(c_interference - v_interference) > 0.3:
+        dominant = 'C' if c_interference > v_interference else 'V'
+        patterns.append({
+            'type': 'quantum-interference',
+            'color': dominant,
+            'description': f'Padrão quântico dominante: {get_color_name(dominant)}'
+        })
+    
+    return patterns
+
+# Camada 2: Avaliação de risco aprimorada
+def assess_risk(features):
+    score = risk_score(features)
+    if score >= RISK_HIGH:
+        return 'high'
+    elif score >= RISK_MEDIUM:
+        return 'medium'
+    return 'low'
+
+def risk_score(features):
+    if not features['n']:
+        return 0
+    
+    # 1. Análise de entropia
+    entropy = features['entropy']
+    
+    # 2. Análise de distribuição
+    c_count = features['counts']['C']
+    v_count = features['counts']['V']
+    e_count = features['counts']['E']
+    total = features['n']
+    
+    imbalance = abs(c_count - v_count) / (total - e_count) if (total - e_count) > 0 else 0
+    
+    # 3. Teste de aleatoriedade simplificado
+    z_score = math.nan
+    if total >= RUNS_MIN_RESULTS and c_count + v_count > 1:
+        runs = features['runs']
+        
+        n1 = c_count
+        n2 = v_count
+        expected_runs = (2 * n1 * n2) / (n1 + n2) + 1
+        std_dev = math.sqrt((2 * n1 * n2 * (2 * n1 * n2 - n1 - n2)) / ((n1 + n2)**2 * (n1 + n2 - 1)))
+        
+        if std_dev != 0:
+            z_score = (runs - expected_runs) / std_dev
+    
+    # 4. Sequências extremas e 5. empates consecutivos
+    return int(risk_points(entropy, imbalance, z_score, features['max_streak'], features['empate_streak']))
+
+def risk_points(entropy, imbalance, runs_z, max_streak, empate_streak):
+    # Escore de risco a partir dos sinais da janela; escalares ou arrays NumPy
+    # (uma janela por elemento), com runs_z NaN onde o teste não se aplica
+    points = np.where(entropy < LOW_ENTROPY, RISK_LOW_ENTROPY_POINTS, 0)  # Padrões muito definidos têm maior risco de quebra
+    points = points + np.where(imbalance > IMBALANCE_THRESHOLD, RISK_IMBALANCE_POINTS, 0)
+    points = points + np.where(np.abs(np.nan_to_num(runs_z)) > RUNS_Z_THRESHOLD, RISK_RUNS_POINTS, 0)
+    points = points + np.where(max_streak >= STREAK_THRESHOLD,
+                               np.minimum(STREAK_MAX_POINTS, max_streak * STREAK_POINTS), 0)
+    return points + np.where(empate_streak >= EMPATE_STREAK_THRESHOLD, empate_streak * EMPATE_STREAK_POINTS, 0)
+
+# Camada 3: Detecção de manipulação avançada
+def detect_manipulation(features):
+    score = manipulation_score(features)
+    if score >= MANIPULATION_HIGH:
+        return 'high'
+    elif score >= MANIPULATION_MEDIUM:
+        return 'medium'
+    return 'low'
+
+def manipulation_score(features):
+    results = features['results']
+    if not results:
+        return 0
+    
+    # 1. Análise de frequência de empates
+    e_ratio = features['counts']['E'] / len(results)
+    
+    # 2. Padrões anti-naturais (sequências perfeitas demais)
+    alternating = features['alternating_tail'] if len(results) >= ALTERNATING_MIN_RESULTS else 0
+    
+    # 3. Mudanças bruscas de padrão
+    inversion = False
+    if len(results) >= INVERSION_MIN_RESULTS:
+        last8 = features['tail_counts'][8]
+        second_half = features['tail_counts'][4]
+        
+        first_c = last8['C'] - second_half['C']
+        first_v = last8['V'] - second_half['V']
+        second_c = second_half['C']
+        second_v = second_half['V']
+        
+        inversion = (first_c - first_v) * (second_c - second_v) < 0  # Inversão completa
+    
+    # 4. Distribuição temporal de empates
+    e_positions = features['e_positions']
+    empate_std = math.nan
+    if len(e_positions) >= EMPATE_REGULARITY_MIN:
+        intervals = [e_positions[i+1] - e_positions[i] for i in range(len(e_positions)-1)]
+        empate_std = np.std(intervals)
+    
+    # 5. Teste de Benford para resultados (adaptado)
+    chi_square = math.nan
+    if len(results) >= BENFORD_MIN_RESULTS:
+        first_digits = [int(str(i)[0]) for i in range(len(results)) if results[i] != 'E']
+        digit_counts = Counter(first_digits)
+        
+        chi_square = 0
+        for d in range(1, 10):
+            expected = BENFORD_LAW[d] * len(first_digits)
+            observed = digit_counts.get(d, 0)
+            if expected > 0:
+                chi_square += (observed - expected)**2 / expected
+    
+    return float(manipulation_points(e_ratio, alternating, inversion, empate_std, chi_square))
+
+def manipulation_points(e_ratio, alternating, inversion, empate_std, chi_square):
+    # Escore de manipulação a partir dos sinais da janela; escalares ou arrays
+    # NumPy, com alternating 0, empate_std e chi_square NaN onde não se aplicam
+    points = np.where(e_ratio > EMPATE_RATIO_THRESHOLD, np.minimum(EMPATE_RATIO_MAX_POINTS, e_ratio * 100), 0)
+    points = points + np.where(alternating >= ALTERNATING_MIN_RESULTS, ALTERNATING_POINTS, 0)
+    points = points + np.where(inversion, INVERSION_POINTS, 0)
+    with np.errstate(invalid='ignore'):
+        points = points + np.where(empate_std < EMPATE_REGULARITY_STD, EMPATE_REGULARITY_POINTS, 0)  # Empates muito regulares
+        return points + np.where(chi_square > BENFORD_THRESHOLD, BENFORD_POINTS, 0)  # Desvio significativo
+
+# Camada de previsão multi-nível
+# Pesos de cada camada na combinação ponderada (ordem de avaliação das camadas)
+LAYER_WEIGHTS = {
+    'markov': 0.15,
+    'entropy': 0.10,
+    'pattern': 0.20,
+    'cycle': 0.15,
+    'trend': 0.10,
+    'quantum': 0.10,
+    'risk': 0.10,
+    'meta': 0.05,
+    'rf': 0.05
+}
+TIE_BAND = 0.1            # Diferença de probabilidade C/V abaixo da qual há empate técnico
+TIE_DAMPING = 0.7         # Redução da confiança num empate técnico
+MANIPULATION_DAMPING = {'high': 0.7, 'medium': 0.85}  # Redução da confiança por nível de manipulação
+FALLBACK_CONFIDENCE = 50  # Confiança sem nenhuma camada com peso
+MIN_CONFIDENCE = 5        # Limites da confiança combinada (%)
+MAX_CONFIDENCE = 95
+
+def layer_predictions(features, patterns, risk_level):
+    # Previsões por nível (9 camadas)
+    return {
+        'markov': profiled(markov_prediction, features),                   # Nível 1: Análise de Markov
+        'entropy': profiled(entropy_prediction, features),                 # Nível 2: Análise de entropia
+        'pattern': profiled(pattern_based_prediction, features, patterns), # Nível 3: Padrões detectados
+        'cycle': profiled(cycle_based_prediction, features),               # Nível 4: Análise de ciclos
+        'trend': profiled(trend_analysis_prediction, features),            # Nível 5: Análise de tendências
+        'quantum': profiled(quantum_simulation_prediction, features),      # Nível 6: Simulação quântica
+        'risk': profiled(risk_based_prediction, features, risk_level),     # Nível 7: Análise de risco
+        'meta': profiled(meta_analysis_prediction, features),              # Nível 8: Meta-análise
+        'rf': profiled(simulated_rf_prediction, features)                  # Nível 9: Random Forest simulado
+    }
+
+def combine_predictions(layers, last_result, manipulation, layer_weights=LAYER_WEIGHTS, tie_band=TIE_BAND,
+                        tie_damping=TIE_DAMPING, manipulation_damping=MANIPULATION_DAMPING):
+    # Parâmetros explícitos para a varredura (varredura.py); a análise usa os padrões
+    predictions = []
+    weights = []
+    for name, weight in layer_weights.items():
+        predictions.append(layers[name]['color'])
+        weights.append(layers[name]['confidence'] * weight)
+    
+    # Combinação ponderada das previsões
+    c_score, v_score = 0, 0
+    total_weight = sum(weights)
+    
+    for i in range(len(predictions)):
+        if predictions[i] == 'C':
+            c_score += weights[i]
+        elif predictions[i] == 'V':
+            v_score += weights[i]
+    
+    if total_weight > 0:
+        c_prob = c_score / total_weight
+        v_prob = v_score / total_weight
+        
+        if abs(c_prob - v_prob) < tie_band:  # Empate técnico
+            final_color = last_result if last_result in ['C', 'V'] else random.choice(['C', 'V'])
+            confidence = max(c_prob, v_prob) * 100 * tie_damping  # Reduz confiança em empates
+        else:
+            final_color = 'C' if c_prob > v_prob else 'V'
+            confidence = max(c_prob, v_prob) * 100
+    else:
+        final_color = random.choice(['C', 'V'])
+        confidence = FALLBACK_CONFIDENCE
+    
+    # Ajuste final baseado em manipulação detectada
+    confidence *= manipulation_damping.get(manipulation, 1)  # Reduz confiança se há manipulação
+    
+    return {
+        'color': final_color,
+        'confidence': min(MAX_CONFIDENCE, max(MIN_CONFIDENCE, int(confidence)))  # Limites de 5% a 95%
+    }
+
+# Algoritmos de previsão por nível
+def markov_prediction(features):
+    results = features['results']
+    order = features['order']
+    if len(results) < order + 1:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+
+    # Contexto longo do histórico completo (ou dos arquivos), quando já foi observado o bastante
+    context = longest_context(features) or prior_context(features)
+    if context:
+        c_count, v_count, e_count = context[1]
+        total = c_count + v_count + e_count
+        c_prob, v_prob, e_prob = c_count / total, v_count / total, e_count / total
+        if c_prob > v_prob and c_prob > e_prob:
+            return {'color': 'C', 'confidence': int(c_prob * 80 + 20)}
+        elif v_prob > c_prob and v_prob > e_prob:
+            return {'color': 'V', 'confidence': int(v_prob * 80 + 20)}
+    
+    # Matriz de transição de Markov (mantida incrementalmente)
+    transitions = features['transitions']
+    
+    # Prever com base no estado atual
+    current_state = tuple(results[-order:])
+    if current_state in transitions:
+        total = sum(transitions[current_state].values())
+        if total > 0:
+            c_prob = transitions[current_state]['C'] / total
+            v_prob = transitions[current_state]['V'] / total
+            e_prob = transitions[current_state]['E'] / total
+            
+            if c_prob > v_prob and c_prob > e_prob:
+                return {'color': 'C', 'confidence': int(c_prob * 80 + 20)}  # Escala ajustada
+            elif v_prob > c_prob and v_prob > e_prob:
+                return {'color': 'V', 'confidence': int(v_prob * 80 + 20)}
+    
+    # Padrão não reconhecido - usar tendência geral
+    c_count = features['counts']['C']
+    v_count = features['counts']['V']
+    
+    if c_count > v_count:
+        return {'color': 'V', 'confidence': 55}  # Tendência de reversão
+    elif v_count > c_count:
+        return {'color': 'C', 'confidence': 55}
+    return {'color': random.choice(['C', 'V']), 'confidence': 50}
+
+def entropy_prediction(features):
+    results = features['results']
+    entropy = features['entropy']
+    
+    if entropy > HIGH_ENTROPY:  # Alto grau de aleatoriedade
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+    elif entropy < LOW_ENTROPY:  # Padrão definido
+        last_result = results[-1]
+        if last_result == 'E':
+            return {'color': random.choice(['C', 'V']), 'confidence': 60}
+        
+        # Continuar padrão com confiança baseada na entropia
+        return {'color': last_result, 'confidence': int((1 - entropy) * 70 + 30)}
+    else:  # Meio-termo
+        c_count = features['counts']['C']
+        v_count = features['counts']['V']
+        
+        if c_count > v_count:
+            return {'color': 'V', 'confidence': 60}  # Reversão para média
+        else:
+            return {'color': 'C', 'confidence': 60}
+
+def pattern_based_prediction(features, patterns):
+    results = features['results']
+    if not patterns:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+    
+    # Priorizar certos tipos de padrões
+    priority_patterns = [
+        'quantum-interference',
+        *(f'markov-{order}' for order in range(CONTEXT_ORDER, MARKOV_ORDER, -1)),  # Mais longo primeiro
+        'cycle',
+        'streak'
+    ]
+    for p_type in priority_patterns:
+        for pattern in patterns:
+            if pattern['type'] == p_type:
+                if 'color' in pattern:
+                    return historical_prediction(pattern, {'color': pattern['color'], 'confidence': 70})
+                elif p_type == 'streak' and pattern['length'] >= 3:
+                    return historical_prediction(pattern, {'color': 'V' if pattern['color'] == 'C' else 'C', 'confidence': 65})
+    
+    # Padrões secundários
+    for pattern in patterns:
+        if pattern['type'] == 'alternating':
+            last_result = results[-1]
+            return historical_prediction(pattern, {'color': 'V' if last_result == 'C' else 'C', 'confidence': 65})
+        elif pattern['type'] == 'zigzag':
+            last_result = results[-1]
+            return historical_prediction(pattern, {'color': 'V' if last_result == 'C' else 'C', 'confidence': 60})
+        elif pattern['type'] == '2x2':
+            last2 = results[-2:]
+            if len(set(last2)) == 1:
+                return historical_prediction(pattern, {'color': 'V' if last2[0] == 'C' else 'C', 'confidence': 60})
+    
+    # Padrão não reconhecido
+    return {'color': random.choice(['C', 'V']), 'confidence': 50}
+
+def cycle_based_prediction(features):
+    # Mesmo ciclo reportado por detect_cycles
+    best_lag, best_corr = features['cycle']
+    
+    if best_lag and abs(best_corr) > CYCLE_THRESHOLD:
+        # Prever baseado no ciclo detectado
+        cycle_values = features['numeric'][-best_lag:]
+        pred_value = np.mean(cycle_values)
+        pred_color = 'C' if pred_value > 0 else 'V'
+        return {'color': pred_color, 'confidence': int((abs(best_corr) * 70) + 30)}
+    
+    return {'color': random.choice(['C', 'V']), 'confidence': 50}
+
+def trend_analysis_prediction(features):
+    results = features['results']
+    if len(results) < 5:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+    
+    # Tendência linear dos resultados sem empates da janela (somas mantidas
+    # incrementalmente pelo estimador, consulta em O(1))
+    if features['counts']['C'] + features['counts']['V'] < 3:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+    
+    slope = features['trend_slope']
+    
+    if slope > 0.05:  # Tendência de alta para C
+        return {'color': 'C', 'confidence': 65}
+    elif slope < -0.05:  # Tendência de alta para V
+        return {'color': 'V', 'confidence': 65}
+    else:  # Sem tendência clara
+        last_decided = next(result for result in reversed(results) if result != 'E')
+        return {'color': 'V' if last_decided == 'C' else 'C', 'confidence': 55}
+
+def quantum_simulation_prediction(features):
+    if features['interference'] is None:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+    
+    # Efeito de interferência quântica (mesmo sinal de detect_quantum_patterns)
+    c_interference, v_interference = features['interference']
+    
+    if abs(c_interference - v_interference) > 0.3:
+        dominant = 'C' if c_interference > v_interference else 'V'
+        return {'color': dominant, 'confidence': 70}
+    else:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+
+def risk_based_prediction(features, risk):
+    results = features['results']
+    
+    if risk == 'high':
+        # Em alto risco, prever quebra de padrão
+        last_result = results[-1]
+        if last_result in ['C', 'V']:
+            return {'color': 'V' if last_result == 'C' else 'C', 'confidence': 65}
+    elif risk == 'medium':
+        # Risco médio - prever continuação com menor confiança
+        last_result = results[-1]
+        if last_result in ['C', 'V']:
+            return {'color': last_result, 'confidence': 55}
+    
+    return {'color': random.choice(['C', 'V']), 'confidence': 50}
+
+def meta_analysis_prediction(features):
+    results = features['results']
+    if len(results) < 10:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+    
+    # Análise de múltiplas janelas temporais sobre todo o histórico, do curto ao
+    # longo prazo; janelas maiores que o histórico repetiriam a anterior e ficam de fora
+    total = features['total']
+    horizons = features['horizons']
+    windows = [horizons[length] for length in HORIZONS if length <= total] or [horizons[HORIZONS[0]]]
+    
+    predictions = []
+    for window in windows:
+        c_count = window['C']
+        v_count = window['V']
+        
+        if c_count > v_count:
+            predictions.append('V')  # Reversão para média
+        else:
+            predictions.append('C')
+    
+    # Votação majoritária
+    c_pred = predictions.count('C')
+    v_pred = predictions.count('V')
+    
+    if c_pred > v_pred:
+        return {'color': 'C', 'confidence': 60}
+    elif v_pred > c_pred:
+        return {'color': 'V', 'confidence': 60}
+    else:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+
+def simulated_rf_prediction(features):
+    results = features['results']
+    if len(results) < 15:
+        return {'color': random.choice(['C', 'V']), 'confidence': 50}
+    
+    # Simulação simplificada de Random Forest
+    counts = features['counts']
+    rf_features = [
+        counts['C'] - counts['V'],               # Diferença C-V
+        features['max_streak'],                  # Maior sequência
+        results[-1] == results[-2],              # Últimos iguais?
+        counts['E'],                             # Número de empates
+        features['entropy']                      # Entropia
+    ]
+    
+    # "Árvores de decisão" simuladas
+    tree1 = 'C' if rf_features[0] < -2 else 'V'
+    tree2 = 'C' if rf_features[1] >= 4 else 'V'
+    tree3 = 'C' if rf_features[2] else 'V'
+    tree4 = 'V' if rf_features[3] > 3 else 'C'
+    tree5 = 'C' if rf_features[4] < 0.7 else 'V'
+    
+    predictions = [tree1, tree2, tree3, tree4, tree5]
+    c_count = predictions.count('C')
+    v_count = predictions.count('V')
+    
+    if c_count > v_count:
+        return {'color': 'C', 'confidence': 60 + (c_count - v_count) * 5}
+    else:
+        return {'color': 'V', 'confidence': 60 + (v_count - c_count) * 5}
+
+# Recomendação baseada em múltiplos fatores
+def get_recommendation(risk, manipulation, confidence, bet=BET_CONFIDENCE, watch=WATCH_CONFIDENCE):
+    if risk == 'high' or manipulation == 'high':
+        return 'avoid'
+    elif confidence >= bet:
+        return 'bet'
+    elif confidence >= watch:
+        return 'watch'
+    else:
+        return 'more-data'
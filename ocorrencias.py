@@ -0,0 +1,150 @@
+# Índice de ocorrências dos padrões básicos em todo o histórico: para cada padrão
+# presente no final da sequência (sequência de uma cor, alternância, 2x2, muitos
+# empates, zigue-zague), quantas vezes cada resultado (C, V, E) veio a seguir.
+# As chaves usam os códigos 0/1/2 das cores:
+#   ('streak', cor, tamanho), ('alternating', última cor), ('2x2', 1ª cor, 2ª cor),
+#   ('high-empate',), ('zigzag', última cor)
+# Atualização incremental em O(1) por resultado; consulta em O(1) por chave.
+from collections import deque
+
+import numpy as np
+
+EMPATE = 2
+TAIL = 5                 # Maior final examinado pelos padrões
+MIN_ALTERNATING = 4      # Final alternado mínimo
+MIN_EMPATES = 3          # Empates entre os últimos TAIL resultados
+
+class OccurrenceIndex:
+    def __init__(self):
+        self.outcomes = {}                 # Chave do padrão -> [C, V, E] seguintes
+        self.recent = deque(maxlen=TAIL)   # Últimos códigos
+        self.run = 0                       # Tamanho da sequência atual (todo o histórico)
+        self.alternating = 0               # Tamanho do final alternado
+        self.active = []                   # Chaves presentes no final atual
+        self.total = 0
+
+    def _active_keys(self):
+        recent = self.recent
+        n = len(recent)
+        last = recent[-1]
+        keys = []
+        if self.run >= 2:
+            keys.append(('streak', last, self.run))
+        if self.alternating >= MIN_ALTERNATING:
+            keys.append(('alternating', last))
+        if n >= 4 and recent[-4] == recent[-3] and recent[-2] == last and recent[-4] != last:
+            keys.append(('2x2', recent[-4], last))
+        if n >= TAIL:
+            if sum(code == EMPATE for code in recent) >= MIN_EMPATES:
+                keys.append(('high-empate',))
+            if (recent[0] == recent[2] == last and recent[0] != recent[1]
+                    and recent[2] != recent[3]):
+                keys.append(('zigzag', last))
+        return keys
+
+    def _count(self, key, code, count=1):
+        counts = self.outcomes.get(key)
+        if counts is None:
+            self.outcomes[key] = counts = [0, 0, 0]
+        counts[code] += count
+
+    def push(self, code):
+        for key in self.active:
+            self._count(key, code)
+        recent = self.recent
+        if recent and recent[-1] == code:
+            self.run += 1
+            self.alternating = 1
+        else:
+            self.run = 1
+            self.alternating = self.alternating + 1 if recent else 1
+        recent.append(code)
+        self.total += 1
+        self.active = self._active_keys()
+
+    def extend(self, codes):
+        # Inserção em lote vetorizada: tamanhos de sequência e de alternância por
+        # posição, máscaras de cada padrão e contagem dos pares (padrão, próximo)
+        codes = np.asarray(codes, dtype=np.int64)
+        if not len(codes):
+            return
+        prefix = len(self.recent)
+        seq = np.concatenate([np.fromiter(self.recent, dtype=np.int64, count=prefix), codes])
+        size = len(seq)
+        index = np.arange(size)
+
+        same = np.zeros(size, dtype=bool)
+        same[1:] = seq[1:] == seq[:-1]
+        run = index - np.maximum.accumulate(np.where(same, 0, index)) + 1
+        alternating = index - np.maximum.accumulate(np.where(same, index, 0)) + 1
+        if prefix:
+            # O final anterior ao lote pode ser mais longo que os TAIL códigos guardados
+            run[run > index] += self.run - run[prefix - 1]
+            alternating[alternating > index] += self.alternating - alternating[prefix - 1]
+
+        # Finais t = prefix - 1 .. size - 2, cada um seguido por seq[t + 1]
+        t = index[max(prefix - 1, 0):size - 1]
+        following = seq[t + 1]
+        last = seq[t]
+        masks = {
+            'streak': run[t] >= 2,
+            'alternating': alternating[t] >= MIN_ALTERNATING
+        }
+        encoded = {
+            'streak': (run[t] * 3 + last) * 3 + following,
+            'alternating': last * 3 + following
+        }
+        back = [seq[np.maximum(t - k, 0)] for k in range(TAIL)]   # back[k] = seq[t - k]
+        masks['2x2'] = (t >= 3) & (back[3] == back[2]) & (back[1] == back[0]) & (back[3] != back[0])
+        encoded['2x2'] = (back[3] * 3 + last) * 3 + following
+        full = t >= TAIL - 1
+        empates = sum((code == EMPATE).astype(np.int64) for code in back)
+        masks['high-empate'] = full & (empates >= MIN_EMPATES)
+        encoded['high-empate'] = following
+        masks['zigzag'] = (full & (back[4] == back[2]) & (back[2] == back[0])
+                           & (back[4] != back[3]) & (back[2] != back[1]))
+        encoded['zigzag'] = last * 3 + following
+
+        for name, mask in masks.items():
+            unique, occurrences = np.unique(encoded[name][mask], return_counts=True)
+            for value, count in zip(unique.tolist(), occurrences.tolist()):
+                value, code = divmod(value, 3)
+                if name == 'streak':
+                    length, color = divmod(value, 3)
+                    key = ('streak', color, length)
+                elif name == '2x2':
+                    key = ('2x2',) + divmod(value, 3)
+                elif name == 'high-empate':
+                    key = ('high-empate',)
+                else:
+                    key = (name, value)
+                self._count(key, code, count)
+
+        self.run = int(run[-1])
+        self.alternating = int(alternating[-1])
+        self.recent.extend(codes[-TAIL:].tolist())
+        self.total += len(codes)
+        self.active = self._active_keys()
+
+    def checkpoint(self):
+        # Estado para desfazer o próximo push (só as chaves ativas recebem contagens)
+        nodes = {key: list(self.outcomes[key]) if key in self.outcomes else None for key in self.active}
+        return nodes, tuple(self.recent), self.run, self.alternating, list(self.active), self.total
+
+    def rollback(self, state):
+        nodes, recent, self.run, self.alternating, self.active, self.total = state
+        for key, node in nodes.items():
+            if node is None:
+                self.outcomes.pop(key, None)
+            else:
+                self.outcomes[key] = node
+        self.recent.clear()
+        self.recent.extend(recent)
+
+    def lookup(self, key):
+        counts = self.outcomes.get(key)
+        return tuple(counts) if counts else None
+
+    def current(self):
+        # Chave -> (C, V, E) seguintes de cada padrão presente no final atual
+        return {key: tuple(self.outcomes.get(key, (0, 0, 0))) for key in self.active}
@@ -1,49 +1,141 @@
-import streamlit as st
-import numpy as np
+import os
+import threading
+import time
+import uuid
 from datetime import datetime
-from collections import Counter
-import math
-import random
-
-# Inicialização do estado da sessão (inalterado)
-if 'history' not in st.session_state:
-    st.session_state.history = []
-    
-if 'analysis' not in st.session_state:
-    st.session_state.analysis = {
-        'patterns': [],
-        'riskLevel': 'low',
-        'manipulation': 'low',
-        'prediction': None,
-        'confidence': 0,
-        'recommendation': 'watch'
-    }
 
-# Funções auxiliares (inalteradas)
+import numpy as np
+import streamlit as st
+from nucleo import get_color_name, MIN_RESULTS
+from registro import ResultLog, LOG_DIR
+from importacao import load_bytes
+from motor import Table
+from memoria import AnalysisCache
+from mesas import TableManager
+from ingestao import FeedService
+from banco import HistoryStore
+from agregados import load_priors
+from automato import catalogue_automaton, load_custom_patterns
+from perfil import PROFILER
+from linha_tempo import timeline
+from historico import decode
+
+TIMELINE_POINTS = 2000  # Posições mais recentes exibidas na linha do tempo
+FEED_SOURCES = {        # Fontes de ingestão para as mesas (variáveis de ambiente)
+    'socket': os.environ.get('PADRAO30_FEED_SOCKET'),
+    'pipe': os.environ.get('PADRAO30_FEED_PIPE'),
+    'tail': os.environ.get('PADRAO30_FEED_TAIL')
+}
+DB_PATH = os.environ.get('PADRAO30_DB')   # Com banco SQLite, os registros vão para ele
+SESSION_PARAM = 'sessao'   # Parâmetro da URL que identifica a sessão (e a sua mesa)
+FEED_REFRESH = 1.0      # Intervalo de atualização da grade de mesas com ingestão ativa (s)
+
+# Banco SQLite compartilhado pelo processo (só com PADRAO30_DB)
+@st.cache_resource
+def get_history_store():
+    return HistoryStore(DB_PATH) if DB_PATH else None
+
+# Prioris dos arquivos (priors.npz gerado por agregados.py), lidas uma vez por
+# processo; a interface é quem as pede para as suas mesas
+@st.cache_resource
+def get_priors():
+    return load_priors()
+
+# Catálogo de padrões com as sequências do usuário (padroes.json), compilado uma
+# vez por processo
+@st.cache_resource
+def get_automaton():
+    return catalogue_automaton(load_custom_patterns())
+
+# Cache de análises compartilhado por todas as sessões do processo
+@st.cache_resource
+def get_analysis_cache():
+    return AnalysisCache()
+
+# Mesas das sessões da interface (histórico, estado incremental, registro em
+# disco e análise), uma por chave de sessão. Cada sessão do navegador só vê e
+# altera a sua; a chave fica na URL, de modo que recarregar a página ou reiniciar
+# o servidor retoma a mesma mesa, e abas com a mesma URL compartilham a mesa (e
+# o registro, que tem um único dono)
+@st.cache_resource
+def get_session_tables():
+    return {}, threading.Lock()
+
+def session_table_name(key):
+    # Nome da mesa da sessão no banco: '_' a separa das mesas do TableManager
+    return '_' + key
+
+def get_session_table(key):
+    tables, lock = get_session_tables()
+    with lock:
+        table = tables.get(key)
+        if table is None:
+            store = get_history_store()
+            if store is not None:
+                log = store.log(session_table_name(key))
+            else:
+                log = ResultLog(os.path.join(LOG_DIR, key))
+            table = tables[key] = Table(log=log, speculate=True, cache=get_analysis_cache(),
+                                        priors=get_priors(), automaton=get_automaton())
+        return table
+
+def session_key():
+    # Chave da URL, ou uma nova (gravada na URL) se faltar ou for inválida
+    key = st.query_params.get(SESSION_PARAM)
+    if key and key.isalnum() and len(key) <= 32:
+        return key
+    key = uuid.uuid4().hex[:12]
+    st.query_params[SESSION_PARAM] = key
+    return key
+
+# Mesas acompanhadas em paralelo, compartilhadas por todas as sessões
+@st.cache_resource
+def get_table_manager():
+    return TableManager(store=get_history_store(), priors=get_priors(), automaton=get_automaton())
+
+# Serviço de ingestão das mesas, iniciado uma vez por processo se houver fontes
+@st.cache_resource
+def get_feed_service():
+    sources = {key: value for key, value in FEED_SOURCES.items() if value}
+    if not sources:
+        return None
+    service = FeedService(get_table_manager())
+    service.start(**sources)
+    return service
+
+# Inicialização do estado da sessão: a mesa da chave da URL
+if 'table' not in st.session_state:
+    st.session_state.session_key = session_key()
+    st.session_state.table = get_session_table(st.session_state.session_key)
+
+# Funções auxiliares (camada fina sobre o motor)
 def add_result(result):
-    st.session_state.history.append({
-        'result': result,
-        'timestamp': datetime.now()
-    })
-    analyze_data(st.session_state.history)
+    st.session_state.table.add(result)
+
+def import_results():
+    # Importação em lote: um único acréscimo ao histórico e ao registro e uma única análise
+    upload = st.session_state.import_file
+    try:
+        if upload is not None:
+            codes, timestamps = load_bytes(upload.name, upload.getvalue())
+        else:
+            codes, timestamps = load_bytes('colado.txt', st.session_state.import_text.encode())
+    except ValueError as error:
+        st.session_state.import_message = ('error', str(error))
+        return
 
-def reset_history():
-    st.session_state.history = []
-    st.session_state.analysis = {
-        'patterns': [],
-        'riskLevel': 'low',
-        'manipulation': 'low',
-        'prediction': None,
-        'confidence': 0,
-        'recommendation': 'watch'
-    }
+    st.session_state.table.extend(codes, timestamps)
+    st.session_state.import_text = ''
+    st.session_state.import_message = ('success', f'{len(codes)} resultados importados')
 
-def get_color_name(color):
-    return {
-        'C': 'Vermelho',
-        'V': 'Azul',
-        'E': 'Empate'
-    }.get(color, '')
+def add_table_result(result):
+    try:
+        get_table_manager().add(st.session_state.table_name.strip(), result)
+    except ValueError as error:
+        st.session_state.table_message = str(error)
+
+def reset_history():
+    st.session_state.table.reset()
 
 def get_recommendation_color(rec):
     return {
@@ -53,792 +145,31 @@ def get_recommendation_color(rec):
         'more-data': 'background-color: #E5E7EB; color: #4B5563; border: 2px solid #9CA3AF;'
     }.get(rec, 'background-color: #E5E7EB; color: #4B5563; border: 2px solid #9CA3AF;')
 
-# Núcleo de análise preditiva (estrutura mantida, lógica interna aprimorada)
-def analyze_data(data):
-    if len(data) < 5:
-        st.session_state.analysis = {
-            'patterns': [],
-            'riskLevel': 'low',
-            'manipulation': 'low',
-            'prediction': None,
-            'confidence': 0,
-            'recommendation': 'more-data'
-        }
-        return
-
-    recent = data[-27:]  # Janela de análise aumentada para capturar mais padrões
-    patterns = detect_patterns(recent)
-    risk_level = assess_risk(recent)
-    manipulation = detect_manipulation(recent)
-    prediction = make_prediction(recent, patterns)
-
-    st.session_state.analysis = {
-        'patterns': patterns,
-        'riskLevel': risk_level,
-        'manipulation': manipulation,
-        'prediction': prediction['color'],
-        'confidence': prediction['confidence'],
-        'recommendation': get_recommendation(risk_level, manipulation, prediction['confidence'])
-    }
-
-# Camada 1: Detecção de padrões com algoritmos avançados
-def detect_patterns(data):
-    patterns = []
-    results = [d['result'] for d in data]
-    
-    if not results:
-        return patterns
-
-    # Análise de entropia para detectar aleatoriedade
-    entropy = calculate_entropy(results)
-    if entropy > 0.9:
-        patterns.append({
-            'type': 'high-entropy',
-            'description': f'Alta aleatoriedade detectada (entropia: {entropy:.2f})'
-        })
-
-    # Detecção de padrões ocultos usando Markov
-    markov_patterns = detect_markov_patterns(results)
-    patterns.extend(markov_patterns)
-
-    # Detecção de ciclos usando autocorrelação simplificada
-    cycle_patterns = detect_cycles(results)
-    patterns.extend(cycle_patterns)
-
-    # Padrões tradicionais (mantidos para compatibilidade)
-    patterns.extend(detect_basic_patterns(results))
-    
-    # Padrões quânticos simulados (não lineares)
-    quantum_patterns = detect_quantum_patterns(results)
-    patterns.extend(quantum_patterns)
-
-    return patterns
-
-def detect_basic_patterns(results):
-    basic_patterns = []
-    # Sequências repetidas
-    current_streak = 1
-    current_color = results[-1]
-    for i in range(len(results)-2, -1, -1):
-        if results[i] == current_color:
-            current_streak += 1
-        else:
-            break
-
-    if current_streak >= 2:
-        basic_patterns.append({
-            'type': 'streak',
-            'color': current_color,
-            'length': current_streak,
-            'description': f'{current_streak}x {get_color_name(current_color)} seguidas'
-        })
-
-    # Alternância
-    if len(results) >= 4:
-        alternating = all(results[i] != results[i+1] for i in range(len(results)-4, len(results)-1))
-        if alternating:
-            basic_patterns.append({
-                'type': 'alternating',
-                'description': 'Padrão alternado detectado'
-            })
-
-    # Padrões 2x2
-    if len(results) >= 4:
-        last4 = results[-4:]
-        if last4[0] == last4[1] and last4[2] == last4[3] and last4[0] != last4[2]:
-            basic_patterns.append({
-                'type': '2x2',
-                'description': 'Padrão 2x2 detectado'
-            })
-            
-    # Padrões com empates
-    if len(results) >= 5:
-        last5 = results[-5:]
-        if last5.count('E') >= 3:
-            basic_patterns.append({
-                'type': 'high-empate',
-                'description': 'Alta frequência de empates'
-            })
-            
-    # Padrão ZigZag
-    if len(results) >= 5:
-        last5 = results[-5:]
-        valid_pattern = (
-            last5[0] != last5[1] and 
-            last5[1] != last5[2] and 
-            last5[2] != last5[3] and 
-            last5[3] != last5[4] and
-            last5[0] == last5[2] and 
-            last5[2] == last5[4]
-        )
-        
-        if valid_pattern:
-            basic_patterns.append({
-                'type': 'zigzag',
-                'color': last5[4],
-                'description': 'Padrão ZigZag detectado'
-            })
-    
-    return basic_patterns
-
-def calculate_entropy(sequence):
-    counts = Counter(sequence)
-    probs = [count/len(sequence) for count in counts.values()]
-    return -sum(p * math.log2(p) for p in probs)
-
-def detect_markov_patterns(results, order=2):
-    patterns = []
-    if len(results) < order + 1:
-        return patterns
-    
-    # Matriz de transição de Markov
-    transitions = {}
-    for i in range(len(results) - order):
-        state = tuple(results[i:i+order])
-        next_state = results[i+order]
-        
-        if state not in transitions:
-            transitions[state] = {'C': 0, 'V': 0, 'E': 0}
-        transitions[state][next_state] += 1
-    
-    # Analisar transições significativas
-    current_state = tuple(results[-order:])
-    if current_state in transitions:
-        total = sum(transitions[current_state].values())
-        if total > 0:
-            for color, count in transitions[current_state].items():
-                prob = count / total
-                if prob > 0.7:  # Probabilidade significativa
-                    patterns.append({
-                        'type': f'markov-{order}',
-                        'color': color,
-                        'description': f'Padrão Markov (ordem {order}): {prob*100:.1f}% para {get_color_name(color)}'
-                    })
-    
-    return patterns
-
-def detect_cycles(results):
-    patterns = []
-    if len(results) < 8:
-        return patterns
-    
-    # Autocorrelação simplificada sem scipy
-    numeric = [1 if r == 'C' else (-1 if r == 'V' else 0) for r in results]
-    max_lag = min(10, len(numeric)//2)
-    best_lag = None
-    best_corr = -1
-    
-    for lag in range(1, max_lag+1):
-        s1 = numeric[:-lag]
-        s2 = numeric[lag:]
-        if len(s1) == 0 or len(s2) == 0:
-            continue
-        
-        mean1 = sum(s1) / len(s1)
-        mean2 = sum(s2) / len(s2)
-        
-        cov = sum((x - mean1) * (y - mean2) for x, y in zip(s1, s2)) / len(s1)
-        std1 = math.sqrt(sum((x - mean1)**2 for x in s1) / len(s1))
-        std2 = math.sqrt(sum((y - mean2)**2 for y in s2) / len(s2))
-        
-        if std1 * std2 != 0:
-            corr = cov / (std1 * std2)
-            if abs(corr) > abs(best_corr):
-                best_corr = corr
-                best_lag = lag
-    
-    if best_lag and abs(best_corr) > 0.4:
-        patterns.append({
-            'type': 'cycle',
-            'length': best_lag,
-            'description': f'Ciclo detectado (tamanho {best_lag})'
-        })
-    
-    return patterns
-
-def detect_quantum_patterns(results):
-    patterns = []
-    if len(results) < 6:
-        return patterns
-    
-    # Simulação de superposição quântica
-    recent = results[-6:]
-    c_probs = []
-    v_probs = []
-    
-    for i in range(len(recent)-1):
-        if recent[i] == 'C':
-            c_probs.append(1.0)
-            v_probs.append(0.0)
-        elif recent[i] == 'V':
-            c_probs.append(0.0)
-            v_probs.append(1.0)
-        else:  # Empate cria superposição
-            c_probs.append(0.5)
-            v_probs.append(0.5)
-    
-    # Efeito de interferência quântica
-    c_interference = sum(c_probs) / len(c_probs)
-    v_interference = sum(v_probs) / len(v_probs)
-    
-    if abs(c_interference - v_interference) > 0.3:
-        dominant = 'C' if c_interference > v_interference else 'V'
-        patterns.append({
-            'type': 'quantum-interference',
-            'color': dominant,
-            'description': f'Padrão quântico dominante: {get_color_name(dominant)}'
-        })
-    
-    return patterns
-
-# Camada 2: Avaliação de risco aprimorada
-def assess_risk(data):
-    results = [d['result'] for d in data]
-    if not results:
-        return 'low'
-    
-    risk_score = 0
-    
-    # 1. Análise de entropia
-    entropy = calculate_entropy(results)
-    if entropy < 0.5:
-        risk_score += 30  # Padrões muito definidos têm maior risco de quebra
-    
-    # 2. Análise de distribuição
-    c_count = results.count('C')
-    v_count = results.count('V')
-    e_count = results.count('E')
-    total = len(results)
-    
-    imbalance = abs(c_count - v_count) / (total - e_count) if (total - e_count) > 0 else 0
-    if imbalance > 0.4:
-        risk_score += 40
-    
-    # 3. Teste de aleatoriedade simplificado
-    if len(results) >= 10:
-        runs = 1
-        for i in range(1, len(results)):
-            if results[i] != results[i-1]:
-                runs += 1
-        
-        n1 = results.count('C')
-        n2 = results.count('V')
-        expected_runs = (2 * n1 * n2) / (n1 + n2) + 1
-        std_dev = math.sqrt((2 * n1 * n2 * (2 * n1 * n2 - n1 - n2)) / ((n1 + n2)**2 * (n1 + n2 - 1)))
-        
-        if std_dev != 0:
-            z_score = (runs - expected_runs) / std_dev
-            if abs(z_score) > 1.96:  # 95% de confiança
-                risk_score += 20
-    
-    # 4. Sequências extremas
-    max_streak = calculate_max_streak(results)
-    if max_streak >= 5:
-        risk_score += min(50, max_streak * 10)
-    
-    # 5. Empates consecutivos
-    empate_streak = calculate_empate_streak(results)
-    if empate_streak >= 2:
-        risk_score += empate_streak * 15
-    
-    # Mapeamento final do risco
-    if risk_score >= 70:
-        return 'high'
-    elif risk_score >= 40:
-        return 'medium'
-    return 'low'
-
-def calculate_max_streak(results):
-    if not results:
-        return 0
-    
-    max_streak = 1
-    current_streak = 1
-    current_color = results[0]
-    
-    for i in range(1, len(results)):
-        if results[i] == current_color and results[i] != 'E':
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 1
-            current_color = results[i]
-    
-    return max_streak
-
-def calculate_empate_streak(results):
-    if not results:
-        return 0
-    
-    max_streak = 0
-    current_streak = 0
-    
-    for result in results:
-        if result == 'E':
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 0
-    
-    return max_streak
-
-# Camada 3: Detecção de manipulação avançada
-def detect_manipulation(data):
-    results = [d['result'] for d in data]
-    if not results:
-        return 'low'
-    
-    manipulation_score = 0
-    
-    # 1. Análise de frequência de empates
-    e_ratio = results.count('E') / len(results)
-    if e_ratio > 0.25:
-        manipulation_score += min(40, e_ratio * 100)
-    
-    # 2. Padrões anti-naturais (sequências perfeitas demais)
-    if len(results) >= 10:
-        perfect_alternating = all(results[i] != results[i+1] for i in range(len(results)-10, len(results)-1))
-        if perfect_alternating:
-            manipulation_score += 30
-    
-    # 3. Mudanças bruscas de padrão
-    if len(results) >= 8:
-        first_half = results[-8:-4]
-        second_half = results[-4:]
-        
-        first_c = first_half.count('C')
-        first_v = first_half.count('V')
-        second_c = second_half.count('C')
-        second_v = second_half.count('V')
-        
-        if (first_c - first_v) * (second_c - second_v) < 0:  # Inversão completa
-            manipulation_score += 25
-    
-    # 4. Distribuição temporal de empates
-    e_positions = [i for i, r in enumerate(results) if r == 'E']
-    if len(e_positions) >= 3:
-        intervals = [e_positions[i+1] - e_positions[i] for i in range(len(e_positions)-1)]
-        if np.std(intervals) < 1.0:  # Empates muito regulares
-            manipulation_score += 30
-    
-    # 5. Teste de Benford para resultados (adaptado)
-    if len(results) >= 20:
-        first_digits = [int(str(i)[0]) for i in range(len(results)) if results[i] != 'E']
-        digit_counts = Counter(first_digits)
-        benford_law = {1: 0.301, 2: 0.176, 3: 0.125, 4: 0.097, 5: 0.079, 6: 0.067, 7: 0.058, 8: 0.051, 9: 0.046}
-        
-        chi_square = 0
-        for d in range(1, 10):
-            expected = benford_law[d] * len(first_digits)
-            observed = digit_counts.get(d, 0)
-            if expected > 0:
-                chi_square += (observed - expected)**2 / expected
-        
-        if chi_square > 15:  # Desvio significativo
-            manipulation_score += 35
-    
-    # Mapeamento final
-    if manipulation_score >= 65:
-        return 'high'
-    elif manipulation_score >= 35:
-        return 'medium'
-    return 'low'
-
-# Camada de previsão multi-nível
-def make_prediction(data, patterns):
-    results = [d['result'] for d in data]
-    if not results:
-        return {'color': None, 'confidence': 0}
-    
-    last_result = results[-1]
-    
-    # Previsões por nível (9 camadas)
-    predictions = []
-    weights = []
-    
-    # Nível 1: Análise de Markov
-    markov_pred = markov_prediction(results)
-    predictions.append(markov_pred['color'])
-    weights.append(markov_pred['confidence'] * 0.15)
-    
-    # Nível 2: Análise de entropia
-    entropy_pred = entropy_prediction(results)
-    predictions.append(entropy_pred['color'])
-    weights.append(entropy_pred['confidence'] * 0.10)
-    
-    # Nível 3: Padrões detectados
-    pattern_pred = pattern_based_prediction(results, patterns)
-    predictions.append(pattern_pred['color'])
-    weights.append(pattern_pred['confidence'] * 0.20)
-    
-    # Nível 4: Análise de ciclos
-    cycle_pred = cycle_based_prediction(results)
-    predictions.append(cycle_pred['color'])
-    weights.append(cycle_pred['confidence'] * 0.15)
-    
-    # Nível 5: Análise de tendências
-    trend_pred = trend_analysis_prediction(results)
-    predictions.append(trend_pred['color'])
-    weights.append(trend_pred['confidence'] * 0.10)
-    
-    # Nível 6: Simulação quântica
-    quantum_pred = quantum_simulation_prediction(results)
-    predictions.append(quantum_pred['color'])
-    weights.append(quantum_pred['confidence'] * 0.10)
-    
-    # Nível 7: Análise de risco
-    risk_pred = risk_based_prediction(results)
-    predictions.append(risk_pred['color'])
-    weights.append(risk_pred['confidence'] * 0.10)
-    
-    # Nível 8: Meta-análise
-    meta_pred = meta_analysis_prediction(results)
-    predictions.append(meta_pred['color'])
-    weights.append(meta_pred['confidence'] * 0.05)
-    
-    # Nível 9: Random Forest simulado
-    rf_pred = simulated_rf_prediction(results)
-    predictions.append(rf_pred['color'])
-    weights.append(rf_pred['confidence'] * 0.05)
-    
-    # Combinação ponderada das previsões
-    c_score, v_score = 0, 0
-    total_weight = sum(weights)
-    
-    for i in range(len(predictions)):
-        if predictions[i] == 'C':
-            c_score += weights[i]
-        elif predictions[i] == 'V':
-            v_score += weights[i]
-    
-    if total_weight > 0:
-        c_prob = c_score / total_weight
-        v_prob = v_score / total_weight
-        
-        if abs(c_prob - v_prob) < 0.1:  # Empate técnico
-            final_color = last_result if last_result in ['C', 'V'] else random.choice(['C', 'V'])
-            confidence = max(c_prob, v_prob) * 100 * 0.7  # Reduz confiança em empates
-        else:
-            final_color = 'C' if c_prob > v_prob else 'V'
-            confidence = max(c_prob, v_prob) * 100
-    else:
-        final_color = random.choice(['C', 'V'])
-        confidence = 50
-    
-    # Ajuste final baseado em manipulação detectada
-    manipulation = detect_manipulation(data)
-    if manipulation == 'high':
-        confidence *= 0.7  # Reduz confiança se manipulação alta
-    elif manipulation == 'medium':
-        confidence *= 0.85
-    
-    return {
-        'color': final_color,
-        'confidence': min(95, max(5, int(confidence)))  # Limites de 5% a 95%
-    }
-
-# Algoritmos de previsão por nível
-def markov_prediction(results, order=2):
-    if len(results) < order + 1:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    
-    # Matriz de transição de Markov
-    transitions = {}
-    for i in range(len(results) - order):
-        state = tuple(results[i:i+order])
-        next_state = results[i+order]
-        
-        if state not in transitions:
-            transitions[state] = {'C': 0, 'V': 0, 'E': 0}
-        transitions[state][next_state] += 1
-    
-    # Prever com base no estado atual
-    current_state = tuple(results[-order:])
-    if current_state in transitions:
-        total = sum(transitions[current_state].values())
-        if total > 0:
-            c_prob = transitions[current_state]['C'] / total
-            v_prob = transitions[current_state]['V'] / total
-            e_prob = transitions[current_state]['E'] / total
-            
-            if c_prob > v_prob and c_prob > e_prob:
-                return {'color': 'C', 'confidence': int(c_prob * 80 + 20)}  # Escala ajustada
-            elif v_prob > c_prob and v_prob > e_prob:
-                return {'color': 'V', 'confidence': int(v_prob * 80 + 20)}
-    
-    # Padrão não reconhecido - usar tendência geral
-    c_count = results.count('C')
-    v_count = results.count('V')
-    
-    if c_count > v_count:
-        return {'color': 'V', 'confidence': 55}  # Tendência de reversão
-    elif v_count > c_count:
-        return {'color': 'C', 'confidence': 55}
-    return {'color': random.choice(['C', 'V']), 'confidence': 50}
-
-def entropy_prediction(results):
-    entropy = calculate_entropy(results)
-    
-    if entropy > 0.9:  # Alto grau de aleatoriedade
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    elif entropy < 0.5:  # Padrão definido
-        last_result = results[-1]
-        if last_result == 'E':
-            return {'color': random.choice(['C', 'V']), 'confidence': 60}
-        
-        # Continuar padrão com confiança baseada na entropia
-        return {'color': last_result, 'confidence': int((1 - entropy) * 70 + 30)}
-    else:  # Meio-termo
-        c_count = results.count('C')
-        v_count = results.count('V')
-        
-        if c_count > v_count:
-            return {'color': 'V', 'confidence': 60}  # Reversão para média
-        else:
-            return {'color': 'C', 'confidence': 60}
-
-def pattern_based_prediction(results, patterns):
-    if not patterns:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    
-    # Priorizar certos tipos de padrões
-    priority_patterns = ['quantum-interference', 'markov-3', 'cycle', 'streak']
-    for p_type in priority_patterns:
-        for pattern in patterns:
-            if pattern['type'] == p_type:
-                if 'color' in pattern:
-                    return {'color': pattern['color'], 'confidence': 70}
-                elif p_type == 'streak' and pattern['length'] >= 3:
-                    return {'color': 'V' if pattern['color'] == 'C' else 'C', 'confidence': 65}
-    
-    # Padrões secundários
-    for pattern in patterns:
-        if pattern['type'] == 'alternating':
-            last_result = results[-1]
-            return {'color': 'V' if last_result == 'C' else 'C', 'confidence': 65}
-        elif pattern['type'] == 'zigzag':
-            last_result = results[-1]
-            return {'color': 'V' if last_result == 'C' else 'C', 'confidence': 60}
-        elif pattern['type'] == '2x2':
-            last2 = results[-2:]
-            if len(set(last2)) == 1:
-                return {'color': 'V' if last2[0] == 'C' else 'C', 'confidence': 60}
-    
-    # Padrão não reconhecido
-    return {'color': random.choice(['C', 'V']), 'confidence': 50}
-
-def cycle_based_prediction(results):
-    if len(results) < 8:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    
-    # Converter para valores numéricos
-    numeric = [1 if r == 'C' else (-1 if r == 'V' else 0) for r in results]
-    
-    # Autocorrelação simplificada
-    max_lag = min(5, len(numeric)//2)
-    best_lag = None
-    best_corr = 0
-    
-    for lag in range(1, max_lag+1):
-        s1 = numeric[:-lag]
-        s2 = numeric[lag:]
-        if len(s1) == 0 or len(s2) == 0:
-            continue
-        
-        mean1 = sum(s1) / len(s1)
-        mean2 = sum(s2) / len(s2)
-        
-        cov = sum((x - mean1) * (y - mean2) for x, y in zip(s1, s2)) / len(s1)
-        std1 = math.sqrt(sum((x - mean1)**2 for x in s1) / len(s1))
-        std2 = math.sqrt(sum((y - mean2)**2 for y in s2) / len(s2))
-        
-        if std1 * std2 != 0:
-            corr = cov / (std1 * std2)
-            if abs(corr) > abs(best_corr):
-                best_corr = corr
-                best_lag = lag
-    
-    if best_lag and abs(best_corr) > 0.4:
-        # Prever baseado no ciclo detectado
-        cycle_values = numeric[-best_lag:]
-        pred_value = np.mean(cycle_values)
-        pred_color = 'C' if pred_value > 0 else 'V'
-        return {'color': pred_color, 'confidence': int((abs(best_corr) * 70) + 30)}
-    
-    return {'color': random.choice(['C', 'V']), 'confidence': 50}
-
-def trend_analysis_prediction(results):
-    if len(results) < 5:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    
-    # Remover empates para análise de tendência
-    filtered = [r for r in results if r != 'E']
-    if len(filtered) < 3:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    
-    # Converter para série numérica
-    series = [1 if r == 'C' else -1 for r in filtered]
-    
-    # Calcular tendência linear simplificada
-    x = np.arange(len(series))
-    x_mean = np.mean(x)
-    y_mean = np.mean(series)
-    
-    numerator = sum((x[i] - x_mean) * (series[i] - y_mean) for i in range(len(series)))
-    denominator = sum((x[i] - x_mean)**2 for i in range(len(series)))
-    
-    if denominator != 0:
-        slope = numerator / denominator
-    else:
-        slope = 0
-    
-    if slope > 0.05:  # Tendência de alta para C
-        return {'color': 'C', 'confidence': 65}
-    elif slope < -0.05:  # Tendência de alta para V
-        return {'color': 'V', 'confidence': 65}
-    else:  # Sem tendência clara
-        last_result = filtered[-1]
-        return {'color': 'V' if last_result == 'C' else 'C', 'confidence': 55}
-
-def quantum_simulation_prediction(results):
-    if len(results) < 6:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    
-    recent = results[-6:]
-    c_probs = []
-    v_probs = []
-    
-    for i in range(len(recent)-1):
-        if recent[i] == 'C':
-            c_probs.append(1.0)
-            v_probs.append(0.0)
-        elif recent[i] == 'V':
-            c_probs.append(0.0)
-            v_probs.append(1.0)
-        else:  # Empate cria superposição
-            c_probs.append(0.5)
-            v_probs.append(0.5)
-    
-    # Efeito de interferência quântica
-    c_interference = sum(c_probs) / len(c_probs)
-    v_interference = sum(v_probs) / len(v_probs)
-    
-    if abs(c_interference - v_interference) > 0.3:
-        dominant = 'C' if c_interference > v_interference else 'V'
-        return {'color': dominant, 'confidence': 70}
-    else:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-
-def risk_based_prediction(results):
-    risk = assess_risk([{'result': r} for r in results])
-    
-    if risk == 'high':
-        # Em alto risco, prever quebra de padrão
-        last_result = results[-1]
-        if last_result in ['C', 'V']:
-            return {'color': 'V' if last_result == 'C' else 'C', 'confidence': 65}
-    elif risk == 'medium':
-        # Risco médio - prever continuação com menor confiança
-        last_result = results[-1]
-        if last_result in ['C', 'V']:
-            return {'color': last_result, 'confidence': 55}
-    
-    return {'color': random.choice(['C', 'V']), 'confidence': 50}
-
-def meta_analysis_prediction(results):
-    if len(results) < 10:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    
-    # Análise de múltiplas janelas temporais
-    windows = [
-        results[-10:],  # Curto prazo
-        results[-20:],  # Médio prazo
-        results[-30:]   # Longo prazo
-    ]
-    
-    predictions = []
-    for window in windows:
-        c_count = window.count('C')
-        v_count = window.count('V')
-        
-        if c_count > v_count:
-            predictions.append('V')  # Reversão para média
-        else:
-            predictions.append('C')
-    
-    # Votação majoritária
-    c_pred = predictions.count('C')
-    v_pred = predictions.count('V')
-    
-    if c_pred > v_pred:
-        return {'color': 'C', 'confidence': 60}
-    elif v_pred > c_pred:
-        return {'color': 'V', 'confidence': 60}
-    else:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-
-def simulated_rf_prediction(results):
-    if len(results) < 15:
-        return {'color': random.choice(['C', 'V']), 'confidence': 50}
-    
-    # Simulação simplificada de Random Forest
-    features = [
-        results.count('C') - results.count('V'),  # Diferença C-V
-        calculate_max_streak(results),           # Maior sequência
-        results[-1] == results[-2],              # Últimos iguais?
-        results.count('E'),                      # Número de empates
-        calculate_entropy(results)               # Entropia
-    ]
-    
-    # "Árvores de decisão" simuladas
-    tree1 = 'C' if features[0] < -2 else 'V'
-    tree2 = 'C' if features[1] >= 4 else 'V'
-    tree3 = 'C' if features[2] else 'V'
-    tree4 = 'V' if features[3] > 3 else 'C'
-    tree5 = 'C' if features[4] < 0.7 else 'V'
-    
-    predictions = [tree1, tree2, tree3, tree4, tree5]
-    c_count = predictions.count('C')
-    v_count = predictions.count('V')
-    
-    if c_count > v_count:
-        return {'color': 'C', 'confidence': 60 + (c_count - v_count) * 5}
-    else:
-        return {'color': 'V', 'confidence': 60 + (v_count - c_count) * 5}
-
-# Recomendação baseada em múltiplos fatores
-def get_recommendation(risk, manipulation, confidence):
-    if risk == 'high' or manipulation == 'high':
-        return 'avoid'
-    elif confidence >= 70:
-        return 'bet'
-    elif confidence >= 55:
-        return 'watch'
-    else:
-        return 'more-data'
-
 # Interface do usuário (totalmente mantida)
 def display_history_corrected():
-    if not st.session_state.history:
+    # Uma única leitura: um reset em outra sessão troca o histórico da mesa
+    history = st.session_state.table.history
+    if not history:
         st.info("Nenhum resultado inserido ainda. Use os botões acima para começar.")
         return
     
-    total = len(st.session_state.history)
-    count_c = sum(1 for r in st.session_state.history if r['result'] == 'C')
-    count_v = sum(1 for r in st.session_state.history if r['result'] == 'V')
-    count_e = sum(1 for r in st.session_state.history if r['result'] == 'E')
+    total = len(history)
+    count_c = history.counts['C']
+    count_v = history.counts['V']
+    count_e = history.counts['E']
+    streaks = history.streaks()
     
     st.markdown(f"""
     **Total:** {total} resultados  
     🔴 **Vermelho:** {count_c}  
     🔵 **Azul:** {count_v}  
-    🟡 **Empate:** {count_e}
+    🟡 **Empate:** {count_e}  
+    **Sequência atual:** {streaks['current']} · **maior:** {streaks['longest']} · **maior de empates:** {streaks['empate']}
     """)
 
     html_elements = []
-    for result in reversed(st.session_state.history[-72:]):
-        color_code = result['result']
-        time = result['timestamp'].strftime("%H:%M:%S")
+    for color_code, timestamp in history.tail(72):
+        time = timestamp.strftime("%H:%M:%S")
         
         style_map = {
             'C': 'background-color: #EF4444; color: white;',
@@ -856,12 +187,13 @@ def display_history_corrected():
 
     html_content = f'<div style="display: flex; flex-wrap: wrap; gap: 5px; margin: 10px 0;">{"".join(html_elements)}</div>'
     st.markdown(html_content, unsafe_allow_html=True)
-    st.caption(f"Exibindo últimos {min(len(st.session_state.history), 72)} resultados")
+    st.caption(f"Exibindo últimos {min(len(history), 72)} resultados")
     st.caption("Ordem: Mais recente → Mais antigo (esquerda → direita)")
 
 # Interface Streamlit (inalterada)
 st.set_page_config(page_title="Análise Preditiva", layout="wide")
 st.title("🎰 Sistema de Análise Preditiva")
+st.caption(f"Sessão {st.session_state.session_key}: guarde o endereço desta página para retomá-la")
 
 cols = st.columns(4)
 with cols[0]:
@@ -873,6 +205,16 @@ with cols[2]:
 with cols[3]:
     st.button("🔄 Reset", on_click=reset_history, help="Limpar histórico")
 
+with st.expander("📥 Importar resultados em lote"):
+    st.text_area("Sequência colada", key='import_text', placeholder="CCVEVC...")
+    st.file_uploader("Ou arquivo de sessão", type=['txt', 'csv', 'seg'], key='import_file',
+                     help="Texto C/V/E, CSV com coluna 'resultado' (e opcionalmente 'horario') ou segmento do registro")
+    st.button("Importar", on_click=import_results)
+    if 'import_message' in st.session_state:
+        kind, message = st.session_state.pop('import_message')
+        (st.error if kind == 'error' else st.success)(message)
+
+analysis = st.session_state.table.analysis
 col1, col2 = st.columns([2, 1])
 
 with col1:
@@ -882,8 +224,8 @@ with col1:
 with col2:
     with st.container():
         st.subheader("🧠 Padrões Detectados")
-        if st.session_state.analysis['patterns']:
-            for pattern in st.session_state.analysis['patterns']:
+        if analysis['patterns']:
+            for pattern in analysis['patterns']:
                 st.info(f"**{pattern['type'].upper()}**: {pattern['description']}")
         else:
             st.info("Nenhum padrão detectado")
@@ -892,24 +234,24 @@ with col2:
         st.subheader("⚠️ Análise de Risco")
         cols = st.columns(2)
         with cols[0]:
-            risk_level = st.session_state.analysis['riskLevel']
+            risk_level = analysis['riskLevel']
             st.metric("Risco de Quebra", risk_level.upper(), 
                       help="Probabilidade de quebra do padrão atual")
         with cols[1]:
-            manipulation = st.session_state.analysis['manipulation']
+            manipulation = analysis['manipulation']
             st.metric("Manipulação", manipulation.upper(),
                      help="Indícios de manipulação nos resultados")
     
     with st.container():
         st.subheader("📈 Previsão IA")
-        if st.session_state.analysis['prediction']:
-            color_name = get_color_name(st.session_state.analysis['prediction'])
-            color_icon = "🔴" if st.session_state.analysis['prediction'] == 'C' else "🔵"
-            confidence = st.session_state.analysis['confidence']
+        if analysis['prediction']:
+            color_name = get_color_name(analysis['prediction'])
+            color_icon = "🔴" if analysis['prediction'] == 'C' else "🔵"
+            confidence = analysis['confidence']
             
             st.markdown(
                 f"<div style='font-size: 1.5rem; text-align: center; margin: 1rem 0;'>"
-                f"{color_icon} {color_name} ({st.session_state.analysis['prediction']})"
+                f"{color_icon} {color_name} ({analysis['prediction']})"
                 f"</div>", 
                 unsafe_allow_html=True
             )
@@ -920,7 +262,7 @@ with col2:
     
     with st.container():
         st.subheader("💡 Recomendação")
-        rec = st.session_state.analysis['recommendation']
+        rec = analysis['recommendation']
         rec_text = ""
         if rec == 'bet': 
             rec_text = "✅ APOSTAR - Padrão favorável"
@@ -939,6 +281,82 @@ with col2:
             unsafe_allow_html=True
         )
 
+with st.expander("📉 Linha do tempo de risco e manipulação"):
+    history = st.session_state.table.history
+    if len(history) < MIN_RESULTS:
+        st.info(f"Registre ao menos {MIN_RESULTS} resultados para ver a linha do tempo.")
+    elif st.toggle("Calcular sobre todo o histórico", key='show_timeline'):
+        points = timeline(history.codes)
+        shown = slice(max(0, len(history) - TIMELINE_POINTS), None)
+        positions = np.arange(len(history))[shown] + 1
+        st.line_chart({
+            'posição': positions,
+            'Risco': points['risk'][shown],
+            'Manipulação': points['manipulation'][shown]
+        }, x='posição')
+        st.line_chart({
+            'posição': positions,
+            'Z de runs': points['runs_z'][shown],
+            'Desequilíbrio C/V': points['imbalance'][shown],
+            'Desvio dos intervalos de empate': points['empate_std'][shown],
+            'Qui-quadrado de Benford': points['benford_chi_square'][shown]
+        }, x='posição')
+        st.caption(f"Escores da janela de análise terminada em cada posição "
+                   f"(últimas {min(len(history), TIMELINE_POINTS)} de {len(history)})")
+
+with st.expander("🗂️ Mesas"):
+    manager = get_table_manager()
+    cols = st.columns([2, 1, 1, 1])
+    cols[0].text_input("Mesa", key='table_name', placeholder="mesa-1", label_visibility='collapsed')
+    cols[1].button("🔴 C", key='table_c', on_click=lambda: add_table_result('C'))
+    cols[2].button("🔵 V", key='table_v', on_click=lambda: add_table_result('V'))
+    cols[3].button("🟡 E", key='table_e', on_click=lambda: add_table_result('E'))
+    if 'table_message' in st.session_state:
+        st.error(st.session_state.pop('table_message'))
+
+    # Com ingestão ativa, a grade se redesenha sozinha a cada FEED_REFRESH segundos
+    feed = get_feed_service()
+
+    @st.fragment(run_every=FEED_REFRESH if feed is not None else None)
+    def show_tables():
+        manager.analyze()
+        if len(manager):
+            st.dataframe(manager.summary(), hide_index=True)
+        else:
+            st.info("Nenhuma mesa registrada ainda.")
+        if feed is not None:
+            stats = feed.stats()
+            st.caption(f"Ingestão: {stats['applied']} resultados em {stats['batches']} lotes "
+                       f"(último: {stats['last_batch']}), {stats['invalid']} linhas rejeitadas"
+                       + (f", {stats['rejected']} resultados de mesas inválidas" if stats['rejected'] else "")
+                       + (f", {stats['failed']} lotes com falha ({feed.last_failure})" if stats['failed'] else ""))
+
+    show_tables()
+
+# Consulta por período no banco (índice por mesa e horário)
+if get_history_store() is not None:
+    with st.expander("🔎 Consulta por período"):
+        store = get_history_store()
+        own = session_table_name(st.session_state.session_key)
+        names = [own] + get_table_manager().names()
+        cols = st.columns(4)
+        name = cols[0].selectbox("Mesa", names, format_func=lambda n: 'esta sessão' if n == own else n)
+        day = cols[1].date_input("Dia", key='query_day')
+        start = cols[2].time_input("De", value=datetime.strptime('00:00', '%H:%M').time(), key='query_start')
+        end = cols[3].time_input("Até", value=datetime.strptime('23:59', '%H:%M').time(), key='query_end')
+        started = time.perf_counter()
+        codes, _ = store.query(
+            name,
+            int(datetime.combine(day, start).timestamp() * 1000),
+            int(datetime.combine(day, end).timestamp() * 1000)
+        )
+        elapsed = time.perf_counter() - started
+        counts = np.bincount(codes, minlength=3)
+        st.caption(f"{len(codes)} resultados em {elapsed * 1000:.1f} ms — "
+                   f"🔴 {counts[0]}  🔵 {counts[1]}  🟡 {counts[2]}")
+        if len(codes):
+            st.code(''.join(decode(codes[-500:])), wrap_lines=True)
+
 with st.expander("ℹ️ Sobre o Sistema"):
     st.write("""
     **Sistema de análise preditiva para identificação de padrões em sequências.**
@@ -962,6 +380,46 @@ with st.expander("ℹ️ Sobre o Sistema"):
     """)
     st.caption("Versão 2.0 - Inteligência Avançada - Para fins educacionais")
 
+# Painel de desempenho, visível com ?debug=1 na URL
+if st.query_params.get('debug') == '1':
+    with st.expander("🛠️ Desempenho (depuração)"):
+        PROFILER.enabled = st.toggle("Instrumentação ativa", value=PROFILER.enabled,
+                                     help="Mede cada detector e camada e a latência de add_result")
+        snapshot = PROFILER.snapshot()
+        cols = st.columns(3)
+        for col, key in zip(cols, ('p50_s', 'p95_s', 'p99_s')):
+            value = snapshot['add_result'][key]
+            col.metric(f"add_result {key[:-2]}", "—" if value is None else f"{value * 1000:.2f} ms")
+        table = st.session_state.table
+        st.caption(f"Análises especulativas aproveitadas: {table.speculation_hits} "
+                   f"de {table.speculation_hits + table.speculation_misses} cliques")
+        if table.cache is not None:
+            cache = table.cache.stats()
+            st.caption(f"Cache de análises: {cache['size']}/{cache['maxsize']} entradas, "
+                       f"{cache['hits']} acertos, {cache['misses']} faltas, "
+                       f"{cache['evictions']} descartes ({cache['hit_rate']:.0%})")
+        priors = get_priors()
+        if priors is not None:
+            st.caption(f"Prioris dos arquivos: {priors['results']} resultados "
+                       f"em {priors['sessions']} sessões")
+        if snapshot['layers']:
+            st.dataframe([
+                {
+                    'etapa': name,
+                    'chamadas': stats['calls'],
+                    'total (ms)': round(stats['total_s'] * 1000, 3),
+                    'média (µs)': round(stats['mean_s'] * 1e6, 1),
+                    'máximo (µs)': round(stats['max_s'] * 1e6, 1)
+                }
+                for name, stats in snapshot['layers'].items()
+            ], hide_index=True)
+        cols = st.columns(3)
+        cols[0].download_button("Exportar JSON", PROFILER.to_json(), file_name="perfil.json",
+                                mime="application/json")
+        cols[1].download_button("Exportar Prometheus", PROFILER.to_prometheus(), file_name="perfil.prom",
+                                mime="text/plain")
+        cols[2].button("Zerar medições", on_click=PROFILER.reset)
+
 st.markdown("""
     <style>
     div[data-testid="stMetric"] > div {
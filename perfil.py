@@ -0,0 +1,113 @@
+# Instrumentação do caminho quente: tempo e contagem de chamadas por detector e
+# por camada de previsão, e latência de add_result (p50/p95/p99 numa janela móvel).
+# Desligada, cada ponto medido custa apenas o teste de PROFILER.enabled.
+import json
+import os
+import threading
+import time
+from collections import deque
+
+LATENCY_WINDOW = 1000   # Últimas latências de add_result consideradas nos percentis
+PERCENTILES = (0.5, 0.95, 0.99)
+
+class Profiler:
+    def __init__(self, enabled=False, window=LATENCY_WINDOW):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._window = window
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.layers = {}                          # nome -> [chamadas, tempo total, maior tempo]
+            self.latencies = deque(maxlen=self._window)
+            self.latency_count = 0
+            self.latency_sum = 0.0
+
+    def record(self, name, elapsed):
+        with self._lock:
+            stats = self.layers.get(name)
+            if stats is None:
+                self.layers[name] = [1, elapsed, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+
+    def record_latency(self, elapsed):
+        with self._lock:
+            self.latencies.append(elapsed)
+            self.latency_count += 1
+            self.latency_sum += elapsed
+
+    def percentiles(self):
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return {q: None for q in PERCENTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in PERCENTILES}
+
+    def snapshot(self):
+        percentiles = self.percentiles()
+        with self._lock:
+            layers = {
+                name: {
+                    'calls': calls,
+                    'total_s': total,
+                    'mean_s': total / calls,
+                    'max_s': longest
+                }
+                for name, (calls, total, longest) in sorted(self.layers.items(), key=lambda item: -item[1][1])
+            }
+            return {
+                'enabled': self.enabled,
+                'layers': layers,
+                'add_result': {
+                    'calls': self.latency_count,
+                    'total_s': self.latency_sum,
+                    'window': len(self.latencies),
+                    **{f'p{int(q * 100)}_s': value for q, value in percentiles.items()}
+                }
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP padrao30_layer_calls_total Chamadas por detector ou camada de previsão',
+            '# TYPE padrao30_layer_calls_total counter'
+        ]
+        lines += [f'padrao30_layer_calls_total{{layer="{name}"}} {stats["calls"]}'
+                  for name, stats in snapshot['layers'].items()]
+        lines += [
+            '# HELP padrao30_layer_seconds_total Tempo acumulado por detector ou camada de previsão',
+            '# TYPE padrao30_layer_seconds_total counter'
+        ]
+        lines += [f'padrao30_layer_seconds_total{{layer="{name}"}} {stats["total_s"]:.9f}'
+                  for name, stats in snapshot['layers'].items()]
+
+        latency = snapshot['add_result']
+        lines += [
+            '# HELP padrao30_add_result_seconds Latência de add_result (percentis da janela móvel)',
+            '# TYPE padrao30_add_result_seconds summary'
+        ]
+        for q in PERCENTILES:
+            value = latency[f'p{int(q * 100)}_s']
+            lines.append(f'padrao30_add_result_seconds{{quantile="{q}"}} '
+                         f'{"NaN" if value is None else f"{value:.9f}"}')
+        lines.append(f'padrao30_add_result_seconds_sum {latency["total_s"]:.9f}')
+        lines.append(f'padrao30_add_result_seconds_count {latency["calls"]}')
+        return '\n'.join(lines) + '\n'
+
+PROFILER = Profiler(enabled=os.environ.get('PADRAO30_PROFILE') == '1')
+
+def profiled(function, *args):
+    # Chama function(*args), medindo-a quando a instrumentação está ligada
+    if not PROFILER.enabled:
+        return function(*args)
+    start = time.perf_counter()
+    result = function(*args)
+    PROFILER.record(function.__name__, time.perf_counter() - start)
+    return result
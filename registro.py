@@ -0,0 +1,70 @@
+# Registro persistente dos resultados: segmentos binários só de acréscimo com
+# registros de tamanho fixo (instante em ms int64 + código int8, 9 bytes).
+# A reabertura mapeia o segmento em memória em vez de interpretá-lo linha a linha;
+# reset_history passa a gravar num segmento novo, preservando os anteriores.
+import os
+import threading
+
+import numpy as np
+
+RECORD = np.dtype([('timestamp', '<i8'), ('code', 'i1')])
+LOG_DIR = os.environ.get('PADRAO30_LOG_DIR', 'registros')
+SEGMENT_SUFFIX = '.seg'
+
+class ResultLog:
+    def __init__(self, directory=LOG_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock = threading.Lock()
+        segments = self.segments()
+        self.segment = segments[-1] if segments else self._segment_path(1)
+        self._discard_partial_record()
+        self._file = open(self.segment, 'ab')
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f'{number:06d}{SEGMENT_SUFFIX}')
+
+    def segments(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _discard_partial_record(self):
+        # Uma gravação interrompida pode deixar um registro incompleto no fim
+        if os.path.exists(self.segment):
+            size = os.path.getsize(self.segment)
+            if size % RECORD.itemsize:
+                os.truncate(self.segment, size - size % RECORD.itemsize)
+
+    def append(self, code, timestamp):
+        self.extend(np.array([code], dtype=np.int8), timestamp)
+
+    def extend(self, codes, timestamps):
+        records = np.empty(len(codes), dtype=RECORD)
+        records['code'] = codes
+        records['timestamp'] = timestamps
+        with self._lock:
+            self._file.write(records.tobytes())
+            self._file.flush()
+
+    def load(self, segment=None):
+        # (códigos, instantes) do segmento ativo, lidos por mapeamento em memória
+        segment = segment or self.segment
+        with self._lock:
+            self._file.flush()
+            count = os.path.getsize(segment) // RECORD.itemsize if os.path.exists(segment) else 0
+        if count == 0:
+            return np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64)
+        records = np.memmap(segment, dtype=RECORD, mode='r', shape=(count,))
+        return records['code'], records['timestamp']
+
+    def roll_over(self):
+        # Inicia um segmento novo; os anteriores continuam em disco
+        with self._lock:
+            self._file.close()
+            number = int(os.path.basename(self.segment)[:-len(SEGMENT_SUFFIX)]) + 1
+            self.segment = self._segment_path(number)
+            self._file = open(self.segment, 'ab')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,101 @@
+# Tendência por mínimos quadrados da série sem empates (C=1, V=-1) em forma
+# fechada. Somas prefixadas de y e de j*y (j = índice global do resultado) dão
+# Σy e Σxy de qualquer janela final em O(1); Σx e Σx² dependem só do tamanho.
+# A variante exponencial, opcional (decay), mantém somas ponderadas com x relativo
+# ao resultado mais recente (x = 0, -1, -2, ...), atualizadas em O(1) por
+# decaimento e deslocamento; sem decay essas somas não são mantidas.
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+class TrendEstimator:
+    def __init__(self, decay=None, capacity=INITIAL_CAPACITY):
+        self.decay = decay
+        self._sum_y = np.zeros(capacity + 1, dtype=np.int64)    # Σ y[j] para j < k
+        self._sum_jy = np.zeros(capacity + 1, dtype=np.int64)   # Σ j * y[j] para j < k
+        self.size = 0
+        # Somas ponderadas: Σw, Σwx, Σwy, Σwxy, Σwx²
+        self.weights = self.wx = self.wy = self.wxy = self.wxx = 0.0
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, extra):
+        needed = self.size + extra + 1
+        if needed > len(self._sum_y):
+            capacity = max(needed, 2 * len(self._sum_y))
+            for name in ('_sum_y', '_sum_jy'):
+                grown = np.zeros(capacity, dtype=np.int64)
+                grown[:self.size + 1] = getattr(self, name)[:self.size + 1]
+                setattr(self, name, grown)
+
+    def push(self, y):
+        self._reserve(1)
+        k = self.size
+        self._sum_y[k + 1] = self._sum_y[k] + y
+        self._sum_jy[k + 1] = self._sum_jy[k] + k * y
+        self.size += 1
+
+        decay = self.decay
+        if decay is None:
+            return
+        weights, wx, wy, wxy, wxx = self.weights, self.wx, self.wy, self.wxy, self.wxx
+        # Os pontos anteriores envelhecem (x -> x - 1) e perdem peso; o novo entra em x = 0
+        self.wxx = decay * (wxx - 2 * wx + weights)
+        self.wxy = decay * (wxy - wy)
+        self.wx = decay * (wx - weights)
+        self.wy = decay * wy + y
+        self.weights = decay * weights + 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.int64)
+        count = len(values)
+        if not count:
+            return
+        self._reserve(count)
+        k = self.size
+        j = np.arange(k, k + count)
+        self._sum_y[k + 1:k + count + 1] = self._sum_y[k] + np.cumsum(values)
+        self._sum_jy[k + 1:k + count + 1] = self._sum_jy[k] + np.cumsum(j * values)
+        self.size += count
+        if self.decay is None:
+            return
+
+        # Mesmo resultado de `count` pushes: pontos antigos deslocados de `count`
+        # e multiplicados por decay^count, novos com x = -idade e peso decay^idade
+        decay = self.decay
+        shrink = decay ** count
+        age = np.arange(count - 1, -1, -1, dtype=np.float64)
+        weight = decay ** age
+        x = -age
+        self.wxx = shrink * (self.wxx - 2 * count * self.wx + count * count * self.weights) + (weight * x * x).sum()
+        self.wxy = shrink * (self.wxy - count * self.wy) + (weight * x * values).sum()
+        self.wx = shrink * (self.wx - count * self.weights) + (weight * x).sum()
+        self.wy = shrink * self.wy + (weight * values).sum()
+        self.weights = shrink * self.weights + weight.sum()
+
+    def checkpoint(self):
+        # As somas prefixadas só crescem: basta o tamanho e as somas ponderadas
+        return self.size, self.weights, self.wx, self.wy, self.wxy, self.wxx
+
+    def rollback(self, state):
+        self.size, self.weights, self.wx, self.wy, self.wxy, self.wxx = state
+
+    def slope(self, length=None):
+        # Inclinação dos últimos `length` valores (todos, por omissão), com x = 0..length-1
+        m = self.size if length is None else min(length, self.size)
+        if m < 2:
+            return 0.0
+        k = self.size
+        sum_y = int(self._sum_y[k] - self._sum_y[k - m])
+        sum_xy = int(self._sum_jy[k] - self._sum_jy[k - m]) - (k - m) * sum_y
+        sum_x = m * (m - 1) // 2
+        sum_xx = (m - 1) * m * (2 * m - 1) // 6
+        return (m * sum_xy - sum_x * sum_y) / (m * sum_xx - sum_x * sum_x)
+
+    def weighted_slope(self):
+        if self.decay is None:
+            raise ValueError('Tendência exponencial desativada (crie o estimador com decay)')
+        denominator = self.weights * self.wxx - self.wx * self.wx
+        if denominator <= 1e-12:
+            return 0.0
+        return (self.weights * self.wxy - self.wx * self.wy) / denominator
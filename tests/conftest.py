@@ -0,0 +1,5 @@
+# Os módulos ficam na raiz do repositório, sem pacote: os testes os importam de lá
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
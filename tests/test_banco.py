@@ -0,0 +1,73 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from banco import HistoryStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'historico.db')
+
+
+def extend(store, name, codes, first_timestamp=0):
+    store.extend(name, np.array(codes, dtype=np.int8),
+                 np.arange(first_timestamp, first_timestamp + len(codes), dtype=np.int64))
+
+
+def test_flush_writes_buffered_results(path):
+    store = HistoryStore(path, flush_rows=1000, flush_interval=60)
+    extend(store, 'a', [0, 1, 2])
+    store.flush()
+    assert store.count('a') == 3
+    store.close()
+
+    reopened = HistoryStore(path, flush_interval=60)
+    codes, timestamps = reopened.load('a')
+    assert codes.tolist() == [0, 1, 2]
+    assert timestamps.tolist() == [0, 1, 2]
+    reopened.close()
+
+
+def test_two_writers_on_one_table_renumber_instead_of_failing(path):
+    first = HistoryStore(path, flush_rows=5, flush_interval=60)
+    second = HistoryStore(path, flush_rows=5, flush_interval=60)
+    for i in range(20):
+        extend(first if i % 2 else second, 'a', [i % 3], i)
+    first.flush()
+    second.flush()
+    assert first._pending == [] and second._pending == []
+    assert first.count('a') == 20
+    assert first.discarded == second.discarded == 0
+    first.close()
+    second.close()
+
+
+def test_transient_failure_keeps_the_batch_for_the_next_flush(path):
+    store = HistoryStore(path, flush_rows=1000, flush_interval=60)
+    extend(store, 'a', [0, 1])
+    blocker = sqlite3.connect(path, timeout=0)
+    blocker.execute('BEGIN IMMEDIATE')           # Outro processo com o banco travado
+    store._db.execute('PRAGMA busy_timeout = 0')
+    with pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    assert len(store._pending) == 2
+
+    extend(store, 'a', [2])
+    blocker.rollback()
+    blocker.close()
+    store.flush()
+    assert store.load('a')[0].tolist() == [0, 1, 2]
+    store.close()
+
+
+def test_sessions_survive_roll_over(path):
+    store = HistoryStore(path, flush_interval=60)
+    extend(store, 'a', [0, 0])
+    store.roll_over('a')
+    extend(store, 'a', [1], 10)
+    assert store.load('a')[0].tolist() == [1]
+    assert store.load('a', session=1)[0].tolist() == [0, 0]
+    assert store.sessions('a') == [(1, 0, 2), (2, 2, 3)]
+    store.close()
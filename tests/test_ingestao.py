@@ -0,0 +1,46 @@
+import pytest
+
+from ingestao import DEFAULT_TABLE, parse_line, split_batch
+
+
+def sizes(events):
+    return [(name, len(codes)) for name, codes, _ in events]
+
+
+def test_split_batch_keeps_events_that_fit():
+    events = [('a', [0, 1], 1), ('b', [2], 2)]
+    assert split_batch(events, limit=3) == (events, [])
+
+
+def test_split_batch_splits_the_event_that_does_not_fit():
+    events = [('a', [0, 1], 1), ('b', [0, 1, 2, 0], 2), ('c', [1], 3)]
+    batch, rest = split_batch(events, limit=4)
+    assert sizes(batch) == [('a', 2), ('b', 2)]
+    assert sizes(rest) == [('b', 2), ('c', 1)]
+    # Nada se perde nem muda de ordem
+    assert [code for _, codes, _ in batch + rest for code in codes] == [0, 1, 0, 1, 2, 0, 1]
+    assert [timestamp for _, _, timestamp in rest] == [2, 3]
+
+
+def test_split_batch_at_an_event_boundary_leaves_no_empty_piece():
+    events = [('a', [0, 1], 1), ('b', [2], 2)]
+    batch, rest = split_batch(events, limit=2)
+    assert sizes(batch) == [('a', 2)]
+    assert sizes(rest) == [('b', 1)]
+
+
+def test_split_batch_drains_a_large_event_in_order():
+    rest = [('a', list(range(10)), 1)]
+    pieces = []
+    while rest:
+        batch, rest = split_batch(rest, limit=4)
+        pieces.append(sizes(batch))
+    assert pieces == [[('a', 4)], [('a', 4)], [('a', 2)]]
+
+
+def test_parse_line():
+    assert parse_line('CVE') == (DEFAULT_TABLE, [0, 1, 2], None)
+    assert parse_line('mesa1 ccv')[:2] == ('mesa1', [0, 0, 1])
+    assert parse_line('   ') is None
+    with pytest.raises(ValueError):
+        parse_line('mesa1 CXV')
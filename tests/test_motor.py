@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from motor import Table
+from registro import ResultLog
+
+
+class FailingLog:
+    def load(self):
+        return np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int64)
+
+    def append(self, code, timestamp):
+        raise OSError('disco cheio')
+
+    def extend(self, codes, timestamps):
+        raise OSError('disco cheio')
+
+
+def test_failed_log_write_leaves_table_unchanged():
+    table = Table(log=FailingLog())
+    with pytest.raises(OSError):
+        table.add('C')
+    with pytest.raises(OSError):
+        table.extend(np.array([0, 1], dtype=np.int8), np.array([1, 2], dtype=np.int64))
+    assert len(table.history) == 0
+    assert table.stream['total'] == 0 and not table.stream['window']
+
+
+def test_table_reopens_from_its_log(tmp_path):
+    table = Table(log=ResultLog(str(tmp_path)))
+    for result in 'CVVECCV':
+        table.add(result)
+    table.log.close()
+
+    reopened = Table(log=ResultLog(str(tmp_path)))
+    assert reopened.history.results() == list('CVVECCV')
+    np.testing.assert_equal(reopened.features(), table.features())
+    reopened.log.close()
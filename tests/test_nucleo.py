@@ -0,0 +1,71 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+from nucleo import (
+    COLORS, COLOR_CODES, new_stream, stream_push, stream_extend, stream_features, stream_checkpoint,
+    stream_rollback
+)
+
+
+def sequence(size, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice('CCVVE') for _ in range(size)]
+
+
+def codes(results):
+    return np.array([COLOR_CODES[result] for result in results], dtype=np.int8)
+
+
+def features(stream):
+    # Cópia: parte do quadro (transições) é o próprio estado do stream
+    return copy.deepcopy(stream_features(stream))
+
+
+@pytest.mark.parametrize('size', [0, 1, 5, 27, 300, 3000])
+def test_stream_extend_matches_stream_push(size):
+    results = sequence(size, seed=size)
+    pushed = new_stream()
+    for result in results:
+        stream_push(pushed, result)
+    extended = new_stream()
+    stream_extend(extended, codes(results))
+    np.testing.assert_equal(features(extended), features(pushed))
+
+
+def test_stream_extend_in_pieces_matches_stream_push():
+    results = sequence(2500, seed=1)
+    pushed = new_stream()
+    for result in results:
+        stream_push(pushed, result)
+    extended = new_stream()
+    for start in range(0, len(results), 700):
+        stream_extend(extended, codes(results[start:start + 700]))
+    np.testing.assert_equal(features(extended), features(pushed))
+
+
+@pytest.mark.parametrize('size', [3, 40, 1500])
+def test_rollback_undoes_push(size):
+    stream = new_stream()
+    stream_extend(stream, codes(sequence(size, seed=2)))
+    before = features(stream)
+    for result in COLORS:
+        checkpoint = stream_checkpoint(stream)
+        stream_push(stream, result)
+        stream_rollback(stream, checkpoint)
+        np.testing.assert_equal(features(stream), before)
+
+
+def test_rollback_then_push_matches_plain_push():
+    results = sequence(800, seed=3)
+    plain = new_stream()
+    speculated = new_stream()
+    for result in results:
+        checkpoint = stream_checkpoint(speculated)
+        stream_push(speculated, 'E' if result != 'E' else 'C')
+        stream_rollback(speculated, checkpoint)
+        stream_push(speculated, result)
+        stream_push(plain, result)
+    np.testing.assert_equal(features(speculated), features(plain))
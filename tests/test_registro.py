@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+
+from registro import RECORD, ResultLog
+
+
+def test_reopen_loads_what_was_written(tmp_path):
+    log = ResultLog(str(tmp_path))
+    log.extend(np.array([0, 1, 2], dtype=np.int8), np.array([10, 20, 30], dtype=np.int64))
+    log.append(1, 40)
+    log.close()
+
+    reopened = ResultLog(str(tmp_path))
+    codes, timestamps = reopened.load()
+    assert codes.tolist() == [0, 1, 2, 1]
+    assert timestamps.tolist() == [10, 20, 30, 40]
+    reopened.append(2, 50)
+    assert reopened.load()[0].tolist() == [0, 1, 2, 1, 2]
+    reopened.close()
+
+
+def test_reopen_discards_partial_record(tmp_path):
+    log = ResultLog(str(tmp_path))
+    log.extend(np.array([0, 2], dtype=np.int8), np.array([1, 2], dtype=np.int64))
+    segment = log.segment
+    log.close()
+    with open(segment, 'ab') as f:
+        f.write(b'\x00' * (RECORD.itemsize - 3))     # Gravação interrompida
+
+    reopened = ResultLog(str(tmp_path))
+    assert os.path.getsize(segment) == 2 * RECORD.itemsize
+    assert reopened.load()[0].tolist() == [0, 2]
+    reopened.close()
+
+
+def test_roll_over_starts_a_new_segment_and_keeps_the_old(tmp_path):
+    log = ResultLog(str(tmp_path))
+    log.append(0, 1)
+    first = log.segment
+    log.roll_over()
+    log.append(1, 2)
+    log.close()
+
+    reopened = ResultLog(str(tmp_path))
+    assert reopened.segments() == [first, reopened.segment]
+    assert reopened.load()[0].tolist() == [1]
+    assert reopened.load(first)[0].tolist() == [0]
+    reopened.close()
@@ -0,0 +1,455 @@
+# Varredura de parâmetros da combinação das camadas: pesos de LAYER_WEIGHTS,
+# faixa e redução do empate técnico, reduções por manipulação e limiares de
+# get_recommendation. As camadas não dependem desses parâmetros, então cada
+# sequência gravada é reproduzida uma única vez pelo backtest (previsão e
+# confiança de cada camada, risco, manipulação) e as configurações são avaliadas
+# sobre essas saídas, em NumPy, com exatamente as contas de combine_predictions.
+#
+# As saídas pré-calculadas e as configurações ficam num bloco de memória
+# compartilhada (multiprocessing.shared_memory): os processos do pool se ligam
+# ao bloco uma vez, e cada tarefa recebe só a faixa de configurações a avaliar.
+# Os desempates aleatórios usam uma moeda fixa por posição, a mesma para todas
+# as configurações.
+#
+# A melhor de milhares de configurações sobre as mesmas posições está ajustada a
+# elas por construção: com --holdout F, o final (fração F) de cada sequência fica
+# de fora da varredura e as primeiras do ranking (e a atual) são reavaliadas nele.
+# Pelo mesmo motivo, as prioris dos arquivos só entram com --priors.
+#
+# Uso: python varredura.py sessao.txt|.csv|.seg ... [--random N] [--grid PARÂMETRO=V1,V2 ...]
+#                          [--workers N] [--sort hit_rate|calibration|brier|bet_hit_rate]
+#                          [--top 20] [--holdout 0.3] [--priors [priors.npz]] [--patterns [padroes.json]]
+#                          [--cache saidas.npz] [--check N] [--json]
+import argparse
+import json
+import os
+import sys
+from itertools import product
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+import nucleo
+from nucleo import COLORS, COLOR_CODES
+from backtest import LAYERS, LEVELS, RECOMMENDATIONS, LEVEL_CODES, RECOMMENDATION_CODES, run_backtest
+from historico import decode
+from importacao import load_file
+from agregados import PRIORS_FILE, load_priors
+from automato import CUSTOM_PATTERNS_FILE, catalogue_automaton, load_custom_patterns
+
+PRECOMPUTE_CHUNK = 5000   # Posições por tarefa do backtest (fixo: os desempates não mudam com o pool)
+CONFIGS_PER_TASK = 16
+SEED = 0
+C, V, E = (COLOR_CODES[color] for color in COLORS)
+HIGH, MEDIUM = LEVEL_CODES['high'], LEVEL_CODES['medium']
+
+PARAMETERS = (*LAYERS, 'tie_band', 'tie_damping', 'high_damping', 'medium_damping', 'watch', 'bet')
+# Intervalos da busca aleatória; os pesos são sorteados à parte (Dirichlet), pois
+# a combinação só depende das proporções entre eles
+RANGES = {
+    'tie_band': (0.0, 0.3),
+    'tie_damping': (0.5, 1.0),
+    'high_damping': (0.4, 1.0),
+    'medium_damping': (0.6, 1.0),
+    'watch': (40, 70),
+    'bet': (50, 90)
+}
+METRICS = ('hit_rate', 'hit_rate_excluding_empate', 'calibration', 'brier', 'bets', 'bet_hit_rate', 'watches')
+# Ordenação: (métrica, maior é melhor), com o desempate pela seguinte
+SORT_KEYS = {
+    'hit_rate': (('hit_rate', True), ('calibration', False)),
+    'calibration': (('calibration', False), ('hit_rate', True)),
+    'brier': (('brier', False), ('hit_rate', True)),
+    'bet_hit_rate': (('bet_hit_rate', True), ('bets', True))
+}
+
+def default_config():
+    return np.array([
+        *(nucleo.LAYER_WEIGHTS[name] for name in LAYERS),
+        nucleo.TIE_BAND, nucleo.TIE_DAMPING,
+        nucleo.MANIPULATION_DAMPING['high'], nucleo.MANIPULATION_DAMPING['medium'],
+        nucleo.WATCH_CONFIDENCE, nucleo.BET_CONFIDENCE
+    ], dtype=np.float64)
+
+def random_configs(count, seed=SEED):
+    rng = np.random.default_rng(seed)
+    configs = np.empty((count, len(PARAMETERS)))
+    configs[:, :len(LAYERS)] = rng.dirichlet(np.ones(len(LAYERS)), count)
+    for name, (low, high) in RANGES.items():
+        column = PARAMETERS.index(name)
+        if isinstance(low, int):
+            configs[:, column] = rng.integers(low, high + 1, count)
+        else:
+            configs[:, column] = rng.uniform(low, high, count)
+    # Limiares de recomendação em ordem (observar <= apostar)
+    watch, bet = PARAMETERS.index('watch'), PARAMETERS.index('bet')
+    configs[:, [watch, bet]] = np.sort(configs[:, [watch, bet]], axis=1)
+    return configs
+
+def grid_configs(grid):
+    # grid: parâmetro -> valores; os demais ficam nos valores do núcleo. Pontos
+    # com watch > bet (nível "observar" inalcançável) ficam de fora; devolve
+    # (configurações, pontos descartados)
+    base = default_config()
+    names = list(grid)
+    watch, bet = PARAMETERS.index('watch'), PARAMETERS.index('bet')
+    configs = []
+    skipped = 0
+    for values in product(*(grid[name] for name in names)):
+        config = base.copy()
+        for name, value in zip(names, values):
+            config[PARAMETERS.index(name)] = value
+        if config[watch] > config[bet]:
+            skipped += 1
+            continue
+        configs.append(config)
+    if not configs:
+        raise ValueError(f'Grade sem pontos válidos: watch > bet em todos os {skipped}')
+    return np.array(configs).reshape(-1, len(PARAMETERS)), skipped
+
+def parse_grid(specs):
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if name not in PARAMETERS or not values:
+            raise ValueError(f"Grade inválida: '{spec}' (use PARÂMETRO=V1,V2,...; parâmetros: {', '.join(PARAMETERS)})")
+        grid[name] = [float(value) for value in values.split(',')]
+    return grid
+
+# Saídas pré-calculadas das camadas
+def precompute(histories, workers=None, seed=SEED, priors=None, automaton=None):
+    # Backtest de cada sequência; só as posições com previsão entram na varredura
+    parts = []
+    for index, results in enumerate(histories):
+        if len(results) < 2:
+            continue
+        records = run_backtest(results, workers, PRECOMPUTE_CHUNK, seed + index * 1000003, priors, automaton)
+        codes = np.array([COLOR_CODES[r] for r in results], dtype=np.int8)
+        made = records['color'] >= 0
+        parts.append({
+            'layer_color': records['layer_color'][made],
+            'layer_confidence': records['layer_confidence'][made],
+            'risk': records['risk'][made],
+            'manipulation': records['manipulation'][made],
+            'last': codes[:-1][made],
+            'actual': codes[1:][made],
+            'session': np.full(int(made.sum()), index, dtype=np.int32)
+        })
+    if not parts:
+        raise ValueError('Nenhuma posição com previsão nas sequências informadas')
+    data = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+    data['coin'] = np.random.default_rng(seed).integers(C, V + 1, len(data['last'])).astype(np.int8)
+    return data
+
+def load_outputs(paths, cache=None, workers=None, seed=SEED, priors=None, automaton=None):
+    if cache and os.path.exists(cache):
+        with np.load(cache) as saved:
+            return {key: saved[key] for key in saved.files}
+    histories = [decode(load_file(path)[0]) for path in paths]
+    data = precompute(histories, workers, seed, priors, automaton)
+    if cache:
+        np.savez_compressed(cache, **data)
+    return data
+
+def split_holdout(data, fraction):
+    # (ajuste, validação): o final de cada sequência (fração `fraction` das suas
+    # posições) vai para a validação; as posições são walk-forward, então a
+    # validação vem sempre depois do trecho ajustado
+    session = data.get('session', np.zeros(len(data['last']), dtype=np.int32))
+    held = np.zeros(len(session), dtype=bool)
+    for index in np.unique(session):
+        positions = np.flatnonzero(session == index)
+        held[positions[len(positions) - int(round(len(positions) * fraction)):]] = True
+    if held.all() or not held.any():
+        raise ValueError(f'Fração de validação {fraction} não separa as {len(held)} posições')
+    return ({key: value[~held] for key, value in data.items()},
+            {key: value[held] for key, value in data.items()})
+
+# Memória compartilhada: um bloco com todos os vetores, descritos por
+# (nome, dtype, forma, deslocamento)
+def share(arrays):
+    layout = []
+    offset = 0
+    for name, array in arrays.items():
+        layout.append((name, array.dtype.str, array.shape, offset))
+        offset += -(-array.nbytes // 8) * 8
+    block = SharedMemory(create=True, size=max(offset, 1))
+    for (name, dtype, shape, offset), array in zip(layout, arrays.values()):
+        np.ndarray(shape, dtype, buffer=block.buf, offset=offset)[...] = array
+    return block, layout
+
+def attach(name, layout):
+    block = SharedMemory(name=name)
+    arrays = {key: np.ndarray(shape, dtype, buffer=block.buf, offset=offset) for key, dtype, shape, offset in layout}
+    return block, arrays
+
+_shared = {}
+
+def _init_worker(name, layout):
+    # Uma vez por processo: liga-se ao bloco e prepara as parcelas de cada camada
+    # (confiança se prevê C, se prevê V e sempre) e os buffers das somas
+    block, arrays = attach(name, layout)
+    confidence = arrays['layer_confidence'].T.astype(np.float64)   # (camadas, posições)
+    colors = arrays['layer_color'].T
+    _shared.update(arrays)
+    _shared['block'] = block
+    _shared['parcels'] = np.ascontiguousarray(
+        np.stack([np.where(colors == C, confidence, 0.0), np.where(colors == V, confidence, 0.0), confidence], axis=1)
+    )
+    _shared['scores'] = np.empty((3, len(arrays['last'])))
+    _shared['product'] = np.empty((3, len(arrays['last'])))
+    _shared['last_decided'] = (arrays['last'] == C) | (arrays['last'] == V)
+    _shared['tie_color'] = np.where(_shared['last_decided'], arrays['last'], arrays['coin'])
+    _shared['decided'] = arrays['actual'] != E
+    _shared['avoid'] = (arrays['risk'] == HIGH) | (arrays['manipulation'] == HIGH)
+
+def _release():
+    # As vistas do bloco precisam sumir antes de fechá-lo
+    block = _shared.pop('block')
+    _shared.clear()
+    block.close()
+
+def combine(config):
+    # combine_predictions e get_recommendation em todas as posições de uma vez,
+    # com as somas na mesma ordem (resultados idênticos aos do núcleo)
+    weights = config[:len(LAYERS)]
+    tie_band, tie_damping, high_damping, medium_damping, watch, bet = config[len(LAYERS):]
+    scores, product = _shared['scores'], _shared['product']
+    scores.fill(0.0)
+    for parcels, weight in zip(_shared['parcels'], weights):
+        np.multiply(parcels, weight, out=product)
+        scores += product
+    c_score, v_score, total = scores
+    positive = total > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c_prob = c_score / total
+        v_prob = v_score / total
+    tie = np.abs(c_prob - v_prob) < tie_band
+    color = np.where(tie, _shared['tie_color'], np.where(c_prob > v_prob, C, V))
+    confidence = np.maximum(c_prob, v_prob) * 100
+    confidence = np.where(tie, confidence * tie_damping, confidence)
+    color = np.where(positive, color, _shared['coin'])
+    chance = ~positive | (tie & ~_shared['last_decided'])     # Posições decididas pela moeda
+    confidence = np.where(positive, confidence, nucleo.FALLBACK_CONFIDENCE)
+    damping = np.ones(len(LEVELS))      # Níveis sem redução em MANIPULATION_DAMPING
+    damping[MEDIUM], damping[HIGH] = medium_damping, high_damping
+    confidence *= damping[_shared['manipulation']]
+    confidence = np.clip(np.floor(confidence), nucleo.MIN_CONFIDENCE, nucleo.MAX_CONFIDENCE).astype(np.int64)
+    recommendation = np.where(
+        _shared['avoid'], RECOMMENDATION_CODES['avoid'],
+        np.where(confidence >= bet, RECOMMENDATION_CODES['bet'],
+                 np.where(confidence >= watch, RECOMMENDATION_CODES['watch'], RECOMMENDATION_CODES['more-data']))
+    )
+    return color, confidence, recommendation, chance
+
+def evaluate(config):
+    color, confidence, recommendation, _ = combine(config)
+    hits = color == _shared['actual']
+    decided = _shared['decided']
+    count = len(hits)
+    # Erro de calibração: |confiança média - acerto| nas faixas de 10% do backtest,
+    # ponderado pelo número de previsões em cada faixa
+    buckets = np.minimum(confidence // 10, 9)
+    expected = np.bincount(buckets, confidence / 100, minlength=10)
+    observed = np.bincount(buckets, hits, minlength=10)
+    bets = recommendation == RECOMMENDATION_CODES['bet']
+    return (
+        hits.mean() if count else np.nan,
+        hits[decided].mean() if decided.any() else np.nan,
+        np.abs(expected - observed).sum() / count if count else np.nan,
+        ((confidence / 100 - hits) ** 2).mean() if count else np.nan,
+        bets.sum(),
+        hits[bets].mean() if bets.any() else np.nan,
+        (recommendation == RECOMMENDATION_CODES['watch']).sum()
+    )
+
+def _evaluate_range(bounds):
+    start, stop = bounds
+    return [evaluate(config) for config in _shared['configs'][start:stop]]
+
+def run_sweep(data, configs, workers=None):
+    # Métricas (configurações x METRICS) na ordem de configs
+    workers = workers or os.cpu_count() or 1
+    block, layout = share({**data, 'configs': configs})
+    try:
+        tasks = [(start, min(start + CONFIGS_PER_TASK, len(configs)))
+                 for start in range(0, len(configs), CONFIGS_PER_TASK)]
+        if workers > 1 and len(tasks) > 1:
+            with Pool(min(workers, len(tasks)), _init_worker, (block.name, layout)) as pool:
+                chunks = pool.map(_evaluate_range, tasks)
+        else:
+            _init_worker(block.name, layout)
+            try:
+                chunks = [_evaluate_range(task) for task in tasks]
+            finally:
+                _release()
+    finally:
+        block.close()
+        block.unlink()
+    return np.array([row for chunk in chunks for row in chunk], dtype=np.float64).reshape(-1, len(METRICS))
+
+def rank(metrics, sort='hit_rate'):
+    # Índices das configurações, da melhor para a pior (NaN por último)
+    keys = []
+    for name, descending in reversed(SORT_KEYS[sort]):
+        column = metrics[:, METRICS.index(name)]
+        column = np.where(np.isnan(column), np.inf, -column if descending else column)
+        keys.append(column)
+    return np.lexsort(keys)
+
+def check(data, samples=200, seed=SEED):
+    # Confere combine com combine_predictions/get_recommendation do núcleo em
+    # configurações aleatórias; devolve divergências (fora dos desempates aleatórios)
+    block, layout = share({**data, 'configs': np.zeros((0, len(PARAMETERS)))})
+    _init_worker(block.name, layout)
+    try:
+        rng = np.random.default_rng(seed)
+        configs = np.vstack([default_config(), random_configs(max(samples - 1, 0), seed)])
+        positions = rng.choice(len(data['last']), min(len(data['last']), 500), replace=False)
+        mismatches = []
+        for number, config in enumerate(configs):
+            color, confidence, recommendation, chance = combine(config)
+            weights = dict(zip(LAYERS, config[:len(LAYERS)]))
+            tie_band, tie_damping, high_damping, medium_damping, watch, bet = config[len(LAYERS):]
+            for i in positions:
+                layers = {
+                    name: {'color': COLORS[data['layer_color'][i, j]], 'confidence': int(data['layer_confidence'][i, j])}
+                    for j, name in enumerate(LAYERS)
+                }
+                manipulation = LEVELS[data['manipulation'][i]]
+                expected = nucleo.combine_predictions(
+                    layers, COLORS[data['last'][i]], manipulation, weights, tie_band, tie_damping,
+                    {'high': high_damping, 'medium': medium_damping}
+                )
+                expected_recommendation = nucleo.get_recommendation(
+                    LEVELS[data['risk'][i]], manipulation, expected['confidence'], bet, watch
+                )
+                actual = (COLORS[color[i]], int(confidence[i]), RECOMMENDATIONS[recommendation[i]])
+                if chance[i]:
+                    actual = (expected['color'],) + actual[1:]
+                if actual != (expected['color'], expected['confidence'], expected_recommendation):
+                    mismatches.append((number, int(i), actual, expected))
+    finally:
+        _release()
+        block.close()
+        block.unlink()
+    return mismatches
+
+def describe_config(config):
+    weights = '/'.join(f'{weight:.2f}'.lstrip('0') for weight in config[:len(LAYERS)] / config[:len(LAYERS)].sum())
+    tie_band, tie_damping, high_damping, medium_damping, watch, bet = config[len(LAYERS):]
+    return (f'pesos={weights} faixa={tie_band:.2f} empate={tie_damping:.2f} '
+            f'manip={high_damping:.2f}/{medium_damping:.2f} rec={watch:g}/{bet:g}')
+
+def make_report(configs, metrics, order, positions, top, holdout=None):
+    # holdout: (posições de validação, índice -> métricas na validação)
+    rows = []
+    for position, index in enumerate(order[:top]):
+        row = {'rank': position + 1, 'config': int(index), 'default': bool(index == 0)}
+        row.update({name: float(value) for name, value in zip(METRICS, metrics[index])})
+        if holdout is not None:
+            row['holdout'] = {name: float(value) for name, value in zip(METRICS, holdout[1][index])}
+        row['parameters'] = dict(zip(PARAMETERS, configs[index].tolist()))
+        rows.append(row)
+    default_rank = int(np.flatnonzero(order == 0)[0]) + 1
+    report = {'positions': positions, 'configurations': len(configs), 'default_rank': default_rank, 'ranking': rows}
+    if holdout is not None:
+        report['holdout_positions'] = holdout[0]
+        report['default_holdout'] = {name: float(value) for name, value in zip(METRICS, holdout[1][0])}
+    return report
+
+def format_report(report):
+    holdout = 'holdout_positions' in report
+    lines = [
+        f"{report['configurations']} configurações sobre {report['positions']} posições "
+        f"(configuração atual do núcleo: {report['default_rank']}ª)"
+    ]
+    if holdout:
+        default = report['default_holdout']
+        lines.append(f"Validação em {report['holdout_positions']} posições fora da varredura "
+                     f"(configuração atual: acerto {default['hit_rate']:.2%}, calib. {default['calibration']:.4f})")
+    lines += [
+        '',
+        f"{'#':>5} {'acerto':>8} {'sem E':>8} {'calib.':>7} {'brier':>7} {'apostas':>8} {'acerto ap.':>10}"
+        + (f" {'acerto val.':>11} {'calib. val.':>11}" if holdout else '') + "  parâmetros"
+    ]
+    for row in report['ranking']:
+        config = np.array([row['parameters'][name] for name in PARAMETERS])
+        marker = '*' if row['default'] else ' '
+        validation = f" {row['holdout']['hit_rate']:>11.2%} {row['holdout']['calibration']:>11.4f}" if holdout else ''
+        lines.append(
+            f"{row['rank']:>4}{marker} {row['hit_rate']:>8.2%} {row['hit_rate_excluding_empate']:>8.2%} "
+            f"{row['calibration']:>7.4f} {row['brier']:>7.4f} {int(row['bets']):>8} {row['bet_hit_rate']:>10.2%}"
+            f"{validation}  {describe_config(config)}"
+        )
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Varredura de pesos e limiares da combinação das camadas')
+    parser.add_argument('paths', nargs='*', help='sequências gravadas: texto C/V/E, CSV ou segmentos do registro')
+    parser.add_argument('--random', type=int, default=0, metavar='N', help='N configurações aleatórias')
+    parser.add_argument('--grid', nargs='*', default=[], metavar='PARÂMETRO=V1,V2',
+                        help=f"valores por parâmetro ({', '.join(PARAMETERS)}); os demais ficam no padrão")
+    parser.add_argument('--workers', type=int, default=None, help='processos (padrão: todos os núcleos)')
+    parser.add_argument('--sort', choices=tuple(SORT_KEYS), default='hit_rate')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--holdout', type=float, metavar='F',
+                        help='fração final de cada sequência fora da varredura, para reavaliar as primeiras')
+    parser.add_argument('--priors', nargs='?', const=PRIORS_FILE, metavar='ARQUIVO',
+                        help=f'usa as prioris dos arquivos (padrão: {PRIORS_FILE}); só se não incluírem estas sequências')
+    parser.add_argument('--patterns', nargs='?', const=CUSTOM_PATTERNS_FILE, metavar='ARQUIVO',
+                        help=f'inclui os padrões do usuário (padrão: {CUSTOM_PATTERNS_FILE})')
+    parser.add_argument('--cache', help='arquivo .npz das saídas das camadas (reaproveitado se existir)')
+    parser.add_argument('--check', type=int, metavar='N',
+                        help='confere N configurações com o núcleo antes da varredura')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    if not args.paths and not (args.cache and os.path.exists(args.cache)):
+        parser.error('informe as sequências gravadas ou um --cache existente')
+    if args.holdout is not None and not 0 < args.holdout < 1:
+        parser.error('--holdout deve estar entre 0 e 1')
+    try:
+        grid = parse_grid(args.grid)
+        grid_points, skipped = grid_configs(grid) if grid else (np.empty((0, len(PARAMETERS))), 0)
+    except ValueError as error:
+        parser.error(str(error))
+    if skipped:
+        print(f'{skipped} pontos da grade descartados (watch > bet)', file=sys.stderr)
+
+    priors = None
+    if args.priors:
+        priors = load_priors(args.priors)
+        if priors is None:
+            parser.error(f'arquivo de prioris não encontrado: {args.priors}')
+    automaton = catalogue_automaton(load_custom_patterns(args.patterns)) if args.patterns else None
+    data = load_outputs(args.paths, args.cache, args.workers, args.seed, priors, automaton)
+    if args.check:
+        mismatches = check(data, args.check, args.seed)
+        for mismatch in mismatches[:20]:
+            print('DIVERGÊNCIA', *mismatch)
+        if mismatches:
+            raise SystemExit(1)
+
+    holdout = None
+    if args.holdout is not None:
+        try:
+            data, validation = split_holdout(data, args.holdout)
+        except ValueError as error:
+            parser.error(str(error))
+
+    # A configuração atual do núcleo é sempre a de índice 0
+    configs = np.vstack([default_config(), grid_points, random_configs(args.random, args.seed)])
+    metrics = run_sweep(data, configs, args.workers)
+    order = rank(metrics, args.sort)
+    if args.holdout is not None:
+        # Só as primeiras do ranking e a atual são reavaliadas na validação
+        selected = np.union1d(order[:args.top], [0])
+        scores = run_sweep(validation, configs[selected], args.workers)
+        holdout = (len(validation['last']), dict(zip(selected.tolist(), scores)))
+    report = make_report(configs, metrics, order, len(data['last']), args.top, holdout)
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_report(report))
+
+if __name__ == '__main__':
+    main()